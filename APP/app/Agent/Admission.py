@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from Agent.Metrics import Metrics
+
+
+class Overloaded(Exception):
+    """Raised when a limiter's queue is full, or a caller waited longer than its queue timeout."""
+
+    def __init__(self, limiter, retry_after, reason):
+        super().__init__(f"{limiter} overloaded ({reason}), retry after {retry_after}s")
+        self.limiter = limiter
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    """A queued caller. `granted` is set under the limiter lock when a released slot is handed to it."""
+
+    def __init__(self):
+        self.granted = False
+        self.event = threading.Event()
+
+    def grant(self):
+        self.granted = True
+        self.event.set()
+
+
+class _AsyncWaiter(_Waiter):
+    def __init__(self, loop):
+        super().__init__()
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Limiter:
+    """
+    Concurrency limit with a FIFO queue, usable from threads and from the event loop.
+
+    Up to `max_concurrent` callers hold a slot; the rest wait in arrival order and a released slot
+    is handed straight to the oldest waiter. With `max_queue` set, a caller arriving at a full queue
+    is rejected at once with `Overloaded`; with `queue_timeout` set, one that waited that long is
+    rejected too. `retry_after` estimates the seconds until a slot frees up from the queue length and
+    the mean time slots are held. `max_concurrent <= 0` disables the limit.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue=0, queue_timeout=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.hold_seconds = 1.0         # moving average of how long a slot is held
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def _try_acquire(self, waiter_factory):
+        """Takes a free slot (returns None), or queues a new waiter and returns it. Caller holds the lock."""
+        if self.max_concurrent <= 0 or (self.active < self.max_concurrent and not self._waiters):
+            self.active += 1
+            return None
+        if self.max_queue and len(self._waiters) >= self.max_queue:
+            self._reject("full")
+        waiter = waiter_factory()
+        self._waiters.append(waiter)
+        return waiter
+
+    def _reject(self, reason):
+        retry_after = self.retry_after()
+        Metrics.inc("admission_rejected_total", limiter=self.name, reason=reason)
+        logging.info(f"Admission:Rejected {self.name} ({reason}), retry after {retry_after}s")
+        raise Overloaded(self.name, retry_after, reason)
+
+    def _abandon(self, waiter):
+        """A waiter gives up. Returns True if it was granted a slot meanwhile, which it then holds. Caller holds the lock."""
+        if waiter.granted:
+            return True
+        self._waiters.remove(waiter)
+        return False
+
+    def _admitted(self, waited):
+        Metrics.observe("admission_wait_seconds", waited, limiter=self.name)
+        self._report()
+
+    def _report(self):
+        Metrics.set("admission_queue_depth", len(self._waiters), limiter=self.name)
+        Metrics.set("admission_in_flight", self.active, limiter=self.name)
+
+    def retry_after(self) -> int:
+        slots = max(1, self.max_concurrent)
+        return max(1, math.ceil(self.hold_seconds * (len(self._waiters) + 1) / slots))
+
+    # ------------------------------------------------------------------
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._lock:
+            waiter = self._try_acquire(_Waiter)
+            self._report()
+        if waiter is not None and not waiter.event.wait(self.queue_timeout):
+            with self._lock:
+                if not self._abandon(waiter):
+                    self._reject("timeout")
+        self._admitted(time.perf_counter() - start)
+
+    async def acquire_async(self):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._try_acquire(lambda: _AsyncWaiter(loop))
+            self._report()
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if not self._abandon(waiter):
+                        self._reject("timeout")
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = self._abandon(waiter)
+                if granted:
+                    self.release()
+                raise
+        self._admitted(time.perf_counter() - start)
+
+    def release(self, held=None):
+        with self._lock:
+            if held is not None:
+                self.hold_seconds = 0.9 * self.hold_seconds + 0.1 * held
+            if self._waiters:
+                self._waiters.popleft().grant()     # the slot passes on, active stays the same
+            elif self.max_concurrent > 0 or self.active:
+                self.active -= 1
+            self._report()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        await self.acquire_async()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            return {"active": self.active, "queued": len(self._waiters), "max_concurrent": self.max_concurrent,
+                    "max_queue": self.max_queue, "hold_seconds": round(self.hold_seconds, 3)}
+
+
+class Admission:
+    """
+    The process wide limiters: whole requests in front of Agent.Exec, LLM HTTP calls, and
+    Generator (Openfabric) calls. Only the request queue is bounded and rejects; LLM and
+    Generator calls of admitted requests wait their turn.
+    """
+
+    REQUESTS = Limiter(
+        "requests",
+        max_concurrent=int(os.environ.get("ADMISSION_MAX_CONCURRENT", 16)),
+        max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", 64)),
+        queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 30)),
+    )
+    LLM = Limiter("llm", max_concurrent=int(os.environ.get("LLM_MAX_CONCURRENT", 8)))
+    GENERATOR = Limiter("generator", max_concurrent=int(os.environ.get("GENERATOR_MAX_CONCURRENT", 4)))
+
+    @classmethod
+    def stats(cls):
+        return {limiter.name: limiter.stats() for limiter in (cls.REQUESTS, cls.LLM, cls.GENERATOR)}
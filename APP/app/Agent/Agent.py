@@ -1,15 +1,26 @@
 from typing import Literal
+import asyncio
 import logging
+import os
+import threading
+import time
 
 from Agent.LLM.llm import LLM
-from Agent.Storage.VectorDB import VectorDB
-from Agent.Storage.DB import DB
+from Agent.Storage.DB import DB, get_db
 from Agent.LLM.Gemini import GeminiLLM
 from Agent.LLM.Ollama import OllamaLLM
+from Agent.LLM.AsyncLLM import AsyncLLM
+from Agent.AsyncRuntime import AsyncRuntime
 from Agent.Generator import Generator
 
 from Agent.Processor import Processor
 from Agent.SessionsManager import SessionManager , SessionData 
+from Agent.Cache.LRUCache import LRUCache
+from Agent.LLM.Streaming import StateStreamParser, StreamReader
+from Agent.Metrics import Metrics
+from Agent.Tracing import Tracer
+from Agent.Events import Events
+from Agent.Storage.ArtifactStore import ArtifactStore
 
 from enum import Enum
 
@@ -20,6 +31,47 @@ class Agent:
     _db:DB = None     
     _generator:Generator =None
     
+    STREAMING = os.environ.get("LLM_STREAMING", "0") == "1"
+    
+    # warm agents (LLM clients, converted history, processor) of recently active sessions
+    _pool = LRUCache(
+        max_items=int(os.environ.get("AGENT_POOL_SIZE", 256)),
+        ttl=float(os.environ.get("AGENT_POOL_TTL", 1800)),
+    )
+    _pool_lock = threading.Lock()
+    
+    @classmethod
+    def get_agent(cls,baseLLM,username,session_id, generator:Generator):
+        """Returns the pooled agent of the session, building (and pooling) one on a miss."""
+        with cls._pool_lock:
+            agent = cls._pooled(baseLLM, username, session_id)
+            if agent is not None:
+                logging.info("Agent:ReusingPooledAgent")
+                return agent
+        
+        # built outside the lock (it loads the session history); put-if-absent so that of two
+        # concurrent first requests of a session both end up on the same agent and history
+        agent = Agent(baseLLM,username,session_id,generator)
+        with cls._pool_lock:
+            pooled = cls._pooled(baseLLM, username, agent.session_id)
+            if pooled is not None:
+                logging.info("Agent:ReusingAgentPooledMeanwhile")
+                return pooled
+            cls._pool.put(agent.session_id, agent)
+        return agent
+    
+    @classmethod
+    def _pooled(cls, baseLLM, username, session_id):
+        """The pooled agent of the session if it was built for the same LLM and user. Caller holds _pool_lock."""
+        agent:Agent = cls._pool.get(session_id) if session_id else None
+        if agent is not None and agent.baseLLM == baseLLM and agent.session_data.username == username:
+            return agent
+        return None
+    
+    @classmethod
+    def pool_stats(cls):
+        return cls._pool.stats()
+    
     def __init__(self,baseLLM,username,session_id, generator:Generator):
         
         if Agent._generator is None:
@@ -32,13 +84,23 @@ class Agent:
             
         if Agent._db is None:
             logging.info("Agent:Initializing DataBase")
-            Agent._db = VectorDB()
+            Agent._db = get_db()     # no-op once the startup warm-up has connected it
                 
         self.llm=None 
         self.session_id = self.add_session(session_id=session_id) #generate a session_id if new session is initiated
         self.session_data = SessionData(session_id=self.session_id , username=username)     
         
         self.init_baseLLM(baseLLM)
+        self.processor = Processor(  
+            session_data=self.session_data,
+            generator=Agent._generator,
+            session_manager=Agent._sessionsManager,
+            db=Agent._db,
+            baseLLM = self.baseLLM 
+        )
+        self.lock = threading.Lock()     # one request at a time per session
+        self.async_lock = None           # asyncio.Lock, created on the runtime loop by the first ExecAsync
+        self.started = time.perf_counter()
     
     def add_session(self,session_id):
         logging.info("Agent:AddSession")
@@ -48,7 +110,7 @@ class Agent:
         logging.info("Agent:GetSessionHistory")
         if hasattr(self,"llm"):
             if self.llm is not None:
-                return Agent.llm.get_history()
+                return self.llm.get_history()
         return Agent._sessionsManager.get_session_history(self.session_data.session_id) 
     
     def set_session_history(self , history):
@@ -59,31 +121,44 @@ class Agent:
         logging.info("Agent:InitBaseLLM")
         self.baseLLM=baseLLM
         new_history = self.get_session_history() ## for new sessions it returns history with only base_prompt in it 
-        if self.baseLLM=='gemini':
-            self.llm:LLM = GeminiLLM(new_history)
-        if 'llama' in self.baseLLM:
-            self.llm:LLM = OllamaLLM(new_history , MODEL=self.baseLLM)
+        self.llm:LLM = LLM.create(self.baseLLM, new_history)
+        self.async_llm = AsyncLLM(self.llm)
     
     
         
-    def Exec(self,user_prompt:str):
+    def Exec(self,user_prompt:str, stream_id:str=None):
+        """Runs a request; with a stream_id its progress is published to that Events stream, closed when it returns."""
+        try:
+            with self.lock, Tracer.trace("request", session_id=self.session_id, mode="threaded"):
+                return self._exec(user_prompt, stream_id)
+        finally:
+            Events.close(stream_id)
+    
+    def _exec(self,user_prompt:str, stream_id:str=None):
         logging.info("Agent:Execution")
+        # outputs are per request, the LLM and its history carry over between turns
+        self.session_data = SessionData(session_id=self.session_id , username=self.session_data.username)
+        self.session_data.stream_id = stream_id
+        PROCESSOR = self.processor
+        PROCESSOR.reset(self.session_data)
+        self.started = time.perf_counter()
+        
         prompt = user_prompt
         while True:
             
-            llm_response = self.llm.prompt(prompt)
+            if Agent.STREAMING:
+                llm_response, agent_response = self.stream_and_process(prompt)
+            else:
+                start = time.perf_counter()
+                llm_response = self.llm.prompt(prompt)
+                PROCESSOR.record_stage("llm", time.perf_counter() - start)
+                self.record_usage()
+                agent_response = PROCESSOR.process(llm_response=llm_response)
         
             logging.info(f"llm response :{llm_response}")
             
-            PROCESSOR = Processor(  
-                session_data=self.session_data,
-                generator=Agent._generator,
-                session_manager=Agent._sessionsManager,
-                db=Agent._db,
-                baseLLM = self.baseLLM 
-            )
-            
-            agent_response = PROCESSOR.process(llm_response=llm_response)
+            for turn_prompt, turn_reply in PROCESSOR.transcript:
+                self.llm.add_turn(turn_prompt, turn_reply)
             
             logging.info(f"Agent:AgentResponse{agent_response}")
             prompt = agent_response
@@ -94,15 +169,124 @@ class Agent:
         return self.EXIT()
     
     
+    async def ExecAsync(self,user_prompt:str, stream_id:str=None):
+        """Exec on the AsyncRuntime loop: Openfabric waits are awaited, the remaining blocking calls use its executor."""
+        if self.async_lock is None:
+            self.async_lock = asyncio.Lock()
+        try:
+            async with self.async_lock:
+                with Tracer.trace("request", session_id=self.session_id, mode="async"):
+                    return await self._exec_async(user_prompt, stream_id)
+        finally:
+            Events.close(stream_id)
+    
+    async def _exec_async(self,user_prompt:str, stream_id:str=None):
+        logging.info("Agent:ExecutionAsync")
+        self.session_data = SessionData(session_id=self.session_id , username=self.session_data.username)
+        self.session_data.stream_id = stream_id
+        PROCESSOR = self.processor
+        PROCESSOR.reset(self.session_data)
+        self.started = time.perf_counter()
+        
+        prompt = user_prompt
+        while True:
+            if Agent.STREAMING:
+                llm_response, agent_response = await self.stream_and_process_async(prompt)
+            else:
+                start = time.perf_counter()
+                llm_response = await self.async_llm.prompt(prompt)
+                PROCESSOR.record_stage("llm", time.perf_counter() - start)
+                self.record_usage()
+                agent_response = await PROCESSOR.process_async(llm_response=llm_response)
+            logging.info(f"llm response :{llm_response}")
+            
+            for turn_prompt, turn_reply in PROCESSOR.transcript:
+                self.llm.add_turn(turn_prompt, turn_reply)
+            
+            logging.info(f"Agent:AgentResponse{agent_response}")
+            prompt = agent_response
+            if agent_response =="EXIT":
+                break
+        
+        await PROCESSOR.join_render_async()
+        return await AsyncRuntime.run_blocking(self.EXIT)
+
+    def stream_and_process(self, prompt):
+        """Streams the LLM reply and dispatches its state as soon as the state's fields are complete."""
+        with Tracer.span("llm.stream", backend=self.baseLLM):
+            return self._stream_and_process(prompt)
+    
+    def _stream_and_process(self, prompt):
+        reader = StreamReader(self.llm.stream_prompt(prompt))
+        parser = StateStreamParser(Processor.REQUIRED_FIELDS)
+        agent_response = None
+        for chunk in reader:
+            if agent_response is None:
+                State = parser.feed(chunk)
+                if State is not None:
+                    Metrics.observe("llm_time_to_first_action_seconds", reader.elapsed(), backend=self.baseLLM)
+                    agent_response = self.processor.process_state(State)
+        
+        llm_response = reader.text
+        Metrics.observe("llm_time_to_full_reply_seconds", reader.completed_after, backend=self.baseLLM)
+        self.processor.record_stage("llm", reader.completed_after)
+        self.record_usage()
+        if agent_response is None:
+            agent_response = self.processor.process(llm_response=llm_response)
+        return llm_response, agent_response
+    
+    async def stream_and_process_async(self, prompt):
+        """stream_and_process on the loop: chunks are awaited, the state is dispatched with process_state_async."""
+        with Tracer.span("llm.stream", backend=self.baseLLM):
+            reader = StreamReader(self.llm.stream_prompt(prompt), loop=asyncio.get_running_loop())
+            parser = StateStreamParser(Processor.REQUIRED_FIELDS)
+            agent_response = None
+            async for chunk in reader:
+                if agent_response is None:
+                    State = parser.feed(chunk)
+                    if State is not None:
+                        Metrics.observe("llm_time_to_first_action_seconds", reader.elapsed(), backend=self.baseLLM)
+                        agent_response = await self.processor.process_state_async(State)
+            
+            llm_response = reader.text
+            Metrics.observe("llm_time_to_full_reply_seconds", reader.completed_after, backend=self.baseLLM)
+            self.processor.record_stage("llm", reader.completed_after)
+            self.record_usage()
+            if agent_response is None:
+                agent_response = await self.processor.process_async(llm_response=llm_response)
+            return llm_response, agent_response
+    
+    def record_usage(self):
+        """Adds what the history policy sent with the last prompt to the request's totals."""
+        policy = getattr(self.llm, "policy", None)
+        if policy is None:
+            return
+        usage = self.session_data.usage
+        for key in ("history_bytes", "sent_bytes", "prompt_tokens", "completion_tokens"):
+            if key in policy.last_usage:
+                usage[key] = usage.get(key, 0) + policy.last_usage[key]
+    
     def EXIT(self):
         sd = self.session_data
+        self.processor.join_render()     # no-op unless a render was started in the background
+        self.publish_done()
         self.save_session()
+        self.processor.record_stage("total", time.perf_counter() - self.started)
+        logging.info(f"Agent:StageTimings {sd.timings}")
+        if sd.usage:
+            logging.info(f"Agent:PromptUsage {sd.usage}")
         logging.info("Agent:Exiting")
         return self.return_data()
         
+    def publish_done(self):
+        """The final result on the request's Events stream, ahead of the session save and the /execution response."""
+        message, image, obj, session_id, cache_hits = self.return_data()
+        self.processor.publish("done", message=message, image=ArtifactStore.url(image), object=ArtifactStore.url(obj),
+                               session_id=session_id, cache_hits=cache_hits)
+        
     def return_data(self):
         sd = self.session_data
-        return sd.message ,sd.IMAGE , sd.OBJECT ,sd.session_id
+        return sd.message ,sd.IMAGE , sd.OBJECT ,sd.session_id ,",".join(name for name, hit in sd.cache_hits.items() if hit)
     
     
     def save_session(self):
@@ -112,10 +296,9 @@ class Agent:
         session_history =self.llm.get_history()
         self.set_session_history(session_history)
         
-        #saving to db at every exit ## because currently
         ## TODO store last image rescription in memory
         if sd.image_description:
-            ## TODO use cache for SessionManager and save to db only when session is evicted form cache
+            # marks the cached session dirty, SessionManager writes it to the db on eviction or checkpoint
             Agent._sessionsManager.save_session(
                 session_id=sd.session_id,
                 username=  sd.username,
@@ -0,0 +1,50 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from Agent.Tracing import Tracer
+
+
+class AsyncRuntime:
+    """
+    One background event loop shared by every session on the async execution path, plus a
+    bounded executor for the blocking work left on it (LLM HTTP calls, the sentence encoder, DB I/O).
+    """
+
+    WORKERS = int(os.environ.get("ASYNC_BLOCKING_WORKERS", 16))
+
+    _loop = None
+    _thread = None
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        with cls._lock:
+            if cls._loop is None:
+                logging.info("AsyncRuntime:StartingEventLoop")
+                cls._loop = asyncio.new_event_loop()
+                cls._loop.set_default_executor(cls.get_executor())
+                cls._thread = threading.Thread(target=cls._loop.run_forever, name="agent-event-loop", daemon=True)
+                cls._thread.start()
+            return cls._loop
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=cls.WORKERS, thread_name_prefix="agent-blocking")
+        return cls._executor
+
+    @classmethod
+    def run(cls, coroutine):
+        """Bridges synchronous callers into the loop: schedules the coroutine and blocks for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, cls.get_loop()).result()
+
+    @classmethod
+    async def run_blocking(cls, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # executor threads do not inherit context variables, carry the current span over
+        return await loop.run_in_executor(cls.get_executor(), Tracer.wrap(functools.partial(fn, *args, **kwargs)))
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class ArtifactCache:
+    """
+    Disk backed, content addressed cache of generated artifacts.
+
+    Entries are keyed by a SHA-256 of `namespace` and the generator input (image description
+    or input image), stored as `<dir>/<namespace>/<key[:2]>/<key>` and evicted least recently
+    used first once the directory grows past `max_bytes`. Values that refer to data kept elsewhere
+    (artifact ids) are checked with `valid` on every hit, and dropped once it is gone.
+    """
+
+    def __init__(self, path:str, max_bytes:int, valid:Optional[Callable[[str], bool]]=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.valid = valid
+        self._entries: "OrderedDict[str, int]" = OrderedDict()   # file path -> size, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    def _scan(self):
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                file = os.path.join(root, name)
+                if name.endswith(".tmp"):
+                    os.remove(file)
+                    continue
+                stat = os.stat(file)
+                files.append((stat.st_mtime, file, stat.st_size))
+        for _, file, size in sorted(files):
+            self._entries[file] = size
+            self._bytes += size
+        logging.info(f"ArtifactCache:Loaded {len(self._entries)} artifacts ({self._bytes} bytes)")
+
+    def _file(self, namespace:str, data:str) -> str:
+        key = hashlib.sha256(f"{namespace}\0{data}".encode("utf-8")).hexdigest()
+        return os.path.join(self.path, namespace, key[:2], key)
+
+    def get(self, namespace:str, data:str) -> Optional[str]:
+        file = self._file(namespace, data)
+        with self._lock:
+            if file not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(file)
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                value = f.read()
+            os.utime(file)
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(file, 0)
+                self.misses += 1
+            return None
+        if self.valid is not None and not self.valid(value):
+            self._discard(file)
+            return None
+        self.hits += 1
+        return value
+
+    def _discard(self, file:str):
+        with self._lock:
+            self._bytes -= self._entries.pop(file, 0)
+            self.misses += 1
+            self.evictions += 1
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+    def put(self, namespace:str, data:str, value:str):
+        file = self._file(namespace, data)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = f"{file}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp, file)
+        size = os.path.getsize(file)
+        with self._lock:
+            self._bytes += size - self._entries.pop(file, 0)
+            self._entries[file] = size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest, oldest_size = self._entries.popitem(last=False)
+                self._bytes -= oldest_size
+                self.evictions += 1
+                try:
+                    os.remove(oldest)
+                except OSError:
+                    pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread safe LRU cache bounded by entry count and by an estimated byte size,
+    with an optional time-to-live per entry.
+
+    Evicted entries are handed to `on_evict(key, value)` so owners can write
+    them back to persistent storage before they are dropped from memory.
+    """
+
+    def __init__(self,
+                 max_items: int = 0,
+                 max_bytes: int = 0,
+                 ttl: float = 0,
+                 sizeof: Callable[[Any], int] = None,
+                 on_evict: Callable[[Hashable, Any], None] = None):
+        # 0 disables the corresponding bound
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 0)
+        self.on_evict = on_evict
+
+        self._data: "OrderedDict[Hashable, list]" = OrderedDict()  # key -> [value, size, timestamp]
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._evicted = []  # (key, value) pairs waiting for on_evict, called outside the lock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key, default=None):
+        try:
+            return self._get(key, default)
+        finally:
+            self._drain()
+
+    def _get(self, key, default):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if self._expired(entry):
+                self.expirations += 1
+                self._evict(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            entry[2] = time.monotonic()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            size = self.sizeof(value)
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = [value, size, time.monotonic()]
+            self._bytes += size
+            self._shrink(keep=key)
+        self._drain()
+
+    def pop(self, key, default=None):
+        """Removes an entry without triggering `on_evict`."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def items(self):
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def expire(self):
+        """Evicts every entry whose TTL has elapsed."""
+        with self._lock:
+            for key in [k for k, entry in self._data.items() if self._expired(entry)]:
+                self.expirations += 1
+                self._evict(key)
+        self._drain()
+
+    def clear(self):
+        """Evicts every entry, flushing each through `on_evict`."""
+        with self._lock:
+            for key in list(self._data.keys()):
+                self._evict(key)
+        self._drain()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _expired(self, entry) -> bool:
+        return bool(self.ttl) and time.monotonic() - entry[2] > self.ttl
+
+    def _over_limit(self) -> bool:
+        if self.max_items and len(self._data) > self.max_items:
+            return True
+        if self.max_bytes and self._bytes > self.max_bytes:
+            return True
+        return False
+
+    def _shrink(self, keep: Optional[Hashable] = None):
+        # least recently used entries sit at the front of the OrderedDict
+        while self._over_limit():
+            key = next(iter(self._data))
+            if key == keep:
+                # a single entry larger than max_bytes is kept until something newer arrives
+                break
+            self._evict(key)
+
+    def _evict(self, key):
+        value, size, _ = self._data.pop(key)
+        self._bytes -= size
+        self.evictions += 1
+        if self.on_evict is not None:
+            self._evicted.append((key, value))
+
+    def _drain(self):
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        for key, value in evicted:
+            self.on_evict(key, value)
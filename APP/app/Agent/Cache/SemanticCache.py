@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from Agent.Cache.LRUCache import LRUCache
+from Agent.Metrics import Metrics
+
+
+class SemanticEntry:
+    def __init__(self, intent, image_description, image, object):
+        self.intent = intent
+        self.image_description = image_description
+        self.image = image
+        self.object = object
+        self.last_used = time.monotonic()
+
+    def size(self):
+        return len(self.image_description) + len(self.image) + len(self.object)
+
+
+class SessionGenerations:
+    """One session's cached generations, with their intent embeddings stacked in a matrix."""
+
+    def __init__(self, max_entries:int):
+        self.max_entries = max_entries
+        self.entries: List[SemanticEntry] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.lock = threading.Lock()
+
+    def size(self):
+        return sum(entry.size() for entry in self.entries)
+
+    def match(self, vector:np.ndarray):
+        with self.lock:
+            if not self.entries:
+                return None, 0.0
+            scores = self.vectors @ vector
+            best = int(np.argmax(scores))
+            return self.entries[best], float(scores[best])
+
+    def remove(self, entry:SemanticEntry):
+        with self.lock:
+            for i, existing in enumerate(self.entries):
+                if existing is entry:
+                    del self.entries[i]
+                    self.vectors = np.delete(self.vectors, i, axis=0)
+                    return
+
+    def add(self, vector:np.ndarray, entry:SemanticEntry) -> int:
+        with self.lock:
+            evicted = 0
+            if self.entries and len(self.entries) >= self.max_entries:
+                # least recently used generation makes room for the new one
+                oldest = min(range(len(self.entries)), key=lambda i: self.entries[i].last_used)
+                del self.entries[oldest]
+                self.vectors = np.delete(self.vectors, oldest, axis=0)
+                evicted = 1
+            self.entries.append(entry)
+            self.vectors = vector[None, :] if self.vectors is None or not len(self.vectors) else np.vstack([self.vectors, vector])
+            return evicted
+
+
+class SemanticCache:
+    """
+    Per-session cache of finished generations looked up by embedding similarity of the image intent,
+    so rewordings of a previous request ("a red dragon", "red dragon, please") reuse its artifacts.
+    A session only ever sees its own generations.
+    """
+
+    def __init__(self, encode, threshold:float=0.9, max_entries_per_session:int=64, max_sessions:int=1024,
+                 max_bytes:int=0, valid=None):
+        self.encode = encode
+        self.valid = valid      # entry -> False once its artifacts are gone
+        self.threshold = threshold
+        self.max_entries_per_session = max_entries_per_session
+        self._sessions = LRUCache(max_items=max_sessions, max_bytes=max_bytes, sizeof=SessionGenerations.size)
+        self._lock = threading.Lock()   # store's get-or-create, add and re-put of a session's generations
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _embed(self, intent:str) -> np.ndarray:
+        vector = np.asarray(self.encode(intent), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, session_id:str, intent:str) -> Optional[SemanticEntry]:
+        generations: SessionGenerations = self._sessions.get(session_id)
+        if generations is not None:
+            entry, score = generations.match(self._embed(intent))
+            if entry is not None and score >= self.threshold and self.valid is not None and not self.valid(entry):
+                generations.remove(entry)
+                self.evictions += 1
+                entry = None
+            if entry is not None and score >= self.threshold:
+                entry.last_used = time.monotonic()
+                self.hits += 1
+                Metrics.inc("cache_requests_total", cache="semantic", result="hit")
+                return entry
+        self.misses += 1
+        Metrics.inc("cache_requests_total", cache="semantic", result="miss")
+        return None
+
+    def store(self, session_id:str, intent:str, image_description:str, image:str, object:str):
+        vector = self._embed(intent)
+        with self._lock:
+            generations: SessionGenerations = self._sessions.get(session_id)
+            if generations is None:
+                generations = SessionGenerations(self.max_entries_per_session)
+            self.evictions += generations.add(vector, SemanticEntry(intent, image_description, image, object))
+            self._sessions.put(session_id, generations)     # re-put so the byte estimate follows the new entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        sessions = self._sessions.stats()
+        return {
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "sessions": sessions["items"],
+            "session_evictions": sessions["evictions"],
+            "bytes": sessions["bytes"],
+        }
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Hashable
+
+from Agent.Metrics import Metrics
+
+
+class _Call:
+    """One in-flight call; its outcome is shared by every caller that asked for the same key meanwhile."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+        self._futures = []      # (loop, future) of waiting asyncio callers
+        self._lock = threading.Lock()
+
+    def finish(self, result=None, error=None):
+        with self._lock:
+            self.result, self.error = result, error
+            self.done.set()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            loop.call_soon_threadsafe(self._wake, future)
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+    def future(self, loop):
+        """A future of `loop` completed when the call finishes (already completed if it has)."""
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                future.set_result(None)
+            else:
+                self._futures.append((loop, future))
+        return future
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, callers
+    arriving while it runs wait for it and get the same result, or the same exception.
+
+    Threads and asyncio tasks share the in-flight calls, so a blocking caller can wait on a call
+    an async caller started and the other way round. Nothing is kept once a call finishes; caching
+    results is left to the caller. If an async leader is cancelled, its waiters run the call again
+    instead of failing with its cancellation.
+    """
+
+    def __init__(self, name:str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def _join(self, key:Hashable):
+        """Returns (call, leader): the key's in-flight call, or a new one the caller has to run."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.shared += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+        Metrics.inc("singleflight_calls_total", flight=self.name, role="leader" if leader else "shared")
+        if not leader:
+            logging.info(f"SingleFlight:{self.name}:JoinedInFlightCall")
+        return call, leader
+
+    def _finish(self, key:Hashable, call:_Call, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if call.shared:
+            Metrics.inc("singleflight_deduplicated_total", call.shared, flight=self.name)
+        call.finish(result, error)
+
+    def do(self, key:Hashable, fn:Callable):
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if isinstance(call.error, asyncio.CancelledError):
+                return self.do(key, fn)
+            return call.outcome()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    async def do_async(self, key:Hashable, fn:Callable[[], Awaitable]):
+        call, leader = self._join(key)
+        if not leader:
+            await asyncio.shield(call.future(asyncio.get_running_loop()))
+            if isinstance(call.error, asyncio.CancelledError):
+                return await self.do_async(key, fn)
+            return call.outcome()
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        return {"in_flight": self.in_flight(), "leaders": self.leaders, "shared": self.shared}
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import os
+import contextvars
+
+from Agent.Admission import Admission
+from Agent.Generator import Generator
+from Agent.Cache.ArtifactCache import ArtifactCache
+from Agent.Cache.SingleFlight import SingleFlight
+from Agent.Metrics import Metrics
+from Agent.Storage.ArtifactStore import ArtifactStore
+from Agent.Tracing import Tracer
+
+
+class CachedGenerator(Generator):
+    """
+    Generator decorator that serves repeated image descriptions / input images from an ArtifactCache.
+    Identical misses that run at the same time share one call to the wrapped generator.
+    """
+
+    CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", "datastore/artifact_cache")
+    MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+    COALESCE = os.environ.get("GENERATOR_COALESCE", "1") == "1"
+
+    _cache = None
+    _flights = {namespace: SingleFlight(f"generator_{namespace}") for namespace in ("image", "model")}
+
+    def __init__(self, generator:Generator):
+        self.generator = generator
+        if CachedGenerator._cache is None:
+            logging.info("CachedGenerator:Initialising Artifact Cache")
+            # entries are artifact ids, a hit whose artifact was evicted from the store is a miss
+            CachedGenerator._cache = ArtifactCache(CachedGenerator.CACHE_DIR, CachedGenerator.MAX_BYTES,
+                                                   valid=ArtifactStore.available)
+        # a context variable rather than a thread local so concurrent asyncio tasks on one loop thread keep their own flag
+        self._hit = contextvars.ContextVar(f"cached_generator_hit_{id(self)}", default=False)
+
+    def generate_image(self, prompt):
+        return self._cached("image", prompt, self.generator.generate_image)
+
+    def generate_3drender(self, image):
+        return self._cached("model", image, self.generator.generate_3drender)
+
+    async def generate_image_async(self, prompt):
+        return await self._cached_async("image", prompt, self.generator.generate_image_async)
+
+    async def generate_3drender_async(self, image):
+        return await self._cached_async("model", image, self.generator.generate_3drender_async)
+
+    def last_hit(self):
+        return self._hit.get()
+
+    def _cached(self, namespace, data, generate):
+        with Tracer.span(f"generator.{namespace}") as span:
+            result = self._lookup(namespace, data, span)
+            if result is not None:
+                return result
+            if not self.COALESCE:
+                return self._generate(namespace, data, generate)
+            return CachedGenerator._flights[namespace].do(
+                self._flight_key(data), lambda: self._generate(namespace, data, generate))
+
+    async def _cached_async(self, namespace, data, generate):
+        with Tracer.span(f"generator.{namespace}") as span:
+            result = self._lookup(namespace, data, span)
+            if result is not None:
+                return result
+            if not self.COALESCE:
+                return await self._generate_async(namespace, data, generate)
+            return await CachedGenerator._flights[namespace].do_async(
+                self._flight_key(data), lambda: self._generate_async(namespace, data, generate))
+
+    def _generate(self, namespace, data, generate):
+        with Admission.GENERATOR.slot():     # only misses reach the Openfabric apps
+            return self._store(namespace, data, generate(data))
+
+    async def _generate_async(self, namespace, data, generate):
+        async with Admission.GENERATOR.slot_async():
+            return self._store(namespace, data, await generate(data))
+
+    @staticmethod
+    def _flight_key(data):
+        # descriptions, or input images by artifact id (itself a content hash); large inline inputs are not kept as keys
+        return hashlib.sha256(str(data).encode("utf-8")).hexdigest()
+
+    def _lookup(self, namespace, data, span=None):
+        result = CachedGenerator._cache.get(namespace, data)
+        self._hit.set(result is not None)
+        Metrics.inc("cache_requests_total", cache=f"artifact_{namespace}", result="hit" if result is not None else "miss")
+        if span is not None:
+            span.tags = {**span.tags, "cache_hit": result is not None}
+        if result is not None:
+            logging.info(f"CachedGenerator:Hit {namespace}")
+        return result
+
+    def _store(self, namespace, data, result):
+        if isinstance(result, str) and result:      # generators hand back exceptions on failure
+            CachedGenerator._cache.put(namespace, data, result)
+        return result
+
+    @classmethod
+    def stats(cls):
+        return cls._cache.stats() if cls._cache is not None else {}
+
+    @classmethod
+    def flight_stats(cls):
+        return {namespace: flight.stats() for namespace, flight in cls._flights.items()}
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from Agent.Metrics import Metrics
+
+
+class _Stream:
+    """Events of one request, kept until the stream expires so a late subscriber can replay them."""
+
+    def __init__(self):
+        self.events = []            # (id, event, json data)
+        self.closed = False
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+
+class Events:
+    """
+    Progress of a request pushed to the client as server-sent events, next to the blocking
+    /execution call of the SDK.
+
+    The client picks a `stream_id`, opens GET /events/<stream_id> on the side server and sends the
+    same id with its request. The Processor publishes its transitions to that stream as they happen
+    (`state`, `recall`, `image`, `model`), the Agent publishes `done` with the final result and
+    closes it. Events are buffered per stream, so subscribing after the request started replays
+    what was missed (or everything after `Last-Event-ID` on a reconnect); streams are dropped
+    EVENTS_TTL_SECONDS after their last event.
+    """
+
+    ROUTE = "/events/"
+    TTL_SECONDS = float(os.environ.get("EVENTS_TTL_SECONDS", 300))
+    MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", 1024))
+    HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", 15))
+
+    _VALID_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+    _streams = OrderedDict()    # stream_id -> _Stream, least recently used first
+    _subscribers = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def valid(cls, stream_id) -> bool:
+        return isinstance(stream_id, str) and bool(cls._VALID_ID.match(stream_id))
+
+    @classmethod
+    def _stream(cls, stream_id) -> _Stream:
+        with cls._lock:
+            now = time.monotonic()
+            stream = cls._streams.get(stream_id)
+            if stream is None:
+                while cls._streams:
+                    oldest_id, oldest = next(iter(cls._streams.items()))
+                    if len(cls._streams) < cls.MAX_STREAMS and now - oldest.updated < cls.TTL_SECONDS:
+                        break
+                    del cls._streams[oldest_id]
+                stream = cls._streams[stream_id] = _Stream()
+            else:
+                cls._streams.move_to_end(stream_id)
+            stream.updated = now
+            return stream
+
+    @classmethod
+    def publish(cls, stream_id, event:str, **data):
+        """Appends an event to the stream; no-op for requests sent without a valid stream id."""
+        if not cls.valid(stream_id):
+            return
+        stream = cls._stream(stream_id)
+        with stream.condition:
+            if stream.closed:
+                return
+            stream.events.append((len(stream.events) + 1, event, json.dumps(data, default=str)))
+            stream.condition.notify_all()
+        Metrics.inc("events_published_total", event=event)
+
+    @classmethod
+    def close(cls, stream_id):
+        """Ends the stream; subscribers get the remaining events, then the response ends."""
+        if not cls.valid(stream_id):
+            return
+        stream = cls._stream(stream_id)
+        with stream.condition:
+            stream.closed = True
+            stream.condition.notify_all()
+
+    @classmethod
+    def handle(cls, request, path):
+        """Side server handler of GET /events/<stream_id>: the stream as text/event-stream."""
+        stream_id = path[len(cls.ROUTE):].partition("?")[0]
+        if not cls.valid(stream_id):
+            request.send_error(404, "Unknown stream")
+            return
+        try:
+            sent = int(request.headers.get("Last-Event-ID") or 0)
+        except ValueError:
+            sent = 0
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Cache-Control", "no-store")
+        request.send_header("Connection", "close")      # no length, the body ends when the stream does
+        request.send_header("X-Accel-Buffering", "no")
+        request.end_headers()
+        request.close_connection = True
+        if request.command == "HEAD":
+            return
+
+        logging.info(f"Events:Subscribed {stream_id}")
+        cls._count_subscriber(1)
+        try:
+            cls._serve(request, cls._stream(stream_id), sent)
+        finally:
+            cls._count_subscriber(-1)
+
+    @classmethod
+    def _count_subscriber(cls, change):
+        with cls._lock:
+            cls._subscribers += change
+            Metrics.set("events_subscribers", cls._subscribers)
+
+    @classmethod
+    def _serve(cls, request, stream, sent):
+        while True:
+            with stream.condition:
+                if len(stream.events) <= sent and not stream.closed:
+                    stream.condition.wait(cls.HEARTBEAT_SECONDS)
+                pending = stream.events[sent:]
+                closed = stream.closed
+                idle = time.monotonic() - stream.updated
+            if pending:
+                request.wfile.write("".join(f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+                                            for event_id, event, data in pending).encode("utf-8"))
+                sent = pending[-1][0]
+            elif closed or idle >= cls.TTL_SECONDS:
+                return
+            else:
+                request.wfile.write(b": keep-alive\n\n")
+            request.wfile.flush()
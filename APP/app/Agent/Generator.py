@@ -1,5 +1,7 @@
 from abc import ABC , abstractmethod
 
+from Agent.AsyncRuntime import AsyncRuntime
+
 class Generator(ABC):
     
     @abstractmethod
@@ -7,4 +9,15 @@ class Generator(ABC):
         pass
     @abstractmethod
     def generate_3drender(promot):
-        pass
\ No newline at end of file
+        pass
+    
+    def last_hit(self):
+        """True when the last generate_* call of this thread / task was served from a cache."""
+        return False
+    
+    async def generate_image_async(self, prompt):
+        """Awaitable generate_image. Runs the blocking call on the AsyncRuntime executor unless overridden."""
+        return await AsyncRuntime.run_blocking(self.generate_image, prompt)
+    
+    async def generate_3drender_async(self, image):
+        return await AsyncRuntime.run_blocking(self.generate_3drender, image)
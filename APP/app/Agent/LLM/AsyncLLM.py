@@ -0,0 +1,26 @@
+from typing import List
+
+from Agent.LLM.llm import LLM
+from Agent.AsyncRuntime import AsyncRuntime
+
+
+class AsyncLLM:
+    """
+    Awaitable view of an `LLM`. Calls run on the AsyncRuntime's bounded executor, so the
+    shared transport and history of the wrapped client are reused unchanged.
+    """
+
+    def __init__(self, llm:LLM):
+        self.llm = llm
+
+    async def generate_content(self, prompts):
+        return await AsyncRuntime.run_blocking(self.llm.generate_content, prompts)
+
+    async def prompt(self, prompt):
+        return await AsyncRuntime.run_blocking(self.llm.prompt, prompt)
+
+    def add_turn(self, prompt, reply):
+        self.llm.add_turn(prompt, reply)
+
+    def get_history(self) -> List[LLM.Message]:
+        return self.llm.get_history()
@@ -1,15 +1,20 @@
 from Agent.LLM.llm import LLM
+from Agent.LLM.Transport import Transport
+from Agent.LLM.HistoryPolicy import HistoryPolicy
+from Agent.Tracing import traced
 import json
-import requests
 from typing import List
 import os
 
 
 class GeminiLLM(LLM):
     
-    GEMINI_API_KEY=os.environ["GEMINI_API_KEY"]
+    GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "")     # a missing key fails the requests, not the import
         
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+    base_url = os.environ.get("GEMINI_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash")
+    url = f"{base_url}:generateContent"
+    stream_url = f"{base_url}:streamGenerateContent?alt=sse"
+    transport = Transport.get("gemini")
     headers = {
         "x-goog-api-key": GEMINI_API_KEY,
         "Content-Type": "application/json"
@@ -19,7 +24,15 @@ class GeminiLLM(LLM):
         self.history = []
         for item in history:
             self.history.append({"role":item["role"] ,"parts":[{"text":item["content"]}]})
+        self._messages:List[LLM.Message] = list(history)   # self.history in LLM.Message form, extended lazily
+        self.policy = HistoryPolicy(
+            text_of=lambda item: item["parts"][0]["text"],
+            make=lambda role, text: {"role":role ,"parts":[{"text":text}]},
+            generate=self.generate_content,
+            backend="gemini",
+        )
         
+    @traced("gemini.generate_content")
     def generate_content(self,prompts):
         hist = []
         for prompt in prompts:
@@ -28,19 +41,22 @@ class GeminiLLM(LLM):
         payload={
             "contents":hist
         }         
-        response = requests.post(GeminiLLM.url, headers=GeminiLLM.headers, data=json.dumps(payload))
+        response = GeminiLLM.transport.post(GeminiLLM.url, headers=GeminiLLM.headers, data=json.dumps(payload))
         obj = response.json()
         model_reply = obj["candidates"][0]["content"]["parts"][0]["text"]      
         return model_reply
     
         
+    @traced("gemini.prompt")
     def prompt(self,prompt):
         self.history.append({"role":"user","parts":[{"text":prompt}]})
         payload={
-            "contents":self.history
+            "contents":self.policy.messages(self.history)
         }         
-        response = requests.post(GeminiLLM.url, headers=GeminiLLM.headers, data=json.dumps(payload))
+        response = GeminiLLM.transport.post(GeminiLLM.url, headers=GeminiLLM.headers, data=json.dumps(payload))
         obj = response.json()
+        usage = obj.get("usageMetadata", {}) if isinstance(obj, dict) else {}
+        self.policy.record_tokens(usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
         try :
             model_reply = obj["candidates"][0]["content"]["parts"][0]["text"]      
             self.history.append({"role":"model","parts":[{"text":model_reply}]})
@@ -48,11 +64,37 @@ class GeminiLLM(LLM):
         except Exception as e:
             return obj
     
+    def stream_prompt(self,prompt):
+        self.history.append({"role":"user","parts":[{"text":prompt}]})
+        payload={
+            "contents":self.policy.messages(self.history)
+        }
+        reply = []
+        usage = {}
+        with GeminiLLM.transport.post(GeminiLLM.stream_url, headers=GeminiLLM.headers, data=json.dumps(payload), stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                obj = json.loads(line[len("data:"):])
+                usage = obj.get("usageMetadata", usage)    # cumulative, the last chunk carries the totals
+                try:
+                    text = obj["candidates"][0]["content"]["parts"][0]["text"]
+                except (KeyError, IndexError):
+                    continue
+                reply.append(text)
+                yield text
+        self.policy.record_tokens(usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
+        self.history.append({"role":"model","parts":[{"text":"".join(reply)}]})
+    
+    def add_turn(self,prompt,reply):
+        self.history.append({"role":"user","parts":[{"text":prompt}]})
+        self.history.append({"role":"model","parts":[{"text":reply}]})
+    
     def get_history(self):
-        history = []
-        for item in self.history:
-            history.append(LLM.Message(role=item["role"] ,content=item["parts"][0]["text"] ))
+        for item in self.history[len(self._messages):]:
+            self._messages.append(LLM.Message(role=item["role"] ,content=item["parts"][0]["text"] ))
             
-        return history
-    
-    
\ No newline at end of file
+        return list(self._messages)
+
+
+LLM.register("gemini", lambda history, baseLLM: GeminiLLM(history))
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import time
+from typing import Callable, List, Optional
+
+from Agent.Metrics import Metrics
+
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+
+class HistoryPolicy:
+    """
+    Decides which part of a chat history is sent with each prompt.
+
+    full:    the whole history (the previous behaviour).
+    window:  the system prompt plus the last `keep_turns` turns.
+    summary: the system prompt, a running summary of older turns, then the recent turns verbatim.
+             Once `slack_turns` turns have fallen out of the window they are folded into the summary
+             in one step, so the summary grows incrementally and is not recomputed every turn.
+
+    The policy works on the backend's own message dicts through `text_of` / `make` and never
+    modifies the backend's full history, which is still what gets persisted.
+    """
+
+    MODE = os.environ.get("LLM_HISTORY_POLICY", "full")                     # full | window | summary
+    KEEP_TURNS = int(os.environ.get("LLM_HISTORY_KEEP_TURNS", 6))
+    SLACK_TURNS = int(os.environ.get("LLM_HISTORY_SLACK_TURNS", 4))
+    SUMMARIZER = os.environ.get("LLM_HISTORY_SUMMARIZER", "extractive")      # extractive | llm
+    SUMMARY_MAX_CHARS = int(os.environ.get("LLM_HISTORY_SUMMARY_MAX_CHARS", 2000))
+    LINE_MAX_CHARS = 160
+    SYSTEM_MESSAGES = 1     # the base prompt opens every history
+
+    SUMMARY_HEADER = "Summary of the earlier conversation (those turns are not repeated below):\n"
+    SUMMARIZE_INSTRUCTION = (
+        "Update the running summary of a conversation between a user and an image / 3D generation agent. "
+        "Keep what the user asked for, which images and objects were generated and stated preferences. "
+        "Answer with the updated summary only, in at most 10 short lines."
+    )
+
+    def __init__(self, text_of:Callable[[dict], str], make:Callable[[str, str], dict],
+                 generate:Optional[Callable[[List[str]], str]]=None, backend:str="",
+                 mode:Optional[str]=None, keep_turns:Optional[int]=None):
+        self.text_of = text_of
+        self.make = make
+        self.generate = generate            # the backend's generate_content, for the llm summarizer
+        self.backend = backend
+        self.mode = mode or self.MODE
+        self.keep_turns = self.KEEP_TURNS if keep_turns is None else keep_turns
+        self.summary = ""
+        self.summarized_upto = self.SYSTEM_MESSAGES     # history[SYSTEM_MESSAGES:summarized_upto] is in the summary
+        self.last_usage = {}
+
+    def messages(self, history:List[dict]) -> List[dict]:
+        """The messages to send for the current prompt, the last entry of `history`."""
+        if self.mode == "full" or len(history) <= self.SYSTEM_MESSAGES + 1:
+            sent = history
+        elif self.mode == "window":
+            sent = history[:self.SYSTEM_MESSAGES] + history[self._window_start(history):]
+        else:
+            if self.summarized_upto > len(history):        # history was replaced, start over
+                self.summary, self.summarized_upto = "", self.SYSTEM_MESSAGES
+            start = self._window_start(history)
+            if start - self.summarized_upto >= 2 * self.SLACK_TURNS:
+                self._compact(history, start)
+            sent = history[:self.SYSTEM_MESSAGES]
+            if self.summary:
+                sent = sent + [self.make("user", self.SUMMARY_HEADER + self.summary)]
+            sent = sent + history[self.summarized_upto:]
+        self._account(history, sent)
+        return sent
+
+    def _window_start(self, history:List[dict]) -> int:
+        # the current prompt plus keep_turns earlier (prompt, reply) pairs, starting on a user message
+        start = max(self.SYSTEM_MESSAGES, len(history) - 1 - 2 * self.keep_turns)
+        while start < len(history) - 1 and history[start]["role"] != "user":
+            start += 1
+        return start
+
+    def _compact(self, history:List[dict], start:int):
+        dropped = history[self.summarized_upto:start]
+        began = time.perf_counter()
+        summary = None
+        if self.SUMMARIZER == "llm" and self.generate is not None:
+            try:
+                summary = self.generate([
+                    self.SUMMARIZE_INSTRUCTION,
+                    f"Current summary:\n{self.summary or '(none)'}\n\nNew turns:\n{self._lines(dropped)}",
+                ])
+            except Exception as e:
+                logging.info(f"HistoryPolicy:SummaryFailed {e}, falling back to extractive")
+        if not isinstance(summary, str) or not summary:
+            summary = self._extractive(dropped)
+        self.summary = summary
+        self.summarized_upto = start
+        Metrics.observe("llm_history_compaction_seconds", time.perf_counter() - began, backend=self.backend)
+        Metrics.inc("llm_history_compactions_total", backend=self.backend, summarizer=self.SUMMARIZER)
+        logging.info(f"HistoryPolicy:Compacted {len(dropped)} messages, summary is {len(self.summary)} chars")
+
+    def _lines(self, messages:List[dict]) -> str:
+        lines = []
+        for message in messages:
+            text = self._condense(self.text_of(message))
+            if len(text) > self.LINE_MAX_CHARS:
+                text = text[:self.LINE_MAX_CHARS - 3] + "..."
+            lines.append(f"{message['role']}: {text}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _condense(text:str) -> str:
+        # state replies are JSON objects: keep their values, drop the syntax
+        try:
+            state = json.loads(text.strip().strip("`").lstrip("json"))
+        except ValueError:
+            state = None
+        if isinstance(state, dict):
+            text = " ".join(f"{key}={value}" for key, value in state.items())
+        return " ".join(text.split())
+
+    def _extractive(self, dropped:List[dict]) -> str:
+        """Previous summary plus one shortened line per dropped message, oldest lines cut first."""
+        summary = "\n".join(part for part in (self.summary, self._lines(dropped)) if part)
+        if len(summary) > self.SUMMARY_MAX_CHARS:
+            summary = summary[-self.SUMMARY_MAX_CHARS:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        return summary
+
+    def _account(self, history:List[dict], sent:List[dict]):
+        history_bytes = sum(len(self.text_of(m).encode("utf-8")) for m in history)
+        sent_bytes = sum(len(self.text_of(m).encode("utf-8")) for m in sent)
+        self.last_usage = {
+            "policy": self.mode,
+            "messages_total": len(history),
+            "messages_sent": len(sent),
+            "history_bytes": history_bytes,
+            "sent_bytes": sent_bytes,
+            # ~4 bytes per token for English text; record_tokens adds the backend's exact count
+            "history_tokens_est": history_bytes // 4,
+            "sent_tokens_est": sent_bytes // 4,
+        }
+        Metrics.observe("llm_history_bytes", history_bytes, buckets=PAYLOAD_BUCKETS, backend=self.backend)
+        Metrics.observe("llm_prompt_bytes", sent_bytes, buckets=PAYLOAD_BUCKETS, backend=self.backend, policy=self.mode)
+        Metrics.inc("llm_prompt_bytes_saved_total", history_bytes - sent_bytes, backend=self.backend)
+
+    def record_tokens(self, prompt_tokens, completion_tokens=None):
+        """Exact token counts reported by the backend for the last request, when it reports them."""
+        if isinstance(prompt_tokens, int):
+            self.last_usage["prompt_tokens"] = prompt_tokens
+            Metrics.observe("llm_prompt_tokens", prompt_tokens, buckets=TOKEN_BUCKETS, backend=self.backend,
+                            policy=self.mode)
+            Metrics.inc("llm_tokens_total", prompt_tokens, backend=self.backend, kind="prompt")
+        if isinstance(completion_tokens, int):
+            self.last_usage["completion_tokens"] = completion_tokens
+            Metrics.inc("llm_tokens_total", completion_tokens, backend=self.backend, kind="completion")
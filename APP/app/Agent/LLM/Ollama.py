@@ -1,11 +1,24 @@
 from Agent.LLM.llm import LLM
-import requests
+import json
+import logging
+import os
 from typing import List
 
+from Agent.LLM.Transport import Transport
+from Agent.LLM.HistoryPolicy import HistoryPolicy, TOKEN_BUCKETS
+from Agent.Metrics import Metrics
+from Agent.Tracing import traced
+
 class OllamaLLM(LLM):
-    OLLAMA_URL = "http://host.docker.internal:11434/api/chat"
+    OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://host.docker.internal:11434/api/chat")
+    transport = Transport.get("ollama")
 
     MODEL_NAME = "llama3.2:1b"  # change this to any available ollama model
+    # The base prompt opens every session's history; sent as a fixed system message the
+    # server's prompt cache can reuse its prefill across turns and sessions, as long as the
+    # model stays loaded for KEEP_ALIVE between requests.
+    PIN_SYSTEM_PROMPT = os.environ.get("OLLAMA_PIN_SYSTEM_PROMPT", "1") == "1"
+    KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
 
     def __init__(self, history: List[LLM.Message] = [] , MODEL = ""):
         self.history = []
@@ -17,7 +30,49 @@ class OllamaLLM(LLM):
                 "role": item["role"],
                 "content": item["content"]
             })
+        self._messages: List[LLM.Message] = list(history)   # self.history in LLM.Message form, extended lazily
+        self.policy = HistoryPolicy(
+            text_of=lambda item: item["content"],
+            make=lambda role, text: {"role": role, "content": text},
+            generate=self.generate_content,
+            backend="ollama",
+        )
+        self.last_timings = {}
+
+    def _payload(self, messages, stream):
+        if self.PIN_SYSTEM_PROMPT and messages:
+            messages = [{"role": "system", "content": messages[0]["content"]}] + messages[1:]
+        payload = {
+            "model": self.MODEL_NAME,
+            "stream": stream,
+            "messages": messages,
+        }
+        if self.KEEP_ALIVE:
+            payload["keep_alive"] = self.KEEP_ALIVE
+        return payload
+
+    def _record(self, obj):
+        """Records the prefill (prompt eval) and decode (eval) figures of a finished reply."""
+        if not isinstance(obj, dict):
+            return
+        self.policy.record_tokens(obj.get("prompt_eval_count"), obj.get("eval_count"))
+        self.last_timings = {
+            # durations are reported in nanoseconds; prompt_eval_count only counts tokens not served from the cache
+            key: obj[field] / 1e9 if field.endswith("duration") else obj[field]
+            for key, field in (("load_seconds", "load_duration"), ("prompt_eval_seconds", "prompt_eval_duration"),
+                               ("prompt_eval_tokens", "prompt_eval_count"), ("eval_seconds", "eval_duration"),
+                               ("eval_tokens", "eval_count"))
+            if isinstance(obj.get(field), (int, float))
+        }
+        for key in ("load_seconds", "prompt_eval_seconds", "eval_seconds"):
+            if key in self.last_timings:
+                Metrics.observe(f"ollama_{key}", self.last_timings[key], model=self.MODEL_NAME)
+        for key in ("prompt_eval_tokens", "eval_tokens"):
+            if key in self.last_timings:
+                Metrics.observe(f"ollama_{key}", self.last_timings[key], buckets=TOKEN_BUCKETS, model=self.MODEL_NAME)
+        logging.info(f"OllamaLLM:Timings {self.last_timings}")
 
+    @traced("ollama.generate_content")
     def generate_content(self, prompts):
         hist = [{"role": "user", "content": prompt} for prompt in prompts]
 
@@ -26,8 +81,10 @@ class OllamaLLM(LLM):
             "stream": False,  # ← disables streaming
             "messages": hist
         }
+        if self.KEEP_ALIVE:
+            payload["keep_alive"] = self.KEEP_ALIVE
 
-        response = requests.post(self.OLLAMA_URL, json=payload)
+        response = self.transport.post(self.OLLAMA_URL, json=payload)
         obj = response.json()
 
         try:
@@ -35,20 +92,18 @@ class OllamaLLM(LLM):
         except KeyError:
             return obj
 
+    @traced("ollama.prompt")
     def prompt(self, prompt):
         self.history.append({
             "role": "user",
             "content": prompt
         })
 
-        payload = {
-            "model": self.MODEL_NAME,
-            "stream": False,  # ← disables streaming
-            "messages": self.history
-        }
+        payload = self._payload(self.policy.messages(self.history), stream=False)
 
-        response = requests.post(self.OLLAMA_URL, json=payload)
+        response = self.transport.post(self.OLLAMA_URL, json=payload)
         obj = response.json()
+        self._record(obj)
 
         try:
             reply = obj["message"]["content"]
@@ -60,5 +115,41 @@ class OllamaLLM(LLM):
         except KeyError:
             return obj
 
+    def stream_prompt(self, prompt):
+        self.history.append({
+            "role": "user",
+            "content": prompt
+        })
+
+        payload = self._payload(self.policy.messages(self.history), stream=True)
+
+        reply = []
+        with self.transport.post(self.OLLAMA_URL, json=payload, stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):   # one JSON object per line
+                if not line:
+                    continue
+                obj = json.loads(line)
+                text = obj.get("message", {}).get("content", "")
+                if text:
+                    reply.append(text)
+                    yield text
+                if obj.get("done"):
+                    self._record(obj)
+                    break
+
+        self.history.append({
+            "role": "assistant",
+            "content": "".join(reply)
+        })
+
+    def add_turn(self, prompt, reply):
+        self.history.append({"role": "user", "content": prompt})
+        self.history.append({"role": "assistant", "content": reply})
+
     def get_history(self):
-        return [LLM.Message(role=item["role"], content=item["content"]) for item in self.history]
+        for item in self.history[len(self._messages):]:
+            self._messages.append(LLM.Message(role=item["role"], content=item["content"]))
+        return list(self._messages)
+
+
+LLM.register("llama", lambda history, baseLLM: OllamaLLM(history, MODEL=baseLLM))
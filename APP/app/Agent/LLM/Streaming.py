@@ -0,0 +1,166 @@
+import asyncio
+import json
+import queue
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+_LITERAL = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?|true|false|null")
+_decoder = json.JSONDecoder()
+
+
+class StateStreamParser:
+    """
+    Incrementally parses the top level JSON state object of a streamed LLM reply.
+
+    `feed` returns the state dict as soon as `"state"` and the fields its state requires
+    (`required`, keyed by state number as a string) are complete, or when the object closes.
+    It returns None before that and after the state has been returned once.
+    """
+
+    def __init__(self, required:Dict[str, List[str]]):
+        self.required = required
+        self.buffer = ""
+        self.pos = -1           # index just after the last complete member, -1 until "{" is seen
+        self.fields = {}
+        self.done = False
+
+    def feed(self, chunk:str) -> Optional[dict]:
+        if self.done:
+            return None
+        self.buffer += chunk
+        if self.pos < 0:
+            start = self.buffer.find("{")
+            if start < 0:
+                return None
+            self.pos = start + 1
+
+        closed = self._parse_members()
+        if closed or self._ready():
+            self.done = True
+            return dict(self.fields)
+        return None
+
+    def _ready(self) -> bool:
+        if "state" not in self.fields:
+            return False
+        try:
+            state = str(int(self.fields["state"]))
+        except (TypeError, ValueError):
+            return False
+        required = self.required.get(state)
+        return required is not None and all(name in self.fields for name in required)
+
+    def _skip(self, pos:int) -> int:
+        while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n,":
+            pos += 1
+        return pos
+
+    def _value(self, pos:int):
+        """Decodes the value at pos, returning (value, end) or None if it is not complete yet."""
+        if pos >= len(self.buffer):
+            return None
+        if self.buffer[pos] in '"{[':
+            try:
+                return _decoder.raw_decode(self.buffer, pos)
+            except json.JSONDecodeError:
+                return None
+        match = _LITERAL.match(self.buffer, pos)
+        # a literal at the end of the buffer may still be growing ("2" -> "23")
+        if match is None or match.end() >= len(self.buffer):
+            return None
+        return json.loads(match.group(0)), match.end()
+
+    def _parse_members(self) -> bool:
+        while True:
+            pos = self._skip(self.pos)
+            if pos >= len(self.buffer):
+                return False
+            if self.buffer[pos] == "}":
+                return True
+            key = self._value(pos)
+            if key is None:
+                return False
+            name, pos = key
+            pos = self._skip_colon(pos)
+            if pos is None:
+                return False
+            value = self._value(pos)
+            if value is None:
+                return False
+            self.fields[name], self.pos = value
+
+    def _skip_colon(self, pos:int) -> Optional[int]:
+        while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n":
+            pos += 1
+        if pos >= len(self.buffer) or self.buffer[pos] != ":":
+            return None
+        pos += 1
+        while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n":
+            pos += 1
+        return pos
+
+
+class StreamReader:
+    """
+    Drains a chunk iterator on a background thread so the caller can act on early chunks
+    while the rest of the reply is still arriving. Iterating yields chunks in order.
+
+    Given the running event loop, chunks are handed to that loop instead and the reader is
+    iterated with `async for`, so a coroutine awaits them without holding a thread.
+    """
+
+    _END = object()
+
+    def __init__(self, chunks:Iterable[str], loop:Optional[asyncio.AbstractEventLoop]=None):
+        self.started = time.perf_counter()
+        self.completed_after: Optional[float] = None
+        self._chunks = []
+        self._loop = loop
+        self._queue = asyncio.Queue() if loop is not None else queue.Queue()
+        self._thread = threading.Thread(target=self._drain, args=(chunks,), name="llm-stream", daemon=True)
+        self._thread.start()
+
+    def _drain(self, chunks):
+        try:
+            for chunk in chunks:
+                self._put(chunk)
+        except Exception as e:
+            self._put(e)
+        finally:
+            self.completed_after = time.perf_counter() - self.started
+            self._put(self._END)
+
+    def _put(self, item):
+        if self._loop is None:
+            self._queue.put(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            self._chunks.append(item)
+            yield item
+
+    async def __aiter__(self):
+        while True:
+            item = await self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            self._chunks.append(item)
+            yield item
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
@@ -0,0 +1,129 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Agent.Admission import Admission
+from Agent.Metrics import Metrics
+from Agent.Tracing import Tracer
+
+
+class Transport:
+    """
+    Shared HTTP transport of one LLM backend: a keep-alive connection pool with per-call
+    connect/read deadlines and bounded, jittered retries.
+
+    Generation requests are not idempotent, so only failures where the backend did no work are
+    retried: connection errors (the request never got through) and 429/502/503/504. A read
+    timeout or a 500 is raised / returned as is, since the backend may have run the generation.
+    All attempts of one call, backoff included, fit in CALL_DEADLINE seconds.
+    """
+
+    CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", 5))
+    READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", 120))
+    MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+    BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 0.5))     # seconds
+    BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 8))
+    CALL_DEADLINE = float(os.environ.get("LLM_CALL_DEADLINE", 180))   # seconds for all attempts of one call
+    POOL_CONNECTIONS = int(os.environ.get("LLM_POOL_CONNECTIONS", 4))
+    POOL_MAXSIZE = int(os.environ.get("LLM_POOL_MAXSIZE", 16))
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    _transports = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, backend:str) -> "Transport":
+        with cls._lock:
+            if backend not in cls._transports:
+                cls._transports[backend] = Transport(backend)
+            return cls._transports[backend]
+
+    def __init__(self, backend:str):
+        self.backend = backend
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.POOL_CONNECTIONS, pool_maxsize=self.POOL_MAXSIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff(self, attempt:int, retry_after=None) -> float:
+        delay = random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, min(self.BACKOFF_MAX, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    def post(self, url:str, timeout=None, **kwargs) -> requests.Response:
+        """
+        requests.Session.post with deadlines and retries. The last response or error is returned / raised.
+
+        Runs under the process wide Admission.LLM limit; a streamed response keeps its slot until it is closed.
+        """
+        with Tracer.span("llm.http", backend=self.backend):
+            Admission.LLM.acquire()
+            held = time.perf_counter()
+            try:
+                response = self._post(url, timeout, **kwargs)
+            except BaseException:
+                Admission.LLM.release(time.perf_counter() - held)
+                raise
+            if not kwargs.get("stream"):
+                Admission.LLM.release(time.perf_counter() - held)
+                return response
+            return self._release_on_close(response, held)
+
+    @staticmethod
+    def _release_on_close(response:requests.Response, held:float) -> requests.Response:
+        close = response.close
+        released = threading.Event()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released.is_set():
+                    released.set()
+                    Admission.LLM.release(time.perf_counter() - held)
+
+        response.close = close_and_release     # also what `with response:` calls on exit
+        return response
+
+    def _post(self, url:str, timeout=None, **kwargs) -> requests.Response:
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout) if timeout else (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+        connect_timeout, read_timeout = timeout
+        deadline = time.monotonic() + self.CALL_DEADLINE
+        for attempt in range(self.MAX_RETRIES + 1):
+            remaining = max(0.001, deadline - time.monotonic())
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, timeout=(min(connect_timeout, remaining), min(read_timeout, remaining)),
+                                             **kwargs)
+            except requests.ConnectionError as e:      # includes ConnectTimeout: nothing reached the backend
+                Metrics.observe("llm_request_seconds", time.perf_counter() - start, backend=self.backend, outcome="error")
+                delay = self.backoff(attempt)
+                if attempt == self.MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    raise
+                logging.info(f"Transport:{self.backend}:Retry {attempt + 1} after {type(e).__name__}")
+            except requests.Timeout:
+                # a read timeout: the backend may still be generating, sending it again would duplicate the work
+                Metrics.observe("llm_request_seconds", time.perf_counter() - start, backend=self.backend, outcome="timeout")
+                raise
+            else:
+                Metrics.observe("llm_request_seconds", time.perf_counter() - start, backend=self.backend,
+                                outcome=str(response.status_code))
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_RETRIES:
+                    return response
+                delay = self.backoff(attempt, response.headers.get("Retry-After"))
+                if time.monotonic() + delay >= deadline:
+                    return response
+                response.close()
+                logging.info(f"Transport:{self.backend}:Retry {attempt + 1} after HTTP {response.status_code}")
+            Metrics.inc("llm_retries_total", backend=self.backend)
+            time.sleep(delay)
@@ -1,7 +1,5 @@
 from abc import ABC , abstractmethod
-from typing import TypedDict , Literal ,List
-
-
+from typing import TypedDict , Literal ,List ,Iterator
 
 
 class LLM(ABC):
@@ -10,9 +8,23 @@ class LLM(ABC):
         role:Literal["model","user"]
         content:str
     
+    # backend name -> factory(history, baseLLM); a backend serves every baseLLM that contains its name
+    _backends = {}
+    
     def __init__(self,history):
         pass
     
+    @classmethod
+    def register(cls, name, factory):
+        cls._backends[name] = factory
+    
+    @classmethod
+    def create(cls, baseLLM, history) -> "LLM":
+        for name, factory in cls._backends.items():
+            if name == baseLLM or name in baseLLM:
+                return factory(history, baseLLM)
+        raise ValueError(f"No LLM backend registered for {baseLLM}")
+    
     @abstractmethod
     def generate_content(self,prompt):
         pass
@@ -21,9 +33,19 @@ class LLM(ABC):
     def prompt(self , history):
         pass
     
+    @abstractmethod
+    def stream_prompt(self, prompt)->Iterator[str]:
+        """Like prompt, but yields the reply as it is generated; the full reply joins the history once exhausted."""
+        pass
+    
     @abstractmethod
     def get_history(self)->List["LLM.Message"]:
         pass
     
+    @abstractmethod
+    def add_turn(self, prompt, reply):
+        """Appends a prompt/reply pair to the history without calling the model."""
+        pass
+    
     
     
\ No newline at end of file
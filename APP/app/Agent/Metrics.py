@@ -0,0 +1,166 @@
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Tuple
+
+# upper bounds of the default latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Cumulative bucket histogram that also keeps a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window:int=2048):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value:float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def percentile(self, q:float) -> float:
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf, plus the count and sum, read together."""
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        running, buckets = 0, []
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            buckets.append((bound, running))
+        return buckets, count, total
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class Metrics:
+    """Process wide registry of named, optionally labelled, histograms and counters."""
+
+    _histograms: Dict[Tuple, Histogram] = {}
+    _counters: Dict[Tuple, float] = {}
+    _gauges: Dict[Tuple, float] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    @classmethod
+    def histogram(cls, name:str, buckets=LATENCY_BUCKETS, **labels) -> Histogram:
+        key = cls._key(name, labels)
+        histogram = cls._histograms.get(key)
+        if histogram is None:
+            with cls._lock:
+                histogram = cls._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    @classmethod
+    def observe(cls, name:str, value:float, buckets=LATENCY_BUCKETS, **labels):
+        cls.histogram(name, buckets, **labels).observe(value)
+
+    @classmethod
+    def inc(cls, name:str, value:float=1, **labels):
+        key = cls._key(name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def set(cls, name:str, value:float, **labels):
+        """Sets a gauge, a value that goes up and down (in-flight requests, queue depth)."""
+        key = cls._key(name, labels)
+        with cls._lock:
+            cls._gauges[key] = value
+
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            histograms = dict(cls._histograms)
+            counters = dict(cls._counters)
+            gauges = dict(cls._gauges)
+        return {
+            "histograms": {cls._label(key): histogram.snapshot() for key, histogram in histograms.items()},
+            "counters": {cls._label(key): value for key, value in counters.items()},
+            "gauges": {cls._label(key): value for key, value in gauges.items()},
+        }
+
+    @staticmethod
+    def _label(key):
+        name, labels = key
+        if not labels:
+            return name
+        return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    @classmethod
+    def prometheus(cls) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with cls._lock:
+            histograms = dict(cls._histograms)
+            counters = dict(cls._counters)
+            gauges = dict(cls._gauges)
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{cls._prometheus_labels(labels)} {_number(value)}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{cls._prometheus_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            buckets, count, total = histogram.cumulative()
+            for bound, running in buckets:
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{cls._prometheus_labels(labels + (('le', le),))} {running}")
+            lines.append(f"{name}_sum{cls._prometheus_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{cls._prometheus_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _prometheus_labels(labels):
+        if not labels:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+    @classmethod
+    def handle(cls, request, path):
+        """Side server handler of GET /metrics."""
+        body = cls.prometheus().encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        if request.command != "HEAD":
+            request.wfile.write(body)
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
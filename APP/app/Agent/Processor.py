@@ -1,14 +1,27 @@
 
 from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 import json
+import os
+import threading
+import time
 from  enum import Enum
 
 # from Agent.Agent import Agent
 from Agent.Storage.DB import DB
+from Agent.LLM.llm import LLM
 from Agent.LLM.Gemini import GeminiLLM
 from Agent.LLM.Ollama import OllamaLLM
+from Agent.LLM.AsyncLLM import AsyncLLM
+from Agent.AsyncRuntime import AsyncRuntime
 from Agent.PromptManager import PromptManager
+from Agent.Cache.SemanticCache import SemanticCache
+from Agent.Metrics import Metrics
+from Agent.Tracing import Tracer
+from Agent.Events import Events
+from Agent.Storage.ArtifactStore import ArtifactStore
 
 
 
@@ -22,6 +35,48 @@ class Processor:
         MODEL= 3
         QUERY= 4
     
+    # llm: the LLM issues every state; engine: states 3 -> 0 are driven here once the image exists
+    STATE_DRIVER = os.environ.get("STATE_DRIVER", "llm")
+    SUMMARY_MODE = os.environ.get("SUMMARY_MODE", "description")   # description | llm
+    
+    # fields a state object needs before it can be dispatched, used to act on streamed replies early
+    REQUIRED_FIELDS = {
+        "0": ["summary"],
+        "1": ["data"],
+        "2": ["image"],
+        "3": [],
+        "4": ["query"],
+    }
+    
+    # start the 3D render as soon as the image exists and let the summary / exit turns run alongside it
+    OVERLAP_RENDER = os.environ.get("OVERLAP_MODEL_RENDER", "0") == "1"
+    RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", 8))
+    _render_executor:ThreadPoolExecutor = None
+    _render_executor_lock = threading.Lock()
+    
+    SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "0") == "1"
+    _semantic_cache:SemanticCache = None
+    
+    @classmethod
+    def get_semantic_cache(cls):
+        if cls._semantic_cache is None and cls.SEMANTIC_CACHE:
+            from Agent.Storage.Encoder import Encoder
+            cls._semantic_cache = SemanticCache(
+                encode=Encoder.encode,
+                threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.9)),
+                max_entries_per_session=int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 64)),
+                max_sessions=int(os.environ.get("SEMANTIC_CACHE_MAX_SESSIONS", 1024)),
+                max_bytes=int(os.environ.get("SEMANTIC_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                valid=lambda entry: ArtifactStore.available(entry.image) and ArtifactStore.available(entry.object),
+            )
+        return cls._semantic_cache
+    
+    @classmethod
+    def get_render_executor(cls):
+        with cls._render_executor_lock:
+            if cls._render_executor is None:
+                cls._render_executor = ThreadPoolExecutor(max_workers=cls.RENDER_WORKERS, thread_name_prefix="render")
+            return cls._render_executor
     
     def __init__(self,session_data,generator , session_manager ,db ,baseLLM):
         
@@ -31,22 +86,69 @@ class Processor:
         self.generator = generator
         self.prompt_mngr = PromptManager()
         self.llm = self.init_baseLLM(baseLLM)
+        self.async_llm = AsyncLLM(self.llm)
+        self.transcript = []    # (prompt, reply) turns synthesized on behalf of the LLM
+        self.render = None      # background 3D render of render_image (Future, or asyncio.Task on the async path)
+        self.render_image = ""
+        
+    def reset(self, session_data):
+        """Starts a new request: fresh outputs, no render left over from the previous one."""
+        self.session_data = session_data
+        self.transcript = []
+        self.render = None
+        self.render_image = ""
+    
+    def record_stage(self, stage, seconds):
+        self.session_data.timings[stage] = self.session_data.timings.get(stage, 0.0) + seconds
+        Metrics.observe("agent_stage_seconds", seconds, stage=stage)
+        
+    def record_state(self, state, seconds):
+        """Time spent handling a state; with STATE_DRIVER=engine, IMAGE includes the driven MODEL / EXIT steps."""
+        name = state.name.lower()
+        self.session_data.state_timings[name] = self.session_data.state_timings.get(name, 0.0) + seconds
+        Metrics.observe("agent_state_seconds", seconds, state=name)
+        
+    def publish(self, event, **data):
+        """Pushes a progress event to the client following this request, if it sent a stream id."""
+        Events.publish(self.session_data.stream_id, event, **data)
+    
+    def publish_image(self):
+        sd = self.session_data
+        if isinstance(sd.IMAGE, str) and sd.IMAGE:
+            self.publish("image", image=ArtifactStore.url(sd.IMAGE), image_description=sd.image_description,
+                         cache_hit=bool(sd.cache_hits.get("image")))
+    
+    def publish_model(self, result, hit):
+        if isinstance(result, str) and result:
+            self.publish("model", object=ArtifactStore.url(result), cache_hit=bool(hit))
         
     def init_baseLLM(self,baseLLM):    
-        if baseLLM=='gemini':
-            return GeminiLLM([])
-        if 'llama' in self.baseLLM:
-            return OllamaLLM([], MODEL=baseLLM)
+        return LLM.create(baseLLM, [])
         
         
     def process(self ,llm_response)-> str:
         try:
-            self.State = preprocess(llm_response)
+            State = preprocess(llm_response)
         except Exception as e:
             logging.info(f"Processor:ExceptionOccured:{e}")
+            self.transcript = []
             return "WRONG RESPONSE"
+        return self.process_state(State)
+    
+    def process_state(self ,State:dict)-> str:
+        """Dispatches an already parsed state object."""
+        self.transcript = []
+        self.State = State
         state = self.States((int)(self.State['state']))
-                
+        self.publish("state", state=state.name.lower())
+        start = time.perf_counter()
+        try:
+            with Tracer.span(f"state.{state.name.lower()}", state=state.name.lower()):
+                return self.dispatch(state)
+        finally:
+            self.record_state(state, time.perf_counter() - start)
+    
+    def dispatch(self, state)-> str:
         if state == self.States.EXIT:
             return self.exit()
         
@@ -54,7 +156,10 @@ class Processor:
             return self.recall_from_memory()
         
         elif state == self.States.IMAGE:
-            return self.generate_image()   
+            response = self.generate_image()
+            if self.STATE_DRIVER == "engine" and response == "IMAGE GENERATED":
+                return self.drive_to_exit(response)
+            return response
         
         elif state == self.States.MODEL:
             return self.generate_model()
@@ -74,21 +179,34 @@ class Processor:
         intent = self.State["data"]["intent"]
         refered_image_description=self.db.get_image_description(intent=intent)
         self.session_data.set(image_description=refered_image_description)
+        self.publish("recall", image_description=refered_image_description)
         return refered_image_description
     
     def process_query(self):
         logging.info("Processor:OricesingQuery")
         self.session_data.set(message = self.State["query"])
+        self.publish("message", message=self.State["query"])
         return "EXIT"
     
     def generate_image(self):
         logging.info("Processor:GeneratingImage")
         try :
             image_intent = self.State['image']
+            self.session_data.image_intent = image_intent
+            if self.semantic_lookup(image_intent):
+                return "IMAGE GENERATED"
+            
+            start = time.perf_counter()
             image_description = self.llm.generate_content([self.prompt_mngr.get('ImagePrompt') , image_intent])
+            self.record_stage("image_description", time.perf_counter() - start)
             
             self.session_data.set(image_description=image_description)
+            start = time.perf_counter()
             self.session_data.set(IMAGE = self.generator.generate_image(image_description))
+            self.record_stage("image", time.perf_counter() - start)
+            self.session_data.cache_hits["image"] = self.generator.last_hit()
+            self.publish_image()
+            self.start_render()
             
             logging.info("Processor:ImageGenerated")
             return "IMAGE GENERATED"
@@ -99,14 +217,296 @@ class Processor:
     def generate_model(self):
         logging.info("Processor:GeneratingModel")
         try :
+            if self.model_from_semantic_hit():
+                return "MODEL GENERATED"
+            if self.rendering():
+                logging.info("Processor:ModelRenderingInBackground")
+                return "MODEL GENERATED"
+            
+            start = time.perf_counter()
             self.session_data.set(OBJECT= self.generator.generate_3drender(self.session_data.IMAGE))
+            self.record_stage("render", time.perf_counter() - start)
+            self.session_data.cache_hits["object"] = self.generator.last_hit()
+            self.publish_model(self.session_data.OBJECT, self.session_data.cache_hits["object"])
+            self.remember_generation()
+            logging.info("Processor:ModelGenerated")
+            return "MODEL GENERATED"
+        except Exception as e:
+            logging.info(f"Eror in model generation {e}")
+            return "FAILED"
+    
+    def semantic_lookup(self, image_intent) -> bool:
+        semantic_cache = self.get_semantic_cache()
+        if semantic_cache is None:
+            return False
+        entry = semantic_cache.lookup(self.session_data.session_id, image_intent)
+        if entry is None:
+            return False
+        logging.info("Processor:SemanticCacheHit")
+        self.session_data.semantic_hit = entry
+        self.session_data.set(image_description=entry.image_description, IMAGE=entry.image)
+        self.session_data.cache_hits["image"] = True
+        self.publish_image()
+        return True
+    
+    def model_from_semantic_hit(self) -> bool:
+        hit = self.session_data.semantic_hit
+        if hit is None or hit.image != self.session_data.IMAGE:
+            return False
+        self.session_data.set(OBJECT=hit.object)
+        self.session_data.cache_hits["object"] = True
+        self.publish_model(hit.object, True)
+        logging.info("Processor:ModelFromSemanticCache")
+        return True
+    
+    def drive_to_exit(self, image_response):
+        """Runs the mandatory MODEL -> EXIT transitions without asking the LLM for them."""
+        logging.info("Processor:DrivingToExit")
+        self.transcript.append((image_response, json.dumps({"state": "3"})))
+        model_response = self.generate_model()
+        if model_response != "MODEL GENERATED":
+            return model_response    # hand the failure back to the LLM as if it had asked for state 3
+        
+        return self.synthesized_exit(model_response, self.synthesize_summary())
+    
+    def synthesized_exit(self, model_response, summary):
+        self.State = {"state": "0", "summary": summary}
+        self.transcript.append((model_response, json.dumps(self.State)))
+        return self.exit()
+    
+    def synthesize_summary(self):
+        sd = self.session_data
+        if self.SUMMARY_MODE == "llm":
+            try:
+                start = time.perf_counter()
+                summary = self.llm.generate_content(self.summary_prompt())
+                self.record_stage("summary", time.perf_counter() - start)
+                return summary
+            except Exception as e:
+                logging.info(f"Processor:SummaryFailed {e}")
+        return sd.image_description
+    
+    def summary_prompt(self):
+        sd = self.session_data
+        return [self.prompt_mngr.get('SummaryPrompt'), f"{sd.image_intent}\n{sd.image_description}"]
+    
+    # ------------------------------------------------------------------
+    # asyncio path: same transitions, awaiting the LLM and the generator instead of blocking on them
+    
+    async def process_async(self ,llm_response)-> str:
+        try:
+            State = preprocess(llm_response)
+        except Exception as e:
+            logging.info(f"Processor:ExceptionOccured:{e}")
+            self.transcript = []
+            return "WRONG RESPONSE"
+        return await self.process_state_async(State)
+    
+    async def process_state_async(self ,State:dict)-> str:
+        self.transcript = []
+        self.State = State
+        state = self.States((int)(self.State['state']))
+        self.publish("state", state=state.name.lower())
+        start = time.perf_counter()
+        try:
+            with Tracer.span(f"state.{state.name.lower()}", state=state.name.lower()):
+                return await self.dispatch_async(state)
+        finally:
+            self.record_state(state, time.perf_counter() - start)
+    
+    async def dispatch_async(self, state)-> str:
+        if state == self.States.EXIT:
+            return self.exit()
+        
+        elif state == self.States.MEM_RECALL:
+            return await AsyncRuntime.run_blocking(self.recall_from_memory)
+        
+        elif state == self.States.IMAGE:
+            response = await self.generate_image_async()
+            if self.STATE_DRIVER == "engine" and response == "IMAGE GENERATED":
+                return await self.drive_to_exit_async(response)
+            return response
+        
+        elif state == self.States.MODEL:
+            return await self.generate_model_async()
+        
+        elif state == self.States.QUERY:
+            return self.process_query()
+    
+    async def generate_image_async(self):
+        logging.info("Processor:GeneratingImage")
+        try :
+            image_intent = self.State['image']
+            self.session_data.image_intent = image_intent
+            if await AsyncRuntime.run_blocking(self.semantic_lookup, image_intent):    # encodes the intent
+                return "IMAGE GENERATED"
+            
+            start = time.perf_counter()
+            image_description = await self.async_llm.generate_content([self.prompt_mngr.get('ImagePrompt') , image_intent])
+            self.record_stage("image_description", time.perf_counter() - start)
+            
+            self.session_data.set(image_description=image_description)
+            start = time.perf_counter()
+            self.session_data.set(IMAGE = await self.generator.generate_image_async(image_description))
+            self.record_stage("image", time.perf_counter() - start)
+            self.session_data.cache_hits["image"] = self.generator.last_hit()
+            self.publish_image()
+            self.start_render_async()
+            
+            logging.info("Processor:ImageGenerated")
+            return "IMAGE GENERATED"
+        except Exception as e:
+            logging.info(f"Error in model generation {e}")
+            return "FAILED"
+    
+    async def generate_model_async(self):
+        logging.info("Processor:GeneratingModel")
+        try :
+            if self.model_from_semantic_hit():
+                return "MODEL GENERATED"
+            if self.rendering():
+                logging.info("Processor:ModelRenderingInBackground")
+                return "MODEL GENERATED"
+            
+            start = time.perf_counter()
+            self.session_data.set(OBJECT= await self.generator.generate_3drender_async(self.session_data.IMAGE))
+            self.record_stage("render", time.perf_counter() - start)
+            self.session_data.cache_hits["object"] = self.generator.last_hit()
+            self.publish_model(self.session_data.OBJECT, self.session_data.cache_hits["object"])
+            await AsyncRuntime.run_blocking(self.remember_generation)
             logging.info("Processor:ModelGenerated")
             return "MODEL GENERATED"
         except Exception as e:
             logging.info(f"Eror in model generation {e}")
             return "FAILED"
     
+    async def drive_to_exit_async(self, image_response):
+        logging.info("Processor:DrivingToExit")
+        self.transcript.append((image_response, json.dumps({"state": "3"})))
+        model_response = await self.generate_model_async()
+        if model_response != "MODEL GENERATED":
+            return model_response
+        
+        summary = self.session_data.image_description
+        if self.SUMMARY_MODE == "llm":
+            try:
+                start = time.perf_counter()
+                summary = await self.async_llm.generate_content(self.summary_prompt())
+                self.record_stage("summary", time.perf_counter() - start)
+            except Exception as e:
+                logging.info(f"Processor:SummaryFailed {e}")
+        return self.synthesized_exit(model_response, summary)
+    
+    # ------------------------------------------------------------------
+    # overlapped 3D render: started once IMAGE is set, joined by the Agent right before EXIT returns
+    
+    def should_render(self):
+        image = self.session_data.IMAGE
+        return self.OVERLAP_RENDER and self.session_data.semantic_hit is None and isinstance(image, str) and bool(image)
+    
+    def rendering(self):
+        return self.render is not None and self.render_image == self.session_data.IMAGE
+    
+    def start_render(self):
+        if not self.should_render() or self.rendering():
+            return
+        self.drop_render()
+        logging.info("Processor:StartingBackgroundRender")
+        self.render_image = self.session_data.IMAGE
+        self.render = self.get_render_executor().submit(Tracer.wrap(self.timed_render), self.render_image)
+    
+    def timed_render(self, image):
+        start = time.perf_counter()
+        result = self.generator.generate_3drender(image)
+        if image == self.session_data.IMAGE:     # not for an image a later IMAGE state replaced
+            self.publish_model(result, self.generator.last_hit())     # as soon as it exists, not when EXIT joins it
+        return result, self.generator.last_hit(), time.perf_counter() - start    # last_hit of the render thread
+    
+    def join_render(self):
+        if self.render is None:
+            return
+        render, self.render = self.render, None
+        start = time.perf_counter()
+        try:
+            outcome = render.result()
+        except Exception as e:
+            outcome = (e, False, None)
+        self.finish_render(outcome, time.perf_counter() - start)
+        self.remember_generation()
+    
+    def start_render_async(self):
+        if not self.should_render() or self.rendering():
+            return
+        self.drop_render_async()
+        logging.info("Processor:StartingBackgroundRender")
+        self.render_image = self.session_data.IMAGE
+        self.render = asyncio.ensure_future(self.timed_render_async(self.render_image))
+    
+    async def timed_render_async(self, image):
+        start = time.perf_counter()
+        result = await self.generator.generate_3drender_async(image)
+        if image == self.session_data.IMAGE:
+            self.publish_model(result, self.generator.last_hit())
+        return result, self.generator.last_hit(), time.perf_counter() - start
+    
+    async def join_render_async(self):
+        if self.render is None:
+            return
+        render, self.render = self.render, None
+        start = time.perf_counter()
+        try:
+            outcome = await render
+        except Exception as e:
+            outcome = (e, False, None)
+        self.finish_render(outcome, time.perf_counter() - start)
+        await AsyncRuntime.run_blocking(self.remember_generation)
+    
+    def drop_render(self):
+        """A later IMAGE state replaced the image: cancels the earlier render, or waits it out if it already runs."""
+        if self.render is None:
+            return
+        render, self.render = self.render, None
+        logging.info("Processor:DroppingBackgroundRender")
+        if render.cancel():
+            return
+        start = time.perf_counter()
+        try:
+            render.result()
+        except Exception as e:
+            logging.info(f"Processor:DroppedRenderFailed {e}")
+        self.record_stage("render_wait", time.perf_counter() - start)
+    
+    def drop_render_async(self):
+        if self.render is None:
+            return
+        render, self.render = self.render, None
+        logging.info("Processor:DroppingBackgroundRender")
+        if not render.done():
+            render.cancel()
+        elif not render.cancelled() and render.exception() is not None:
+            logging.info(f"Processor:DroppedRenderFailed {render.exception()}")
+    
+    def finish_render(self, outcome, waited):
+        result, hit, elapsed = outcome
+        logging.info(f"Processor:JoinedBackgroundRender after waiting {waited:.3f}s")
+        self.record_stage("render_wait", waited)
+        if elapsed is not None:
+            self.record_stage("render", elapsed)
+        if isinstance(result, Exception):
+            logging.info(f"Processor:BackgroundRenderFailed {result}")
+            self.session_data.cache_hits["object"] = False
+            self.session_data.set(message=f"The 3D model could not be generated: {result}")
+            return
+        self.session_data.set(OBJECT=result)
+        self.session_data.cache_hits["object"] = hit
     
+    def remember_generation(self):
+        sd = self.session_data
+        semantic_cache = self.get_semantic_cache()
+        if semantic_cache is None or not sd.image_intent:
+            return
+        if isinstance(sd.IMAGE, str) and isinstance(sd.OBJECT, str) and sd.IMAGE and sd.OBJECT:
+            semantic_cache.store(sd.session_id, sd.image_intent, sd.image_description, sd.IMAGE, sd.OBJECT)
     
 
 
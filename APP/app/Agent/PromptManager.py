@@ -21,6 +21,7 @@ class PromptManager:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         Baseprompt_path = os.path.join(base_dir, "Prompts", "BasePrompt.txt")
         Imageprompt_path = os.path.join(base_dir, "Prompts", "ImagePrompt.txt")
+        Summaryprompt_path = os.path.join(base_dir, "Prompts", "SummaryPrompt.txt")
         
         with open(Baseprompt_path,"r") as f:
             content = f.read()
@@ -30,3 +31,7 @@ class PromptManager:
             content = f.read()
             cls._prompts["ImagePrompt"] = content
 
+        with open(Summaryprompt_path,"r") as f:
+            content = f.read()
+            cls._prompts["SummaryPrompt"] = content
+
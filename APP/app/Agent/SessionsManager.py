@@ -1,60 +1,220 @@
+import atexit
 import logging
+import os
+import threading
+import time
+from collections import deque
 
 from Agent.LLM.llm import LLM
-from Agent.Storage.VectorDB import VectorDB
-from Agent.Storage.DB import DB
+from Agent.Storage.DB import DB, get_db
 from Agent.PromptManager import PromptManager
+from Agent.Cache.LRUCache import LRUCache
 import uuid
 
+
+class CachedSession:
+    def __init__(self, history, username="", image_desc="", summary=""):
+        self.history = history
+        self.username = username
+        self.image_desc = image_desc
+        self.summary = summary
+        self.dirty = False          # history changed since it was last written to the DB
+
+    def persistable(self):
+        # sessions are only indexed once they carry an image description
+        return bool(self.image_desc)
+
+    def size(self):
+        return sum(len(item["content"]) for item in self.history) + len(self.image_desc) + len(self.summary)
+
+
 class SessionManager:
-    _sessions ={}
-    _db:DB = VectorDB()
+    MAX_SESSIONS = int(os.environ.get("SESSION_CACHE_MAX_SESSIONS", 1024))
+    MAX_BYTES = int(os.environ.get("SESSION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    TTL = float(os.environ.get("SESSION_CACHE_TTL", 0))                          # seconds, 0 disables
+    CHECKPOINT_INTERVAL = float(os.environ.get("SESSION_CHECKPOINT_INTERVAL", 300))  # seconds, 0 disables
+
+    _sessions = LRUCache(
+        max_items=MAX_SESSIONS,
+        max_bytes=MAX_BYTES,
+        ttl=TTL,
+        sizeof=CachedSession.size,
+        on_evict=lambda session_id, session: SessionManager._on_evict(session_id, session),
+    )
     _prompt_manager=PromptManager()
-    
+    _lock = threading.RLock()
+    _checkpointer = None
+    _evicted = deque()      # (session_id, session) evicted from the cache, flushed once the caller released _lock
+    _unflushed = {}         # session_id -> evicted session whose flush failed, retried at every checkpoint
+    flushes = 0
+    flush_errors = 0
+
     def __init__(self):
         pass
-    
+
+    @classmethod
+    def _on_evict(cls, session_id, session:CachedSession):
+        # runs inside put, possibly under _lock: only queue the session, DB I/O happens in _flush_evicted
+        logging.info(f"SessionManager:Evicted {session_id}")
+        cls._evicted.append((session_id, session))
+
+    @classmethod
+    def _flush_evicted(cls):
+        """Writes the sessions evicted meanwhile; a failed one is kept in _unflushed instead of being lost."""
+        while cls._evicted:
+            try:
+                session_id, session = cls._evicted.popleft()
+            except IndexError:
+                return
+            if not cls.flush(session_id, session):
+                with cls._lock:
+                    cls._unflushed[session_id] = session
+
     @classmethod
     def add_session(cls,session_id):
+        cls.start_checkpointer()
         if session_id: #LOADING EXISTING SESSION (assumed that the session_id is a valid previous session's id)
             cls.load_session_history(session_id)
         else :        # NEW SESSION CREATED
             session_id = cls.generate_session_id()
             logging.info(f"NEW Session initiated : {session_id}")
-            cls._sessions[session_id] = [LLM.Message(role='user',content=cls._prompt_manager.get_base_prompt())]
+            cls._sessions.put(session_id, CachedSession(cls.new_session_history()))
+            cls._flush_evicted()
         return session_id
-                    
+
     @classmethod
     def generate_session_id(cls):
         return str(uuid.uuid4())
-    
+
+    @classmethod
+    def new_session_history(cls):
+        return [LLM.Message(role='user',content=cls._prompt_manager.get_base_prompt())]
+
     @classmethod
     def load_session_history(cls,session_id):
         if session_id not in cls._sessions:
             logging.info("loading session form DATABASE")
-            cls._sessions[session_id] = cls.get_session_history(session_id=session_id)
-            
+            cls.get_session_history(session_id=session_id)
+
     @classmethod
     def get_session_history(cls,session_id):
-        if session_id in cls._sessions:
-            if len(cls._sessions[session_id])==1:
+        session:CachedSession = cls._sessions.get(session_id)
+        if session is not None:
+            if len(session.history)==1:
                 logging.info("Initiating new session history")
             else:
                 logging.info("Loading session history from memory")
-            return cls._sessions[session_id]
-        
+            return session.history
+
+        cls._flush_evicted()
+        with cls._lock:
+            session = cls._unflushed.pop(session_id, None)
+        if session is not None:
+            # evicted but not written yet: the DB copy is stale, bring the session back still dirty
+            logging.info("Loading session history from the unflushed sessions")
+            cls._sessions.put(session_id, session)
+            cls._flush_evicted()
+            return session.history
+
         logging.info("Loading session history from DATABASE")
-        return cls._db.get_conversation_history(session_id=session_id)
-    
+        try:
+            history = get_db().get_conversation_history(session_id=session_id)
+        except Exception as e:
+            # sessions evicted before they were ever indexed have nothing in the DB
+            logging.info(f"SessionManager:SessionNotFound {session_id} ({e}), starting new history")
+            history = cls.new_session_history()
+        cls._sessions.put(session_id, CachedSession(history))
+        cls._flush_evicted()
+        return history
+
     @classmethod
     def set_session_history(cls,session_id , history):
         logging.info(f"session history modified: {session_id}")
-        cls._sessions[session_id] =history         
-    
+        with cls._lock:
+            session:CachedSession = cls._sessions.pop(session_id) or CachedSession(history)
+            session.history = history
+            session.dirty = session.persistable()
+            cls._sessions.put(session_id, session)
+        cls._flush_evicted()
+
     @classmethod
     def save_session(cls,username,session_id , image_desc , summary):
+        """
+        Records the session's image description and summary. A new description or summary is written
+        to the DB (and its embedding to the index) right away, so MEM_RECALL finds it in the next request;
+        otherwise the session is only marked dirty and written on eviction or at the next checkpoint.
+        """
         logging.info(f"SessionManager:SaveSession {session_id}")
-        cls._db.save_session(username=username, session_id=session_id,image_desc=image_desc,history=cls._sessions[session_id],summary=summary)
+        with cls._lock:
+            session:CachedSession = cls._sessions.pop(session_id) or CachedSession(cls.new_session_history())
+            indexed_changed = session.image_desc != image_desc or session.summary != summary
+            session.username = username
+            session.image_desc = image_desc
+            session.summary = summary
+            session.dirty = True
+            cls._sessions.put(session_id, session)
+        cls._flush_evicted()
+        if indexed_changed:
+            cls.flush(session_id, session)
+
+    @classmethod
+    def flush(cls, session_id, session:CachedSession) -> bool:
+        """Writes the session if it is dirty. Returns False if the write failed; the session stays dirty."""
+        with cls._lock:
+            if not (session.dirty and session.persistable()):
+                return True
+            session.dirty = False
+            history = list(session.history)
+        try:
+            get_db().save_session(username=session.username, session_id=session_id, image_desc=session.image_desc,
+                                 history=history, summary=session.summary)
+            cls.flushes += 1
+            return True
+        except Exception as e:
+            cls.flush_errors += 1
+            session.dirty = True
+            logging.error(f"SessionManager:FlushFailed {session_id}: {e}")
+            return False
+
+    @classmethod
+    def checkpoint(cls):
+        logging.info("SessionManager:Checkpoint")
+        cls._sessions.expire()
+        cls._flush_evicted()
+        for session_id, session in cls._sessions.items():
+            cls.flush(session_id, session)
+        with cls._lock:
+            unflushed = list(cls._unflushed.items())
+        for session_id, session in unflushed:
+            if cls.flush(session_id, session):
+                with cls._lock:
+                    if cls._unflushed.get(session_id) is session:
+                        del cls._unflushed[session_id]
+
+    @classmethod
+    def start_checkpointer(cls):
+        with cls._lock:
+            if cls._checkpointer is not None or not cls.CHECKPOINT_INTERVAL:
+                return
+            def run():
+                while True:
+                    time.sleep(cls.CHECKPOINT_INTERVAL)
+                    try:
+                        cls.checkpoint()
+                    except Exception as e:
+                        logging.error(f"SessionManager:CheckpointFailed {e}")
+            cls._checkpointer = threading.Thread(target=run, name="session-checkpoint", daemon=True)
+            cls._checkpointer.start()
+            atexit.register(cls.checkpoint)
+
+    @classmethod
+    def stats(cls):
+        stats = cls._sessions.stats()
+        stats["dirty"] = sum(1 for _, session in cls._sessions.items() if session.dirty)
+        stats["flushes"] = cls.flushes
+        stats["flush_errors"] = cls.flush_errors
+        stats["unflushed"] = len(cls._unflushed)
+        return stats
 
 class SessionData:
     def __init__(self,session_id,username):
@@ -67,6 +227,13 @@ class SessionData:
         self.image_description:str = ""
         self.summary:str = ""
         self.current_prompt=""
+        self.cache_hits = {}     # artifact ("image" / "object") -> served from cache
+        self.image_intent:str = ""
+        self.semantic_hit = None  # SemanticEntry reused for this request, if any
+        self.timings = {}         # stage -> seconds spent on it in this request
+        self.state_timings = {}   # state ("image", "model", ...) -> seconds spent handling it in this request
+        self.usage = {}           # prompt bytes / tokens sent to the LLM in this request
+        self.stream_id = None     # Events stream the client follows this request's progress on, if any
         
     def set(self,message="",IMAGE ="" , OBJECT="", image_description="",summary="" , current_prompt="",history=[]):
         if message:
@@ -78,7 +245,7 @@ class SessionData:
         if image_description:
             self.image_description = image_description
         if summary:
-            self.sumary = summary
+            self.summary = summary
         if current_prompt:
             self.current_prompt= current_prompt
         if len(history):
@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from Agent.Metrics import Metrics
+
+
+class Startup:
+    """
+    Startup phases of the process and its readiness signal.
+
+    Storage and the embedding model initialise lazily on first use; `warm_up` front-loads them on a
+    background thread so the first request does not pay for them, and sets `ready` once they are up.
+    """
+
+    WARM_UP = os.environ.get("STARTUP_WARM_UP", "1") == "1"
+
+    ready = threading.Event()
+    timings = {}        # phase -> seconds
+    errors = {}         # phase -> error message
+    _thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, phase, seconds):
+        cls.timings[phase] = seconds
+        Metrics.observe("startup_phase_seconds", seconds, phase=phase)
+        logging.info(f"Startup:{phase} took {seconds:.3f}s")
+
+    @classmethod
+    @contextmanager
+    def phase(cls, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            cls.errors[phase] = str(e)
+            logging.error(f"Startup:{phase} failed: {e}")
+            raise
+        finally:
+            cls.record(phase, time.perf_counter() - start)
+
+    @classmethod
+    def warm_up(cls):
+        """Starts the background warm-up once. With STARTUP_WARM_UP=0 readiness is signalled immediately."""
+        with cls._lock:
+            if cls._thread is not None or cls.ready.is_set():
+                return
+            if not cls.WARM_UP:
+                cls.ready.set()
+                return
+            cls._thread = threading.Thread(target=cls._warm_up, name="startup-warm-up", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _warm_up(cls):
+        from Agent.Storage.DB import get_db
+        from Agent.Storage.Encoder import Encoder
+
+        try:
+            with cls.phase("model_load"):     # every DB backend embeds with it, and so does the semantic cache
+                Encoder.get_cache()
+            with cls.phase("db_connect"):
+                get_db()
+        except Exception:
+            return    # logged by phase; stays not ready, requests retry the lazy initialisation themselves
+        cls.ready.set()
+        logging.info(f"Startup:Ready {cls.timings}")
+
+    @classmethod
+    def status(cls):
+        return {"ready": cls.ready.is_set(), "timings": dict(cls.timings), "errors": dict(cls.errors)}
+
+    @classmethod
+    def handle(cls, request, path):
+        """Side server handler of GET /ready: 200 once warmed up, 503 before."""
+        body = json.dumps(cls.status()).encode("utf-8")
+        request.send_response(200 if cls.ready.is_set() else 503)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        if request.command != "HEAD":
+            request.wfile.write(body)
@@ -0,0 +1,192 @@
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from Agent.Metrics import Metrics
+from core.http_server import SideServer, send_file
+
+
+class ArtifactStore:
+    """
+    Content addressed store of generated artifacts (images, 3D objects) as raw bytes on disk.
+
+    An artifact id is the SHA-256 of its bytes plus its extension (`<sha256>.png`), stored once
+    as `<dir>/<id[:2]>/<id>`. Responses carry the id or its download URL instead of the bytes,
+    which the side HTTP server streams from the file with Range support.
+
+    The store is bounded by ARTIFACT_STORE_MAX_BYTES: once it grows past that, the least recently
+    stored or read artifacts are deleted. Recency survives restarts through the files' mtime.
+    Holders of an id (caches, old responses) must check `exists` before relying on it.
+    """
+
+    PATH = os.environ.get("ARTIFACT_STORE_DIR", "datastore/artifacts")
+    MAX_BYTES = int(os.environ.get("ARTIFACT_STORE_MAX_BYTES", 4 * 1024 * 1024 * 1024))
+    # base of the download URLs handed to clients: the side server's public URL unless served elsewhere (e.g. a CDN)
+    BASE_URL = os.environ.get("ARTIFACT_BASE_URL", SideServer.PUBLIC_URL).rstrip("/")
+    ROUTE = "/artifacts/"
+
+    CONTENT_TYPES = {
+        "png": "image/png",
+        "jpg": "image/jpeg",
+        "glb": "model/gltf-binary",
+    }
+    _ID = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+    _lock = threading.Lock()
+    _entries: "Optional[OrderedDict[str, int]]" = None     # artifact id -> size, least recently used first
+    _bytes = 0
+    evictions = 0
+
+    @classmethod
+    def _index(cls) -> "OrderedDict[str, int]":
+        """The artifacts on disk, scanned on first use. Caller holds the lock."""
+        if cls._entries is None:
+            files = []
+            os.makedirs(cls.PATH, exist_ok=True)
+            for root, _, names in os.walk(cls.PATH):
+                for name in names:
+                    file = os.path.join(root, name)
+                    if name.endswith(".tmp"):
+                        os.remove(file)
+                        continue
+                    if cls.is_id(name):
+                        stat = os.stat(file)
+                        files.append((stat.st_mtime, name, stat.st_size))
+            cls._entries = OrderedDict((name, size) for _, name, size in sorted(files))
+            cls._bytes = sum(cls._entries.values())
+            logging.info(f"ArtifactStore:Loaded {len(cls._entries)} artifacts ({cls._bytes} bytes)")
+        return cls._entries
+
+    @classmethod
+    def put(cls, data:bytes, extension:str) -> str:
+        """Writes the bytes unless an identical artifact exists and returns its id."""
+        artifact_id = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        if cls.touch(artifact_id):
+            return artifact_id
+        file = cls.path(artifact_id)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = f"{file}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, file)
+        with cls._lock:
+            entries = cls._index()
+            cls._bytes += len(data) - entries.pop(artifact_id, 0)
+            entries[artifact_id] = len(data)
+            evicted = cls._evict(entries)
+        for old_id in evicted:
+            try:
+                os.remove(cls.path(old_id))
+            except OSError:
+                pass
+        logging.info(f"ArtifactStore:Stored {artifact_id} ({len(data)} bytes)")
+        return artifact_id
+
+    @classmethod
+    def _evict(cls, entries) -> list:
+        """Drops least recently used ids until the store fits its budget, never the newest one. Caller holds the lock."""
+        evicted = []
+        while cls._bytes > cls.MAX_BYTES and len(entries) > 1:
+            old_id, size = entries.popitem(last=False)
+            cls._bytes -= size
+            evicted.append(old_id)
+        if evicted:
+            cls.evictions += len(evicted)
+            Metrics.inc("artifact_store_evictions_total", len(evicted))
+            logging.info(f"ArtifactStore:Evicted {len(evicted)} artifacts")
+        Metrics.set("artifact_store_bytes", cls._bytes)
+        return evicted
+
+    @classmethod
+    def touch(cls, artifact_id:str) -> bool:
+        """Marks an artifact as recently used; False if it is not (or no longer) stored."""
+        with cls._lock:
+            entries = cls._index()
+            if artifact_id not in entries:
+                return False
+            entries.move_to_end(artifact_id)
+        try:
+            os.utime(cls.path(artifact_id))
+        except OSError:
+            cls._forget(artifact_id)
+            return False
+        return True
+
+    @classmethod
+    def exists(cls, artifact_id) -> bool:
+        with cls._lock:
+            return cls.is_id(artifact_id) and artifact_id in cls._index()
+
+    @classmethod
+    def available(cls, value) -> bool:
+        """False only for artifact ids that are gone; other values (inline payloads, failures) are passed on as they are."""
+        return not cls.is_id(value) or cls.exists(value)
+
+    @classmethod
+    def _forget(cls, artifact_id:str):
+        with cls._lock:
+            cls._bytes -= cls._index().pop(artifact_id, 0)
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            entries = cls._index()
+            return {"items": len(entries), "bytes": cls._bytes, "max_bytes": cls.MAX_BYTES, "evictions": cls.evictions}
+
+    @classmethod
+    def is_id(cls, value) -> bool:
+        return isinstance(value, str) and cls._ID.match(value) is not None
+
+    @classmethod
+    def path(cls, artifact_id:str) -> str:
+        return os.path.join(cls.PATH, artifact_id[:2], artifact_id)
+
+    @classmethod
+    def get(cls, artifact_id:str) -> Optional[bytes]:
+        if not cls.touch(artifact_id):
+            return None
+        try:
+            with open(cls.path(artifact_id), "rb") as f:
+                return f.read()
+        except OSError:
+            cls._forget(artifact_id)
+            return None
+
+    @classmethod
+    def base64(cls, artifact_id:str) -> Optional[str]:
+        """The artifact as base64, for Openfabric apps that take their input inline."""
+        data = cls.get(artifact_id)
+        return base64.b64encode(data).decode("utf-8") if data is not None else None
+
+    @classmethod
+    def url(cls, artifact_id) -> str:
+        """Download URL of an artifact id; anything else (empty, failures) is passed through."""
+        if not cls.is_id(artifact_id):
+            return artifact_id
+        return f"{cls.BASE_URL}{cls.ROUTE}{artifact_id}"
+
+    @classmethod
+    def handle(cls, request, path:str):
+        """Side server handler of GET/HEAD /artifacts/<id>[?download=1]."""
+        artifact_id, _, query = path[len(cls.ROUTE):].partition("?")
+        if not cls.is_id(artifact_id) or not cls.touch(artifact_id):
+            request.send_error(404, "Artifact not found")
+            return
+        extension = artifact_id.rsplit(".", 1)[1]
+        try:
+            sent = send_file(
+                request,
+                cls.path(artifact_id),
+                content_type=cls.CONTENT_TYPES.get(extension, "application/octet-stream"),
+                etag=artifact_id,
+                filename=f"{artifact_id[:12]}.{extension}" if "download=1" in query else None,
+            )
+        except FileNotFoundError:      # evicted between the lookup and the read
+            cls._forget(artifact_id)
+            request.send_error(404, "Artifact not found")
+            return
+        Metrics.inc("artifact_bytes_served_total", sent, type=extension)
@@ -0,0 +1,69 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from Agent.Metrics import Metrics, SIZE_BUCKETS
+
+
+class BatchEncoder:
+    """
+    Collects concurrent `encode` calls for up to `window` seconds (or `max_batch` texts)
+    and runs them through the model as one batched forward pass.
+
+    Each caller blocks on its own future and receives its own vector.
+    """
+
+    def __init__(self, model, window:float=0.002, max_batch:int=32):
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+        self._worker.start()
+
+    def encode(self, text:str):
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                Metrics.observe("encoder_queue_seconds", started - enqueued)
+
+            # identical texts queued together are encoded once
+            unique = list(dict.fromkeys(text for text, _, _ in batch))
+            Metrics.observe("encoder_batch_size", len(unique), buckets=SIZE_BUCKETS)
+            try:
+                vectors = dict(zip(unique, self.model.encode(unique, batch_size=len(unique))))
+                for text, future, _ in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                logging.error(f"BatchEncoder:EncodeFailed {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            Metrics.observe("encoder_batch_seconds", time.perf_counter() - started)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "batch_size": Metrics.histogram("encoder_batch_size", SIZE_BUCKETS).snapshot(),
+            "queue_seconds": Metrics.histogram("encoder_queue_seconds").snapshot(),
+        }
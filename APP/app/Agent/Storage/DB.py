@@ -1,4 +1,6 @@
 from abc import ABC , abstractmethod
+import os
+import threading
 
 
 class DB(ABC):
@@ -20,3 +22,27 @@ class DB(ABC):
     def get_conversation_history(self,intent,session_id):
         pass
 
+
+
+_db:DB = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> DB:
+    """
+    The storage backend selected by the DB_BACKEND environment variable (pgvector | local),
+    created on first use. Backend modules and their drivers are only imported here.
+    """
+    global _db
+    with _db_lock:
+        if _db is None:
+            backend = os.environ.get("DB_BACKEND", "pgvector")
+            if backend == "local":
+                from Agent.Storage.LocalVectorDB import LocalVectorDB
+                _db = LocalVectorDB()
+            elif backend == "pgvector":
+                from Agent.Storage.VectorDB import VectorDB
+                _db = VectorDB()
+            else:
+                raise ValueError(f"Unknown DB_BACKEND: {backend}")
+        return _db
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Optional
+
+import numpy as np
+
+from Agent.Cache.LRUCache import LRUCache
+from Agent.Metrics import Metrics
+
+
+class EmbeddingCache:
+    """
+    Two tier cache of sentence embeddings keyed by a hash of the normalized text and the model name.
+
+    The memory tier is an LRU of NumPy vectors, the optional disk tier (`DiskEmbeddingStore`)
+    keeps every vector ever computed in a memory-mapped float32 file that survives restarts.
+    """
+
+    def __init__(self, model_name:str, dim:int, max_items:int=4096, path:str=""):
+        self.model_name = model_name
+        self.dim = dim
+        self._memory = LRUCache(max_items=max_items, sizeof=lambda vector: vector.nbytes)
+        self._disk = DiskEmbeddingStore(path, model_name, dim) if path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text:str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text:str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text:str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        vector = self._memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            Metrics.inc("cache_requests_total", cache="embedding", result="memory_hit")
+            return vector
+        if self._disk is not None:
+            vector = self._disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                Metrics.inc("cache_requests_total", cache="embedding", result="disk_hit")
+                self._memory.put(key, vector)
+                return vector
+        self.misses += 1
+        Metrics.inc("cache_requests_total", cache="embedding", result="miss")
+        return None
+
+    def put(self, text:str, vector:np.ndarray):
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        self._memory.put(key, vector)
+        if self._disk is not None:
+            self._disk.put(key, vector)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._disk) if self._disk is not None else 0,
+        }
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk embedding store.
+
+    `<model>-<dim>.f32` holds raw float32 rows and is read through `np.memmap`,
+    `<model>-<dim>.keys` holds one `<key> <row>` line per vector. A vector row is
+    written before its key line, so an interrupted append only leaves an orphan row.
+    """
+
+    def __init__(self, path:str, model_name:str, dim:int):
+        os.makedirs(path, exist_ok=True)
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.vectors_path = os.path.join(path, f"{stem}-{dim}.f32")
+        self.keys_path = os.path.join(path, f"{stem}-{dim}.keys")
+        self._rows: Dict[str, int] = {}
+        self._mmap = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _load(self):
+        if os.path.exists(self.vectors_path):
+            size = os.path.getsize(self.vectors_path)
+            if size % self.row_bytes:
+                # drop a partially written trailing row
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(size - size % self.row_bytes)
+        else:
+            open(self.vectors_path, "wb").close()
+        rows = os.path.getsize(self.vectors_path) // self.row_bytes
+
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) < rows:
+                        self._rows[parts[0]] = int(parts[1])
+        logging.info(f"EmbeddingCache:Loaded {len(self._rows)} vectors from {self.vectors_path}")
+
+    def _remap(self):
+        rows = os.path.getsize(self.vectors_path) // self.row_bytes
+        self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+
+    def get(self, key:str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            if self._mmap is None or row >= self._mmap.shape[0]:
+                self._remap()
+            return np.array(self._mmap[row])
+
+    def put(self, key:str, vector:np.ndarray):
+        if vector.shape != (self.dim,):
+            return
+        with self._lock:
+            if key in self._rows:
+                return
+            with open(self.vectors_path, "ab") as f:
+                row = f.tell() // self.row_bytes
+                f.write(vector.astype(np.float32).tobytes())
+            with open(self.keys_path, "a") as f:
+                f.write(f"{key} {row}\n")
+            self._rows[key] = row
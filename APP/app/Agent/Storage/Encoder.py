@@ -0,0 +1,66 @@
+import logging
+import os
+import threading
+
+from Agent.Storage.EmbeddingCache import EmbeddingCache
+from Agent.Storage.BatchEncoder import BatchEncoder
+from Agent.Tracing import traced
+
+
+class Encoder:
+    """Shared sentence encoder: embedding cache, then a micro-batching front-end, then the model."""
+
+    MODEL_NAME = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+    CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")      # empty disables the on-disk tier
+    BATCH_WINDOW_MS = float(os.environ.get("ENCODER_BATCH_WINDOW_MS", 2))  # 0 disables micro-batching
+    MAX_BATCH = int(os.environ.get("ENCODER_MAX_BATCH", 32))
+
+    _model = None
+    _cache = None
+    _batcher = None
+    _lock = threading.RLock()
+
+    @classmethod
+    def get_model(cls):
+        with cls._lock:
+            if cls._model is None:
+                logging.info(f"Encoder:Loading {cls.MODEL_NAME}")
+                from sentence_transformers import SentenceTransformer    # pulls in torch, only when first needed
+                cls._model = SentenceTransformer(cls.MODEL_NAME)
+        return cls._model
+
+    @classmethod
+    def get_cache(cls):
+        with cls._lock:
+            if cls._cache is None:
+                dim = cls.get_model().get_sentence_embedding_dimension()
+                cls._cache = EmbeddingCache(cls.MODEL_NAME, dim, max_items=cls.CACHE_SIZE, path=cls.CACHE_DIR)
+        return cls._cache
+
+    @classmethod
+    def get_batcher(cls):
+        with cls._lock:
+            if cls._batcher is None and cls.BATCH_WINDOW_MS > 0:
+                cls._batcher = BatchEncoder(cls.get_model(), window=cls.BATCH_WINDOW_MS / 1000, max_batch=cls.MAX_BATCH)
+        return cls._batcher
+
+    @classmethod
+    @traced("encoder.encode")
+    def encode(cls, text:str):
+        cache = cls.get_cache()
+        embedding = cache.get(text)
+        if embedding is None:
+            batcher = cls.get_batcher()
+            embedding = batcher.encode(text) if batcher is not None else cls.get_model().encode(text)
+            cache.put(text, embedding)
+        return embedding
+
+    @classmethod
+    def stats(cls):
+        stats = {}
+        if cls._cache is not None:
+            stats["cache"] = cls._cache.stats()
+        if cls._batcher is not None:
+            stats["batching"] = cls._batcher.stats()
+        return stats
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, List
+
+import numpy as np
+
+from Agent.Storage.DB import DB
+from Agent.Storage.Encoder import Encoder
+from Agent.Tracing import traced
+
+
+class LocalVectorDB(DB):
+    """
+    Single node `DB` that needs no external services: session documents live in SQLite
+    and embeddings in a memory-mapped NumPy matrix searched with a vectorized inner product.
+    """
+
+    PATH = os.environ.get("LOCAL_DB_PATH", "datastore/localdb")
+
+    _conn = None
+    _index = None
+    _lock = threading.RLock()
+
+    def __init__(self):
+        with LocalVectorDB._lock:
+            if LocalVectorDB._conn is None:
+                logging.info(f"LocalDB:Opening {LocalVectorDB.PATH}")
+                os.makedirs(LocalVectorDB.PATH, exist_ok=True)
+                conn = sqlite3.connect(os.path.join(LocalVectorDB.PATH, "sessions.db"), check_same_thread=False)
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    image_description TEXT,
+                    history TEXT,
+                    row INTEGER UNIQUE
+                );""")
+                conn.commit()
+                LocalVectorDB._conn = conn
+            if LocalVectorDB._index is None:
+                dim = Encoder.get_model().get_sentence_embedding_dimension()
+                rows = LocalVectorDB._conn.execute("SELECT row, session_id FROM sessions WHERE row IS NOT NULL").fetchall()
+                LocalVectorDB._index = LocalVectorIndex(os.path.join(LocalVectorDB.PATH, "embeddings.f32"), dim, rows)
+
+    @classmethod
+    @traced("localdb.search")
+    def get_session_ids(cls,intent,k=5,min_score=None):
+        logging.info("LocalDB:GetSessionIDs")
+        return cls._index.search(Encoder.encode(intent), k=k, min_score=min_score)
+
+    @classmethod
+    def get_session_id(cls,intent):
+        matches = cls.get_session_ids(intent=intent, k=1)
+        return matches[0][0] if matches else None
+
+    @classmethod
+    @traced("localdb.read")
+    def get_image_description(cls,intent="",session_id=""):
+        logging.info("LocalDB:GetImageDescription")
+        if intent:
+            session_id = cls.get_session_id(intent=intent)
+        logging.info(f" session id : {session_id}" )
+        with cls._lock:
+            row = cls._conn.execute("SELECT image_description FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0]
+
+    @classmethod
+    @traced("localdb.read")
+    def get_conversation_history(cls,intent="",session_id=""):
+        logging.info("LocalDB:GetConversationHistory")
+        if intent:
+            session_id = cls.get_session_id(intent=intent)
+        logging.info(f" session id : {session_id}" )
+        with cls._lock:
+            row = cls._conn.execute("SELECT history FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0])
+
+    @classmethod
+    @traced("localdb.save")
+    def save_session(cls,username,session_id,image_desc,history:List[Any],summary):
+        logging.info("LocalDB:SavingSession")
+        embedding = Encoder.encode(summary)
+        with cls._lock:
+            existing = cls._conn.execute("SELECT row FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            row = cls._index.put(session_id, embedding, row=existing[0] if existing else None)
+            cls._conn.execute(
+                """
+                INSERT INTO sessions (session_id, username, image_description, history, row)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE
+                    SET username = excluded.username,
+                    image_description = excluded.image_description,
+                    history = excluded.history;
+                """, (session_id, username, image_desc, json.dumps(history), row))
+            cls._conn.commit()
+
+
+class LocalVectorIndex:
+    """
+    Embedding matrix backed by a memory-mapped float32 file, grown by doubling on append.
+    Row `i` belongs to `self.ids[i]`; rows are only ever overwritten in place. Rows without a
+    session (holes left by deleted sessions) are masked out of every search.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, path:str, dim:int, rows):
+        self.path = path
+        self.dim = dim
+        self.ids: List[str] = []
+        for row, session_id in sorted(rows):
+            self.ids.extend([None] * (row + 1 - len(self.ids)))
+            self.ids[row] = session_id
+        self.holes = np.array([row for row, session_id in enumerate(self.ids) if session_id is None], dtype=np.int64)
+
+        capacity = max(self.INITIAL_CAPACITY, len(self.ids))
+        if os.path.exists(path):
+            capacity = max(capacity, os.path.getsize(path) // (dim * 4))
+        self._map(capacity)
+        self._lock = threading.RLock()
+
+    def _map(self, capacity:int):
+        with open(self.path, "ab") as f:
+            if f.tell() < capacity * self.dim * 4:
+                f.truncate(capacity * self.dim * 4)
+        self.matrix = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def put(self, session_id:str, embedding, row=None) -> int:
+        with self._lock:
+            if row is None:
+                row = len(self.ids)
+                if row >= self.matrix.shape[0]:
+                    self.matrix.flush()
+                    self._map(self.matrix.shape[0] * 2)
+                self.ids.append(session_id)
+            self.matrix[row] = np.asarray(embedding, dtype=np.float32)
+            self.matrix.flush()
+            return row
+
+    def search(self, embedding, k:int=5, min_score=None):
+        with self._lock:
+            n = len(self.ids)
+            if n == 0:
+                return []
+            scores = self.matrix[:n] @ np.asarray(embedding, dtype=np.float32)
+            scores[self.holes] = -np.inf     # so holes never take a top-k place from a live row
+            k = min(k, n - len(self.holes))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            matches = [(self.ids[i], float(scores[i])) for i in top if self.ids[i] is not None]
+        if min_score is not None:
+            matches = [match for match in matches if match[1] >= min_score]
+        return matches
@@ -1,8 +1,6 @@
-import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from pymongo import MongoClient
-from sentence_transformers import SentenceTransformer
 from Agent.Storage.DB import DB    
+from Agent.Storage.Encoder import Encoder
+from Agent.Tracing import traced
 import json
 from typing import List ,Any
 import logging
@@ -58,6 +56,7 @@ class SessionsStore:
     def __init__(self):
         if SessionsStore._client is None:
             logging.info("SessionStore:Initialising MongoClient")
+            from pymongo import MongoClient
             
             mhost = os.environ["MONGO_HOST_NAME"]
             muser = os.environ["MONGO_INITDB_ROOT_USERNAME"]
@@ -68,6 +67,7 @@ class SessionsStore:
             SessionsStore._db = SessionsStore._client["mydb"]
             
     @classmethod
+    @traced("mongo.find_one", collection="sessions")
     def get_session_history(cls,session_id):
         logging.info("SessionStore:GetSessionHistory")
         collection = cls._db['sessions']
@@ -76,6 +76,7 @@ class SessionsStore:
         return json.loads(document["history"])
     
     @classmethod
+    @traced("mongo.find_one", collection="sessions")
     def get_image_description(cls,session_id):
         logging.info("SessionStore:GetImageDescription")
         collection = cls._db['sessions']
@@ -84,6 +85,7 @@ class SessionsStore:
         return document["image_description"]
       
     @classmethod
+    @traced("mongo.replace_one", collection="sessions")
     def save_session(cls,session_id:str,image_description:str,history:List[Any]):
         logging.info("SessionStore:SaveSession")
         text = json.dumps(history)
@@ -92,8 +94,23 @@ class SessionsStore:
     
     
 class VectorStore:
+    TABLE = "chat_index"
+
+    # distance metric -> (pgvector operator, operator class, score expression over the distance)
+    METRICS = {
+        "ip":     ("<#>", "vector_ip_ops",     "-({distance})"),      # <#> returns the negative inner product
+        "cosine": ("<=>", "vector_cosine_ops", "1 - ({distance})"),
+        "l2":     ("<->", "vector_l2_ops",     "-({distance})"),
+    }
+    METRIC = os.environ.get("VECTOR_METRIC", "ip")
+    INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "hnsw")                  # hnsw | ivfflat | none
+    HNSW_M = int(os.environ.get("VECTOR_HNSW_M", 16))
+    HNSW_EF_CONSTRUCTION = int(os.environ.get("VECTOR_HNSW_EF_CONSTRUCTION", 64))
+    HNSW_EF_SEARCH = int(os.environ.get("VECTOR_HNSW_EF_SEARCH", 40))
+    IVFFLAT_LISTS = int(os.environ.get("VECTOR_IVFFLAT_LISTS", 100))
+    IVFFLAT_PROBES = int(os.environ.get("VECTOR_IVFFLAT_PROBES", 10))
+
     _pool = None
-    _encoder = None
     
     def __init__(self):
         if VectorStore._pool is None:
@@ -102,15 +119,15 @@ class VectorStore:
             ppass= os.environ["POSTGRES_PASSWORD"]
             pdb = os.environ["POSTGRES_DB"]
             
+            from psycopg2.pool import SimpleConnectionPool
             VectorStore._pool = SimpleConnectionPool(1, 10, user=puser, password=ppass, dbname=pdb,host='pgvector-db')
             VectorStore.init_table()
             
-        if VectorStore._encoder is None:
-            VectorStore._encoder = SentenceTransformer("all-MiniLM-L6-v2")
+        Encoder.get_cache()
         
     @classmethod
     def get_encoder(cls):
-        return VectorStore._encoder
+        return Encoder
     
     @classmethod
     def get_conn(cls):
@@ -120,22 +137,47 @@ class VectorStore:
     @classmethod
     def get_session_id(cls,intent):
         logging.info("VectorStore:GetSessionID")
+        matches = cls.get_session_ids(intent=intent, k=1)
+        return matches[0][0] if matches else None
+    
+    @classmethod
+    def get_session_ids(cls,intent,k=5,min_score=None):
+        """Returns up to k (session_id, score) pairs ranked by similarity to the intent, best first."""
+        logging.info("VectorStore:GetSessionIDs")
         encoder = cls.get_encoder()
         embedding = encoder.encode(intent)  # returns a 384-dim NumPy array
+        return cls.search(embedding.tolist(), k=k, min_score=min_score)
+    
+    @classmethod
+    @traced("pgvector.search")
+    def search(cls,embedding,k=5,min_score=None):
+        operator, _, score = cls.METRICS[cls.METRIC]
+        score = score.format(distance=f"embedding {operator} %(q)s::vector")
+        # the ORDER BY must use the bare distance operator for the planner to pick the ANN index
+        query = f"SELECT session_id, {score} AS score FROM {cls.TABLE} ORDER BY embedding {operator} %(q)s::vector LIMIT %(k)s;"
         try: 
             conn = cls.get_conn()
             cur = conn.cursor()
-            cur.execute(
-            "SELECT session_id FROM chat_index ORDER BY embedding <#> %s::vector LIMIT 1;"
-            ,(embedding.tolist(),)
-            )
-            match_id = cur.fetchone()[0]
-            return match_id
+            cls.set_search_params(cur)
+            cur.execute(query, {"q": embedding, "k": k})
+            rows = cur.fetchall()
+            conn.commit()
         finally:
             cls._pool.putconn(conn)
+        if min_score is not None:
+            rows = [row for row in rows if row[1] >= min_score]
+        return [(session_id, float(score)) for session_id, score in rows]
+    
+    @classmethod
+    def set_search_params(cls,cur):
+        if cls.INDEX_TYPE == "hnsw":
+            cur.execute(f"SET LOCAL hnsw.ef_search = {int(cls.HNSW_EF_SEARCH)};")
+        elif cls.INDEX_TYPE == "ivfflat":
+            cur.execute(f"SET LOCAL ivfflat.probes = {int(cls.IVFFLAT_PROBES)};")
     
     
     @classmethod
+    @traced("pgvector.upsert")
     def save_session(cls,session_id,username,summary):
         logging.info("VectorStore:SaveSession")
         encoder  = cls.get_encoder()
@@ -144,8 +186,8 @@ class VectorStore:
             conn = cls.get_conn()
             cur = conn.cursor()
             cur.execute(
-            """
-            INSERT INTO chat_index (session_id, username, embedding)
+            f"""
+            INSERT INTO {cls.TABLE} (session_id, username, embedding)
             VALUES (%s, %s, %s)
             ON CONFLICT (session_id) DO UPDATE
                 SET username = EXCLUDED.username,
@@ -165,8 +207,8 @@ class VectorStore:
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
             conn.commit()
             
-            cur.execute("""
-            CREATE TABLE IF NOT EXISTS chat_index  (
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cls.TABLE}  (
                 no SERIAL PRIMARY KEY,
                 session_id TEXT UNIQUE NOT NULL,
                 username TEXT NOT NULL,
@@ -175,7 +217,38 @@ class VectorStore:
             );""")
             conn.commit()
             
+            cls.init_index(conn)
         finally:
             cls._pool.putconn(conn)
-                    
-  
+    
+    @classmethod
+    def index_name(cls):
+        return f"{cls.TABLE}_embedding_{cls.INDEX_TYPE}_{cls.METRIC}"
+    
+    @classmethod
+    def init_index(cls,conn):
+        """Creates the configured ANN index and drops managed indexes left over from a previous configuration."""
+        if cls.METRIC not in cls.METRICS:
+            raise ValueError(f"VECTOR_METRIC must be one of {list(cls.METRICS)}")
+        if cls.INDEX_TYPE not in ("hnsw", "ivfflat", "none"):
+            raise ValueError("VECTOR_INDEX_TYPE must be one of hnsw, ivfflat, none")
+        
+        name = cls.index_name()
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s;",
+            (cls.TABLE, f"{cls.TABLE}_embedding_%"))
+        for (stale,) in cur.fetchall():
+            if stale != name:
+                logging.info(f"VectorStore:DropIndex {stale}")
+                cur.execute(f"DROP INDEX IF EXISTS {stale};")
+        
+        if cls.INDEX_TYPE != "none":
+            _, opclass, _ = cls.METRICS[cls.METRIC]
+            if cls.INDEX_TYPE == "hnsw":
+                params = f"m = {int(cls.HNSW_M)}, ef_construction = {int(cls.HNSW_EF_CONSTRUCTION)}"
+            else:
+                params = f"lists = {int(cls.IVFFLAT_LISTS)}"
+            logging.info(f"VectorStore:CreateIndex {name} ({params})")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {cls.TABLE} USING {cls.INDEX_TYPE} (embedding {opclass}) WITH ({params});")
+        conn.commit()
@@ -0,0 +1,163 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from Agent.Metrics import Metrics
+
+
+class Span:
+    """One timed operation of a request; tags are inherited from the parent span."""
+
+    __slots__ = ("name", "tags", "start", "seconds", "error", "children")
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.error = None
+        self.children = []
+
+    def to_dict(self, origin=None, inherited=None):
+        origin = self.start if origin is None else origin
+        span = {"name": self.name, "offset": round(self.start - origin, 4), "seconds": round(self.seconds or 0.0, 4)}
+        own = {key: str(value) for key, value in self.tags.items() if (inherited or {}).get(key) != value}
+        if own and inherited is not None:
+            span["tags"] = own
+        if self.error:
+            span["error"] = self.error
+        if self.children:
+            span["children"] = [child.to_dict(origin, self.tags) for child in list(self.children)]
+        return span
+
+    def totals(self, into=None):
+        """Seconds per span name over the whole tree."""
+        into = {} if into is None else into
+        for child in list(self.children):
+            into[child.name] = into.get(child.name, 0.0) + (child.seconds or 0.0)
+            child.totals(into)
+        return into
+
+
+class Tracer:
+    """
+    Span based tracing of requests, kept in a context variable so it follows asyncio tasks;
+    work handed to other threads keeps its parent span through `Tracer.wrap`.
+
+    `trace` opens the root span of a request (tagged with its session id), `span` times an
+    operation inside it. Every span is observed in the `trace_span_seconds` histogram by name
+    and state; finished traces are kept in a ring buffer served as JSON on /traces, and traces
+    slower than TRACE_SLOW_SECONDS are logged as a tree.
+    """
+
+    ENABLED = os.environ.get("TRACING", "1") == "1"
+    KEEP = int(os.environ.get("TRACE_KEEP", 100))
+    SLOW_SECONDS = float(os.environ.get("TRACE_SLOW_SECONDS", 10))
+    ROUTE = "/traces"
+
+    _current = contextvars.ContextVar("trace_span", default=None)
+    _recent = deque(maxlen=KEEP)
+    _lock = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def span(cls, name, **tags):
+        if not cls.ENABLED:
+            yield None
+            return
+        parent = cls._current.get()
+        span = Span(name, {**parent.tags, **tags} if parent is not None else tags)
+        if parent is not None:
+            parent.children.append(span)
+        token = cls._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.seconds = time.perf_counter() - span.start
+            cls._current.reset(token)
+            Metrics.observe("trace_span_seconds", span.seconds, span=name, state=span.tags.get("state", ""))
+
+    @classmethod
+    @contextmanager
+    def trace(cls, name, **tags):
+        """Root span of a request; the finished trace is kept and logged."""
+        token = cls._current.set(None)      # a new request never nests in whatever ran on this thread before
+        try:
+            with cls.span(name, **tags) as span:
+                yield span
+        finally:
+            cls._current.reset(token)
+            if span is not None:
+                cls._finish(span)
+
+    @classmethod
+    def _finish(cls, span):
+        record = {"tags": {key: str(value) for key, value in span.tags.items()}, **span.to_dict()}
+        with cls._lock:
+            cls._recent.append(record)
+        totals = {name: round(seconds, 3) for name, seconds in span.totals().items()}
+        logging.info(f"Tracer:Trace {span.name} {span.seconds:.3f}s {record['tags']} {totals}")
+        if cls.SLOW_SECONDS and span.seconds >= cls.SLOW_SECONDS:
+            logging.warning(f"Tracer:SlowTrace {json.dumps(record)}")
+
+    @classmethod
+    def current(cls):
+        return cls._current.get()
+
+    @classmethod
+    def tag(cls, **tags):
+        """Adds tags to the current span (not to spans already opened below it)."""
+        span = cls._current.get()
+        if span is not None:
+            span.tags = {**span.tags, **tags}
+
+    @classmethod
+    def wrap(cls, fn):
+        """Binds fn to the caller's context, so the spans it opens on another thread nest under the current one."""
+        context = contextvars.copy_context()
+        return functools.partial(context.run, fn)
+
+    @classmethod
+    def recent(cls):
+        with cls._lock:
+            return list(cls._recent)
+
+    @classmethod
+    def handle(cls, request, path):
+        """Side server handler of GET /traces: the last finished traces, newest first."""
+        body = json.dumps(cls.recent()[::-1]).encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        if request.command != "HEAD":
+            request.wfile.write(body)
+
+
+def traced(name, **tags):
+    """Decorator running a function, or a coroutine function, inside a span."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                with Tracer.span(name, **tags):
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with Tracer.span(name, **tags):
+                return fn(*args, **kwargs)
+        return run
+    return decorate
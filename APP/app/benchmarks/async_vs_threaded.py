@@ -0,0 +1,76 @@
+"""
+Throughput of the threaded (Agent.Exec) and asyncio (Agent.ExecAsync) execution paths
+with many sessions in flight, against the in-process fakes of benchmarks.fakes.
+
+The threaded path runs one OS thread per concurrent request, the way the SDK drives
+`execute`; the async path schedules every request on the shared AsyncRuntime loop.
+
+Usage (from APP/app):
+
+    python -m benchmarks.async_vs_threaded --sessions 8 64 256 --requests 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SESSION_CHECKPOINT_INTERVAL", "0")
+
+from Agent.Agent import Agent
+from Agent.AsyncRuntime import AsyncRuntime
+from benchmarks.fakes import FakeGenerator, install_fake_db
+
+
+def make_agents(sessions, generator):
+    return [Agent("fake", "BENCH_USER", None, generator) for _ in range(sessions)]
+
+
+def run_threaded(agents, requests):
+    def session(agent):
+        for i in range(requests):
+            agent.Exec(f"object {agent.session_id} {i}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(agents)) as pool:
+        list(pool.map(session, agents))
+    return time.perf_counter() - start
+
+
+def run_async(agents, requests):
+    async def session(agent):
+        for i in range(requests):
+            await agent.ExecAsync(f"object {agent.session_id} {i}")
+
+    async def all_sessions():
+        await asyncio.gather(*(session(agent) for agent in agents))
+
+    start = time.perf_counter()
+    AsyncRuntime.run(all_sessions())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[8, 64, 256])
+    parser.add_argument("--requests", type=int, default=2, help="requests per session")
+    parser.add_argument("--image-latency", type=float, default=0.2)
+    parser.add_argument("--render-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    install_fake_db()
+
+    generator = FakeGenerator(args.image_latency, args.render_latency)
+    results = []
+    for sessions in args.sessions:
+        for mode, run in (("threaded", run_threaded), ("async", run_async)):
+            elapsed = run(make_agents(sessions, generator), args.requests)
+            total = sessions * args.requests
+            results.append({"mode": mode, "sessions": sessions, "requests": total,
+                            "seconds": round(elapsed, 3), "rps": round(total / elapsed, 2)})
+            print(json.dumps(results[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+In-process stand-ins for the external services of the agent (LLM backend, Openfabric
+apps, vector database) so the execution paths can be benchmarked without them.
+
+Latencies are configurable per instance; the fakes sleep (or `asyncio.sleep`) for them
+so the concurrency behaviour of the real I/O waits is reproduced.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import Agent.Storage.DB as DBModule
+from Agent.Storage.DB import DB
+from Agent.Generator import Generator
+from Agent.LLM.llm import LLM
+from Agent.Storage.ArtifactStore import ArtifactStore
+from Agent.Tracing import traced
+
+
+class FakeLLM(LLM):
+    """Scripted LLM: every user prompt asks for an image, then walks the MODEL and EXIT states."""
+
+    LATENCY = float(os.environ.get("FAKE_LLM_LATENCY", 0.05))
+
+    def __init__(self, history, latency=None):
+        self.latency = FakeLLM.LATENCY if latency is None else latency
+        self._messages = list(history)
+
+    def reply(self, prompt):
+        if prompt == "IMAGE GENERATED":
+            return json.dumps({"state": "3"})
+        if prompt == "MODEL GENERATED":
+            return json.dumps({"state": "0", "summary": "generated an object"})
+        if prompt in ("FAILED", "WRONG RESPONSE"):
+            return json.dumps({"state": "4", "query": "something went wrong"})
+        return json.dumps({"state": "2", "image": prompt})
+
+    @traced("fake.generate_content")
+    def generate_content(self, prompts):
+        time.sleep(self.latency)
+        return f"a detailed picture of {prompts[-1]}"
+
+    @traced("fake.prompt")
+    def prompt(self, prompt):
+        time.sleep(self.latency)
+        reply = self.reply(prompt)
+        self.add_turn(prompt, reply)
+        return reply
+
+    def stream_prompt(self, prompt):
+        reply = self.prompt(prompt)
+        for i in range(0, len(reply), 8):
+            yield reply[i:i + 8]
+
+    def get_history(self):
+        return list(self._messages)
+
+    def add_turn(self, prompt, reply):
+        self._messages.append({"role": "user", "content": prompt})
+        self._messages.append({"role": "model", "content": reply})
+
+
+LLM.register("fake", lambda history, baseLLM: FakeLLM(history))
+
+
+class FakeGenerator(Generator):
+    """
+    Returns deterministic payloads after a fixed delay, blocking or awaiting it.
+
+    By default the payloads are short base64 strings; with `artifact_size` set, fixed bytes of
+    that size are written to the ArtifactStore and their id is returned, as OpenfabricGenerator does.
+    """
+
+    EXTENSIONS = {"image": "png", "object": "glb"}
+
+    def __init__(self, image_latency=0.2, render_latency=0.5, artifact_size=0):
+        self.image_latency = image_latency
+        self.render_latency = render_latency
+        self.artifact_size = artifact_size
+
+    @staticmethod
+    def payload(kind, data):
+        return base64.b64encode(f"{kind}:{hashlib.sha256(data.encode()).hexdigest()}".encode()).decode()
+
+    def artifact(self, kind, data):
+        if not self.artifact_size:
+            return self.payload(kind, data)
+        seed = hashlib.sha256(f"{kind}:{data}".encode()).digest()
+        body = (seed * (self.artifact_size // len(seed) + 1))[:self.artifact_size]
+        return ArtifactStore.put(body, self.EXTENSIONS[kind])
+
+    def generate_image(self, prompt):
+        time.sleep(self.image_latency)
+        return self.artifact("image", prompt)
+
+    def generate_3drender(self, image):
+        time.sleep(self.render_latency)
+        return self.artifact("object", image)
+
+    async def generate_image_async(self, prompt):
+        await asyncio.sleep(self.image_latency)
+        return self.artifact("image", prompt)
+
+    async def generate_3drender_async(self, image):
+        await asyncio.sleep(self.render_latency)
+        return self.artifact("object", image)
+
+
+class InMemoryDB(DB):
+    """Dictionary backed DB: the sessions saved in this process, with substring intent matching."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def save_session(self, username, session_id, image_desc, history, summary):
+        with self.lock:
+            self.sessions[session_id] = {"username": username, "image_description": image_desc,
+                                         "history": history, "summary": summary}
+
+    def get_image_description(self, intent="", session_id=""):
+        with self.lock:
+            for session in reversed(list(self.sessions.values())):
+                if intent and intent in (session["summary"] or ""):
+                    return session["image_description"]
+        return ""
+
+    def get_conversation_history(self, intent="", session_id=""):
+        with self.lock:
+            return self.sessions[session_id]["history"]     # KeyError -> SessionManager starts a new history
+
+
+def install_fake_db():
+    """Makes get_db return an InMemoryDB; storage is created lazily, so this works at any point before the first request."""
+    db = InMemoryDB()
+    DBModule._db = db
+    return db
+
+
+class FakeOllamaServer:
+    """
+    HTTP stand-in for Ollama's /api/chat with a prompt (KV) cache, to measure prefill reuse.
+
+    Text counts as one token per 4 characters. Each of `slots` cache slots holds the rendered
+    messages of a previous request plus its reply; a request is served from the slot sharing
+    the longest prefix with it, and only the rest counts as prompt eval. The cache is dropped
+    when the server was idle for longer than the request's `keep_alive` (`default_keep_alive`
+    seconds when absent), as Ollama unloads the model then. With `realtime` the reported
+    durations are also slept, otherwise only reported.
+    """
+
+    def __init__(self, slots=1, default_keep_alive=300.0, prefill_per_token=0.002, decode_per_token=0.02,
+                 load_seconds=1.0, realtime=False):
+        self.slots = [""] * slots
+        self.used = [0.0] * slots
+        self.default_keep_alive = default_keep_alive
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.load_seconds = load_seconds
+        self.realtime = realtime
+        self.loaded_until = 0.0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                reply, fields = fake.chat(request)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                if request.get("stream"):
+                    for i in range(0, len(reply), 8):
+                        self.wfile.write((json.dumps({"message": {"content": reply[i:i + 8]}, "done": False}) + "\n").encode())
+                    self.wfile.write((json.dumps({"message": {"content": ""}, "done": True, **fields}) + "\n").encode())
+                else:
+                    self.wfile.write(json.dumps({"message": {"role": "assistant", "content": reply}, "done": True,
+                                                 **fields}).encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/chat"
+
+    @staticmethod
+    def keep_alive_seconds(value, default):
+        if value is None or value == "":
+            return default
+        if isinstance(value, (int, float)):
+            return float(value)
+        units = {"s": 1, "m": 60, "h": 3600}
+        return float(value[:-1]) * units[value[-1]] if value[-1] in units else float(value)
+
+    @staticmethod
+    def render(messages):
+        return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+    def chat(self, request):
+        text = self.render(request["messages"])
+        user = request["messages"][-1]["content"]
+        reply = json.dumps({"state": "2", "image": user[:40]})
+        with self.lock:
+            now = time.monotonic()
+            load = 0.0
+            if now > self.loaded_until:
+                self.slots = [""] * len(self.slots)
+                load = self.load_seconds
+            common = [len(os.path.commonprefix([cached, text])) for cached in self.slots]
+            # the longest shared prefix is reused; a slot that would be cut short keeps its content
+            # and the request goes to the least recently used slot instead
+            slot = max(range(len(self.slots)), key=lambda i: common[i])
+            prompt_eval_count = max(1, -(-(len(text) - common[slot]) // 4))
+            eval_count = len(reply) // 4 + 1
+            if common[slot] < len(self.slots[slot]):
+                slot = min(range(len(self.slots)), key=lambda i: self.used[i])
+            self.slots[slot] = text + f"<assistant>{reply}"
+            self.used[slot] = now
+        prompt_eval = prompt_eval_count * self.prefill_per_token
+        decode = eval_count * self.decode_per_token
+        if self.realtime:
+            time.sleep(load + prompt_eval + decode)
+        with self.lock:
+            keep_alive = self.keep_alive_seconds(request.get("keep_alive"), self.default_keep_alive)
+            self.loaded_until = time.monotonic() + keep_alive
+        return reply, {
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_eval_count,
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "eval_count": eval_count,
+            "eval_duration": int(decode * 1e9),
+        }
+
+    def close(self):
+        self.server.shutdown()
@@ -0,0 +1,100 @@
+"""
+Remote generator calls and caller latency when `--callers` concurrent requests ask for the same
+image description at once (two tabs, two users with the same prompt), with and without
+coalescing of identical in-flight generations (GENERATOR_COALESCE).
+
+Each round uses a fresh description and a cold artifact cache. Without coalescing every caller
+misses the cache and calls the generator, so the calls also queue on GENERATOR_MAX_CONCURRENT;
+with it one call runs and every other caller shares its result.
+
+Usage (from APP/app):
+
+    python -m benchmarks.generator_coalescing --callers 8 --rounds 3
+    python -m benchmarks.generator_coalescing --callers 8 --execution async
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("ARTIFACT_STORE_DIR", tempfile.mkdtemp(prefix="bench-artifacts-"))
+
+from Agent.AsyncRuntime import AsyncRuntime
+from Agent.CachedGenerator import CachedGenerator
+from benchmarks.fakes import FakeGenerator
+from benchmarks.pipeline import percentiles
+
+
+class CountingGenerator(FakeGenerator):
+    """FakeGenerator that counts the calls that would reach the Openfabric apps."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def count(self):
+        with self.lock:
+            self.calls += 1
+
+    def generate_image(self, prompt):
+        self.count()
+        return super().generate_image(prompt)
+
+    async def generate_image_async(self, prompt):
+        self.count()
+        return await super().generate_image_async(prompt)
+
+
+def run(coalesce, callers, rounds, execution, image_latency):
+    CachedGenerator.COALESCE = coalesce
+    CachedGenerator._cache = None       # a cold cache per mode
+    CachedGenerator.CACHE_DIR = tempfile.mkdtemp(prefix="bench-artifact-cache-")
+    fake = CountingGenerator(image_latency, 0)
+    generator = CachedGenerator(fake)
+    latencies = []
+
+    def call(description):
+        start = time.perf_counter()
+        generator.generate_image(description)
+        return time.perf_counter() - start
+
+    async def call_async(description):
+        start = time.perf_counter()
+        await generator.generate_image_async(description)
+        return time.perf_counter() - start
+
+    async def gather(description):
+        return await asyncio.gather(*[call_async(description) for _ in range(callers)])
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        description = f"a red fox in the snow, round {i}, coalesce={coalesce}"
+        if execution == "async":
+            latencies += AsyncRuntime.run(gather(description))
+        else:
+            with ThreadPoolExecutor(max_workers=callers) as pool:
+                latencies += list(pool.map(call, [description] * callers))
+    return {"coalesce": coalesce, "generator_calls": fake.calls, "requests": callers * rounds,
+            "seconds": round(time.perf_counter() - start, 3), "latency": percentiles(latencies),
+            "flights": CachedGenerator.flight_stats()["image"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=8, help="concurrent requests for the same description")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--execution", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--image-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    for coalesce in (False, True):
+        print(json.dumps(run(coalesce, args.callers, args.rounds, args.execution, args.image_latency)))
+
+
+if __name__ == "__main__":
+    main()
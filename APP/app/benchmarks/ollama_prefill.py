@@ -0,0 +1,79 @@
+"""
+Prefill (prompt eval) versus decode (eval) per turn of OllamaLLM, with the base prompt sent
+as a plain first user message and without keep_alive (the previous behaviour), against it
+pinned as a system message with OLLAMA_KEEP_ALIVE.
+
+Sessions take turns round robin with `--idle` seconds between rounds. Against the built-in
+fake server (FakeOllamaServer) the model unloads, dropping its prompt cache, when idle for
+longer than `--server-keep-alive`, standing in for Ollama's 5 minute default; pass `--url` to
+measure a local Ollama instead. "prefill_saved_tokens" is the estimated prompt size (4 bytes
+per token) minus the tokens the server actually evaluated.
+
+Usage (from APP/app):
+
+    python -m benchmarks.ollama_prefill --sessions 4 --turns 5 --slots 1
+    python -m benchmarks.ollama_prefill --url http://localhost:11434/api/chat --model llama3.2:1b
+"""
+import argparse
+import json
+import time
+
+from Agent.LLM.Ollama import OllamaLLM
+from Agent.PromptManager import PromptManager
+from benchmarks.fakes import FakeOllamaServer
+
+
+def run(pinned, keep_alive, args):
+    OllamaLLM.PIN_SYSTEM_PROMPT = pinned
+    OllamaLLM.KEEP_ALIVE = keep_alive
+    base = [{"role": "user", "content": PromptManager().get_base_prompt()}]
+    sessions = [OllamaLLM(list(base), MODEL=args.model) for _ in range(args.sessions)]
+    turns = []
+    for turn in range(args.turns):
+        for i, llm in enumerate(sessions):
+            llm.prompt(f"session {i} turn {turn}: draw a small red boat on a lake")
+            turns.append({**llm.last_timings, "sent_tokens_est": llm.policy.last_usage["sent_tokens_est"]})
+        time.sleep(args.idle)
+
+    def mean(key):
+        values = [t.get(key, 0) for t in turns]
+        return round(sum(values) / len(values), 4)
+
+    return {
+        "pinned": pinned,
+        "keep_alive": keep_alive or None,
+        "turns": len(turns),
+        "mean": {key: mean(key) for key in ("sent_tokens_est", "prompt_eval_tokens", "prompt_eval_seconds",
+                                            "eval_tokens", "eval_seconds", "load_seconds")},
+        "prefill_saved_tokens": round(sum(max(0, t["sent_tokens_est"] - t.get("prompt_eval_tokens", 0))
+                                          for t in turns) / len(turns), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="", help="a running Ollama /api/chat, the fake server by default")
+    parser.add_argument("--model", default=OllamaLLM.MODEL_NAME)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--idle", type=float, default=0.3)
+    parser.add_argument("--slots", type=int, default=1, help="fake server: cache slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--server-keep-alive", type=float, default=0.2, help="fake server: default keep_alive, seconds")
+    parser.add_argument("--keep-alive", default="30m")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        server = FakeOllamaServer(slots=args.slots, default_keep_alive=args.server_keep_alive)
+        args.url = server.url
+    OllamaLLM.OLLAMA_URL = args.url
+    try:
+        for pinned, keep_alive in ((False, ""), (True, args.keep_alive)):
+            print(json.dumps(run(pinned, keep_alive, args)))
+    finally:
+        if server is not None:
+            server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Per-stage timings of one request with the 3D render run inline (state 3) and overlapped
+with the summary / exit turns (OVERLAP_MODEL_RENDER=1), against the in-process fakes.
+
+"render_wait" is the time EXIT still blocked on the background render; the wall-clock
+saving is roughly render - render_wait.
+
+Usage (from APP/app):
+
+    python -m benchmarks.overlap_render --requests 5 --llm-latency 0.3 --render-latency 1.0
+"""
+import argparse
+import json
+import os
+
+os.environ.setdefault("SESSION_CHECKPOINT_INTERVAL", "0")
+
+from Agent.Agent import Agent
+from Agent.Processor import Processor
+from benchmarks.fakes import FakeGenerator, FakeLLM, install_fake_db
+
+
+def run(overlap, requests, generator):
+    Processor.OVERLAP_RENDER = overlap
+    agent = Agent("fake", "BENCH_USER", None, generator)
+    stages = {}
+    for i in range(requests):
+        agent.Exec(f"object {i} overlap={overlap}")
+        for stage, seconds in agent.session_data.timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    return {stage: round(sum(values) / len(values), 3) for stage, values in stages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--image-latency", type=float, default=0.5)
+    parser.add_argument("--render-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    install_fake_db()
+
+    FakeLLM.LATENCY = args.llm_latency
+    generator = FakeGenerator(args.image_latency, args.render_latency)
+    for overlap in (False, True):
+        print(json.dumps({"overlap": overlap, "mean_seconds": run(overlap, args.requests, generator)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+End-to-end latency and throughput of the agent pipeline against the in-process fakes of
+benchmarks.fakes: FakeLLM replays the state JSON of an image -> model -> exit request,
+FakeGenerator writes fixed bytes to the ArtifactStore, and InMemoryDB replaces Mongo / pgvector.
+
+`--concurrency` workers each run their own session and send `--requests` requests one after
+another. Every request goes through `Agent.Exec` (or `Agent.ExecAsync` with
+`--execution async`); `--entry execute` goes through `main.execute` instead, which needs the
+Openfabric SDK installed. For each concurrency level the run reports requests per second and
+p50 / p95 / p99 of the request latency, of each state (SessionData.state_timings) and of each
+stage (SessionData.timings). Requests turned away by the admission queue (Admission.REQUESTS)
+are counted as rejected.
+
+Results are written as JSON (`--output`, by default benchmarks/results/pipeline-<commit>.json);
+`--compare` reads an earlier result, prints the change of every figure and exits with status 1
+if throughput dropped or p95 latency grew by more than `--threshold` percent.
+
+Usage (from APP/app):
+
+    python -m benchmarks.pipeline --concurrency 1 8 32 --requests 5
+    python -m benchmarks.pipeline --concurrency 8 --compare benchmarks/results/pipeline-abc1234.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+os.environ.setdefault("SESSION_CHECKPOINT_INTERVAL", "0")
+os.environ.setdefault("ARTIFACT_STORE_DIR", tempfile.mkdtemp(prefix="bench-artifacts-"))
+os.environ.setdefault("ARTIFACT_CACHE_DIR", tempfile.mkdtemp(prefix="bench-artifact-cache-"))    # a cold cache every run
+os.environ.setdefault("BASE_LLM", "fake")
+
+from Agent.Admission import Admission, Overloaded
+from Agent.Agent import Agent
+from Agent.AsyncRuntime import AsyncRuntime
+from Agent.CachedGenerator import CachedGenerator
+from benchmarks.fakes import FakeGenerator, FakeLLM, install_fake_db
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PERCENTILES = (50, 95, 99)
+NOISE_SECONDS = 0.005     # p95 changes below this are not reported as regressions
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    summary = {f"p{q}": round(samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))], 4)
+               for q in PERCENTILES}
+    summary["mean"] = round(sum(samples) / len(samples), 4)
+    summary["count"] = len(samples)
+    return summary
+
+
+class Recorder:
+    """Collects the latency, state and stage timings of every finished request."""
+
+    def __init__(self):
+        self.latencies = []
+        self.states = {}
+        self.stages = {}
+        self.errors = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds, session_data):
+        with self.lock:
+            self.latencies.append(seconds)
+            for name, value in session_data.state_timings.items():
+                self.states.setdefault(name, []).append(value)
+            for name, value in session_data.timings.items():
+                self.stages.setdefault(name, []).append(value)
+
+    def failed(self):
+        with self.lock:
+            self.errors += 1
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def summary(self):
+        return {
+            "latency": percentiles(self.latencies),
+            "states": {name: percentiles(values) for name, values in sorted(self.states.items())},
+            "stages": {name: percentiles(values) for name, values in sorted(self.stages.items())},
+            "errors": self.errors,
+            "rejected": self.rejected,
+        }
+
+
+class AgentEntry:
+    """Sends a request straight to the session's pooled Agent, behind the request limit main.execute applies."""
+
+    def __init__(self, generator, execution):
+        self.generator = generator
+        self.execution = execution
+
+    def request(self, session_id, prompt):
+        with Admission.REQUESTS.slot():
+            agent = Agent.get_agent("fake", "BENCH_USER", session_id, self.generator)
+            if self.execution == "async":
+                AsyncRuntime.run(agent.ExecAsync(prompt))
+            else:
+                agent.Exec(prompt)
+        return agent.session_id, agent.session_data
+
+
+class ExecuteEntry:
+    """Sends a request through main.execute, the way the Openfabric SDK does."""
+
+    def __init__(self, generator, execution):
+        os.environ["EXECUTION_MODE"] = execution
+        import main
+        main.EXECUTION_MODE = execution
+        main.OpenfabricGenerator._generator = generator
+        self.main = main
+
+    def request(self, session_id, prompt):
+        model = SimpleNamespace(request=SimpleNamespace(prompt=prompt, attachments=[], session_id=session_id,
+                                                        stream_id=None),
+                                response=SimpleNamespace())
+        self.main.execute(model)
+        agent = Agent.get_agent(os.environ["BASE_LLM"], "TEST_USER", model.response.session_id, None)
+        return model.response.session_id, agent.session_data
+
+
+def run(entry, concurrency, requests):
+    recorder = Recorder()
+
+    def worker(index):
+        session_id = None
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                session_id, session_data = entry.request(session_id, f"object {index}-{i} at concurrency {concurrency}")
+            except Overloaded:
+                recorder.reject()
+                continue
+            except Exception as e:
+                print(f"request failed: {e!r}", file=sys.stderr)
+                recorder.failed()
+                continue
+            recorder.add(time.perf_counter() - start, session_data)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = concurrency * requests
+    return {"concurrency": concurrency, "requests": total, "seconds": round(elapsed, 3),
+            "rps": round((total - recorder.errors - recorder.rejected) / elapsed, 2), **recorder.summary()}
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(result, baseline, threshold):
+    """Prints the change of each figure against the baseline; returns the regressions beyond the threshold."""
+    regressions = []
+    runs = {run["concurrency"]: run for run in baseline["runs"]}
+
+    def change(new, old):
+        return (new - old) / old * 100 if old else 0.0
+
+    for run in result["runs"]:
+        old = runs.get(run["concurrency"])
+        if old is None:
+            continue
+        rps = change(run["rps"], old["rps"])
+        print(f"concurrency {run['concurrency']}: rps {old['rps']} -> {run['rps']} ({rps:+.1f}%)")
+        if rps < -threshold:
+            regressions.append(f"concurrency {run['concurrency']} rps {rps:+.1f}%")
+        rows = [("latency", run["latency"], old["latency"])]
+        for group in ("states", "stages"):
+            rows += [(f"{group[:-1]} {name}", values, old[group].get(name, {}))
+                     for name, values in run[group].items()]
+        for label, new, previous in rows:
+            if "p95" not in previous:
+                continue
+            p95 = change(new["p95"], previous["p95"])
+            print(f"  {label:<28} p50 {previous['p50']:.4f} -> {new['p50']:.4f}   "
+                  f"p95 {previous['p95']:.4f} -> {new['p95']:.4f} ({p95:+.1f}%)")
+            if p95 > threshold and new["p95"] - previous["p95"] > NOISE_SECONDS:
+                regressions.append(f"concurrency {run['concurrency']} {label} p95 {p95:+.1f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=5, help="requests per worker")
+    parser.add_argument("--entry", choices=("agent", "execute"), default="agent")
+    parser.add_argument("--execution", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--image-latency", type=float, default=0.2)
+    parser.add_argument("--render-latency", type=float, default=0.5)
+    parser.add_argument("--artifact-size", type=int, default=256 * 1024, help="bytes of each generated artifact")
+    parser.add_argument("--output", default="", help="result file, benchmarks/results/pipeline-<commit>.json by default")
+    parser.add_argument("--compare", default="", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold, percent")
+    args = parser.parse_args()
+
+    install_fake_db()
+    FakeLLM.LATENCY = args.llm_latency
+    # the cache wrapper main puts around the Openfabric generator; prompts are unique so it always misses
+    generator = CachedGenerator(FakeGenerator(args.image_latency, args.render_latency, args.artifact_size))
+    entry = (ExecuteEntry if args.entry == "execute" else AgentEntry)(generator, args.execution)
+
+    result = {
+        "benchmark": "pipeline",
+        "commit": commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "threshold")},
+        "env": {key: os.environ[key] for key in ("STATE_DRIVER", "OVERLAP_MODEL_RENDER", "LLM_STREAMING",
+                                                 "LLM_HISTORY_POLICY", "SEMANTIC_CACHE", "ADMISSION_MAX_CONCURRENT",
+                                                 "ADMISSION_MAX_QUEUE", "LLM_MAX_CONCURRENT", "GENERATOR_MAX_CONCURRENT")
+                if key in os.environ},
+        "runs": [],
+    }
+    for concurrency in args.concurrency:
+        result["runs"].append(run(entry, concurrency, args.requests))
+        summary = result["runs"][-1]
+        print(json.dumps({key: summary[key] for key in ("concurrency", "requests", "seconds", "rps", "errors", "rejected",
+                                                   "latency")}))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{result['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print("regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
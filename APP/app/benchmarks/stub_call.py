@@ -0,0 +1,104 @@
+"""
+Per-call overhead of Stub.call with a fake Remote, with and without the compiled
+output schema cache.
+
+The fake Remote answers instantly, so the timings isolate the work Stub.call does around
+the request: channel dispatch, schema lookup and marshmallow schema construction. "uncached" clears the
+compiled schema before every call, which is what each call paid before the cache.
+
+Usage (from APP/app, with openfabric_pysdk installed):
+
+    python -m benchmarks.stub_call --calls 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("STUB_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "stub_cache.json"))
+
+from core.pool import RemotePool
+from core.stub import Stub
+
+APP_ID = "fake.app"
+
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string"},
+        "score": {"type": "number"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+
+class FakeResult:
+    """ExecutionResult stand-in that is already completed."""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def wait(self):
+        pass
+
+    def status(self):
+        return "COMPLETED"
+
+    def data(self):
+        return self.payload
+
+
+class FakeRemote:
+    """Remote stand-in whose requests complete immediately with a fixed payload."""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def execute(self, inputs, uid):
+        return FakeResult(self.payload)
+
+
+def make_stub():
+    stub = Stub([])
+    stub._apply(APP_ID, {"manifest": {}, "input": {"type": "object", "properties": {}}, "output": OUTPUT_SCHEMA})
+    pool = RemotePool(APP_ID, "wss://fake.app/app")
+    for channel in pool.channels:
+        channel.remote = FakeRemote({"message": "ok", "score": 1.0, "tags": ["a"]})
+    stub._connections[APP_ID] = pool
+    return stub
+
+
+def measure(stub, calls, cached):
+    samples = np.empty(calls)
+    for i in range(calls):
+        if not cached:
+            stub._output_schemas.clear()
+        start = time.perf_counter()
+        stub.call(APP_ID, {"prompt": "x"})
+        samples[i] = time.perf_counter() - start
+    micros = samples * 1e6
+    return {
+        "mode": "cached" if cached else "uncached",
+        "calls": calls,
+        "mean_us": round(float(micros.mean()), 2),
+        "p50_us": round(float(np.percentile(micros, 50)), 2),
+        "p99_us": round(float(np.percentile(micros, 99)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    stub = make_stub()
+    for cached in (False, True):
+        measure(stub, min(args.calls, 100), cached)     # warm up
+        print(json.dumps(measure(stub, args.calls, cached)))
+
+
+if __name__ == "__main__":
+    main()
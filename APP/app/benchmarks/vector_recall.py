@@ -0,0 +1,128 @@
+"""
+Recall latency of VectorStore.search against a pgvector table of synthetic embeddings.
+
+For every table size the benchmark loads random unit vectors into a scratch table,
+builds each index type and times top-k queries, reporting p50/p95/p99 latency and
+recall@k against the exact (sequential scan) result.
+
+Usage (from APP/app, with the POSTGRES_* variables of .env exported):
+
+    python -m benchmarks.vector_recall --rows 10000 100000 1000000 --queries 200
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+import numpy as np
+from psycopg2.pool import SimpleConnectionPool
+
+from Agent.Storage.VectorDB import VectorStore
+
+DIM = 384
+
+
+def percentile(samples, q):
+    return float(np.percentile(np.asarray(samples) * 1000, q))
+
+
+def load_rows(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    conn = VectorStore.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {VectorStore.TABLE};")
+        conn.commit()
+        VectorStore.INDEX_TYPE = "none"
+        VectorStore.init_table()
+
+        batch = 50_000
+        for start in range(0, rows, batch):
+            vectors = rng.standard_normal((min(batch, rows - start), DIM)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            buf = io.StringIO()
+            for i, vector in enumerate(vectors):
+                buf.write(f"bench-{start + i}\tbench\t[{','.join(f'{x:.6f}' for x in vector)}]\n")
+            buf.seek(0)
+            cur.copy_expert(f"COPY {VectorStore.TABLE} (session_id, username, embedding) FROM STDIN", buf)
+            conn.commit()
+        cur.execute(f"ANALYZE {VectorStore.TABLE};")
+        conn.commit()
+    finally:
+        VectorStore._pool.putconn(conn)
+
+
+def run_queries(queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([sid for sid, _ in VectorStore.search(query, k=k)])
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--indexes", nargs="+", default=["none", "hnsw", "ivfflat"])
+    parser.add_argument("--host", default=os.environ.get("POSTGRES_HOST", "pgvector-db"))
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    VectorStore.TABLE = "chat_index_bench"
+    VectorStore._pool = SimpleConnectionPool(1, 2, user=os.environ["POSTGRES_USER"], password=os.environ["POSTGRES_PASSWORD"],
+                                             dbname=os.environ["POSTGRES_DB"], host=args.host)
+
+    rng = np.random.default_rng(1)
+    queries = rng.standard_normal((args.queries, DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    queries = [query.tolist() for query in queries]
+
+    report = []
+    for rows in args.rows:
+        load_start = time.perf_counter()
+        load_rows(rows)
+        print(f"rows={rows} loaded in {time.perf_counter() - load_start:.1f}s")
+
+        exact = None
+        for index_type in args.indexes:
+            VectorStore.INDEX_TYPE = index_type
+            if index_type == "ivfflat":
+                VectorStore.IVFFLAT_LISTS = max(10, int(rows ** 0.5))
+            conn = VectorStore.get_conn()
+            try:
+                build_start = time.perf_counter()
+                VectorStore.init_index(conn)
+                build = time.perf_counter() - build_start
+            finally:
+                VectorStore._pool.putconn(conn)
+
+            latencies, results = run_queries(queries, args.k)
+            if index_type == "none":
+                exact = results
+            recall = None
+            if exact is not None:
+                hits = sum(len(set(got) & set(want)) for got, want in zip(results, exact))
+                recall = hits / (len(exact) * args.k)
+
+            row = {
+                "rows": rows, "index": index_type, "metric": VectorStore.METRIC, "k": args.k,
+                "build_s": round(build, 2),
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "recall": None if recall is None else round(recall, 3),
+            }
+            report.append(row)
+            print(json.dumps(row))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+
+# Handler of one route: receives the request handler and the request path (with query string)
+Route = Callable[[BaseHTTPRequestHandler, str], None]
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CHUNK = 1024 * 1024
+
+
+class SideServer:
+    """
+    Small HTTP server running next to the Openfabric app (which owns port 8888) for the
+    traffic that does not fit the SDK's request/response model: artifact downloads and
+    other GET endpoints registered by the application.
+
+    Attributes:
+        PORT (int): Listening port, from SIDE_SERVER_PORT (default 8889).
+        HOST (str): Listening address, from SIDE_SERVER_HOST (default 0.0.0.0).
+        PUBLIC_URL (str): Base URL clients reach the server at, used in the links handed out
+            (artifact downloads, progress events), from SIDE_SERVER_PUBLIC_URL. Defaults to
+            http://localhost:<PORT>, which only works for clients on the same machine.
+    """
+
+    PORT = int(os.environ.get("SIDE_SERVER_PORT", 8889))
+    HOST = os.environ.get("SIDE_SERVER_HOST", "0.0.0.0")
+    PUBLIC_URL = os.environ.get("SIDE_SERVER_PUBLIC_URL", f"http://localhost:{PORT}").rstrip("/")
+
+    _routes: List[Tuple[str, Route]] = []
+    _server: Optional[ThreadingHTTPServer] = None
+    _lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def route(cls, prefix: str, handler: Route):
+        """
+        Registers a handler for GET/HEAD requests whose path starts with `prefix`.
+        The longest matching prefix wins.
+
+        Args:
+            prefix (str): Path prefix, e.g. '/artifacts/'.
+            handler (Route): Called with the request handler and the full request path.
+        """
+        with cls._lock:
+            cls._routes = sorted(cls._routes + [(prefix, handler)], key=lambda r: -len(r[0]))
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def start(cls) -> ThreadingHTTPServer:
+        """
+        Starts the server on a daemon thread, once per process.
+
+        Returns:
+            ThreadingHTTPServer: The running server.
+        """
+        with cls._lock:
+            if cls._server is None:
+                cls._server = ThreadingHTTPServer((cls.HOST, cls.PORT), _Handler)
+                cls._server.daemon_threads = True
+                threading.Thread(target=cls._server.serve_forever, name="side-server", daemon=True).start()
+                logging.info(f"SideServer:Listening on {cls.HOST}:{cls.PORT}, public URL {cls.PUBLIC_URL}")
+            return cls._server
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def resolve(cls, path: str) -> Optional[Route]:
+        """
+        Finds the handler of a request path.
+
+        Args:
+            path (str): The request path.
+
+        Returns:
+            Optional[Route]: The handler, or None if no route matches.
+        """
+        for prefix, handler in cls._routes:
+            if path.startswith(prefix):
+                return handler
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def end_headers(self):
+        # the frontend is served from another origin
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "Content-Length, Content-Range, Accept-Ranges, ETag")
+        super().end_headers()
+
+    def do_GET(self):
+        handler = SideServer.resolve(self.path)
+        if handler is None:
+            self.send_error(404)
+            return
+        try:
+            handler(self, self.path)
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # client went away mid-response
+
+    do_HEAD = do_GET
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Range, Content-Type")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logging.debug(f"SideServer:{self.address_string()} {format % args}")
+
+
+# ----------------------------------------------------------------------
+def send_file(request: BaseHTTPRequestHandler, path: str, content_type: str, etag: Optional[str] = None,
+              filename: Optional[str] = None, cache_control: str = "public, max-age=31536000, immutable"):
+    """
+    Sends a file as the response, honouring a single `Range: bytes=a-b` request header
+    and `If-None-Match`. The body is written with `os.sendfile` straight from the page
+    cache to the socket when the platform allows it, and copied in chunks otherwise.
+
+    Args:
+        request (BaseHTTPRequestHandler): The request being answered.
+        path (str): The file to send.
+        content_type (str): Value of the Content-Type header.
+        etag (Optional[str]): Entity tag of the file, content addressed files can use their id.
+        filename (Optional[str]): If set, the file is sent as an attachment with this name.
+        cache_control (str): Value of the Cache-Control header.
+
+    Returns:
+        int: Bytes of body written, 0 for HEAD, 304 and 416 responses.
+    """
+    size = os.path.getsize(path)
+    if etag and request.headers.get("If-None-Match") == f'"{etag}"':
+        request.send_response(304)
+        request.send_header("ETag", f'"{etag}"')
+        request.send_header("Content-Length", "0")
+        request.end_headers()
+        return 0
+
+    start, end, status = 0, size - 1, 200
+    header = request.headers.get("Range")
+    if header:
+        match = _RANGE.match(header.strip())
+        if match and any(match.groups()):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                start, end = max(0, size - int(last)), size - 1      # suffix range: the last N bytes
+            status = 206
+        if not match or start > end or start >= size:
+            request.send_response(416)
+            request.send_header("Content-Range", f"bytes */{size}")
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return 0
+
+    length = end - start + 1 if size else 0
+    request.send_response(status)
+    request.send_header("Content-Type", content_type)
+    request.send_header("Content-Length", str(length))
+    request.send_header("Accept-Ranges", "bytes")
+    request.send_header("Cache-Control", cache_control)
+    if etag:
+        request.send_header("ETag", f'"{etag}"')
+    if status == 206:
+        request.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+    if filename:
+        request.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+    request.end_headers()
+    if request.command == "HEAD" or not length:
+        return 0
+
+    request.wfile.flush()
+    offset, remaining = start, length
+    with open(path, "rb") as f:
+        try:
+            while remaining:
+                sent = os.sendfile(request.connection.fileno(), f.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        except (AttributeError, OSError) as e:
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                raise
+            # no sendfile here (platform, wrapped socket): fall back to a buffered copy
+            f.seek(offset)
+            remaining -= _copy(f, request.wfile, remaining)
+    return length - remaining
+
+
+def _copy(source, destination, length: int) -> int:
+    copied = 0
+    while copied < length:
+        chunk = source.read(min(_CHUNK, length - copied))
+        if not chunk:
+            break
+        destination.write(chunk)
+        copied += len(chunk)
+    return copied
@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+
+from Agent.Metrics import Metrics
+from core.remote import Remote, RemoteRequestFailed
+
+
+class Channel:
+    """
+    One Remote connection of a pool, with its in-flight count and health.
+
+    Attributes:
+        index (int): Position of the channel in its pool.
+        remote (Optional[Remote]): The connected Remote, None until connected or after a failure.
+        in_flight (int): Requests currently running on the channel.
+        healthy (bool): False once a request failed at the transport level, until reconnected.
+        failures (int): Consecutive failed connection attempts, drives the reconnect backoff.
+        retry_at (float): Monotonic time before which no reconnect is attempted.
+        timeouts (int): Consecutive requests that timed out, reset by any answered request.
+        connect_lock (threading.Lock): Held while the channel connects, so concurrent first
+            requests open one Remote between them.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, index: int):
+        self.index = index
+        self.remote: Optional[Remote] = None
+        self.in_flight = 0
+        self.healthy = True
+        self.failures = 0
+        self.retry_at = 0.0
+        self.timeouts = 0
+        self.connect_lock = threading.Lock()
+
+
+class RemotePool:
+    """
+    Pool of N Remote connections to one Openfabric app, so concurrent requests do not
+    serialize behind a single WebSocket and a dropped socket only takes one channel down.
+
+    Requests go to the healthy channel with the fewest requests in flight. When every
+    channel is at `max_in_flight` callers queue on a condition variable for up
+    to `acquire_timeout` seconds. A channel whose request fails at the transport level
+    is marked unhealthy, dropped from dispatch, and reconnected with exponential backoff
+    by a background health check thread. A single timeout may just be a slow app, but a
+    WebSocket that half-closed silently only ever shows up as timeouts, so a channel is
+    recycled the same way after `max_timeouts` consecutive timed out requests.
+
+    Metrics (Agent.Metrics, labelled by app):
+        remote_pool_queue_wait_seconds: Time spent waiting for a channel.
+        remote_pool_occupancy: Requests in flight across the pool, sampled at dispatch.
+        remote_pool_in_flight / remote_pool_healthy_channels: Current values (gauges).
+        remote_pool_connect_seconds: Time to open a channel.
+        remote_pool_reconnects_total / remote_pool_channel_failures_total: Counters.
+        remote_pool_channel_recycled_total: Channels recycled after consecutive timeouts.
+    """
+
+    SIZE = int(os.environ.get("REMOTE_POOL_SIZE", 2))
+    MAX_IN_FLIGHT = int(os.environ.get("REMOTE_CHANNEL_MAX_IN_FLIGHT", 4))
+    ACQUIRE_TIMEOUT = float(os.environ.get("REMOTE_ACQUIRE_TIMEOUT", 60))
+    HEALTH_INTERVAL = float(os.environ.get("REMOTE_HEALTH_INTERVAL", 5))
+    RECONNECT_BACKOFF_MAX = float(os.environ.get("REMOTE_RECONNECT_BACKOFF_MAX", 60))
+    MAX_TIMEOUTS = int(os.environ.get("REMOTE_CHANNEL_MAX_TIMEOUTS", 3))
+
+    # ----------------------------------------------------------------------
+    def __init__(self, app_id: str, proxy_url: str, proxy_tag: Optional[str] = None, size: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, acquire_timeout: Optional[float] = None,
+                 max_timeouts: Optional[int] = None):
+        """
+        Creates the pool. Channels connect lazily, on their first dispatch.
+
+        Args:
+            app_id (str): The application ID, used as the metrics label.
+            proxy_url (str): The proxy URL every channel connects to.
+            proxy_tag (Optional[str]): The proxy tag of the channels.
+            size (Optional[int]): Number of channels (default REMOTE_POOL_SIZE).
+            max_in_flight (Optional[int]): Requests per channel before callers queue
+                (default REMOTE_CHANNEL_MAX_IN_FLIGHT).
+            acquire_timeout (Optional[float]): Seconds a caller may queue for a channel
+                (default REMOTE_ACQUIRE_TIMEOUT).
+            max_timeouts (Optional[int]): Consecutive timed out requests after which a channel
+                is recycled (default REMOTE_CHANNEL_MAX_TIMEOUTS).
+        """
+        self.app_id = app_id
+        self.proxy_url = proxy_url
+        self.proxy_tag = proxy_tag
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self.acquire_timeout = self.ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+        self.max_timeouts = max_timeouts or self.MAX_TIMEOUTS
+        self.channels: List[Channel] = [Channel(i) for i in range(size or self.SIZE)]
+        self._available = threading.Condition()
+        self._async_waiters = deque()    # (loop, future) of queued remote_async callers
+        self._waiting = 0
+        self._closed = False
+        self._health_thread = threading.Thread(target=self._health_loop, name=f"remote-pool-{app_id}", daemon=True)
+        self._health_thread.start()
+
+    # ----------------------------------------------------------------------
+    def _connect(self, channel: Channel) -> bool:
+        """
+        Connects a channel, applying the reconnect backoff after failures. Callers arriving
+        while the channel connects wait for that attempt and reuse its Remote.
+
+        Args:
+            channel (Channel): The channel to (re)connect.
+
+        Returns:
+            bool: True if the channel is connected.
+        """
+        with channel.connect_lock:
+            if channel.remote is not None and channel.healthy:
+                return True     # connected by a concurrent caller meanwhile
+            start = time.perf_counter()
+            try:
+                remote = Remote(self.proxy_url, self.proxy_tag).connect()
+            except Exception as e:
+                channel.failures += 1
+                channel.retry_at = time.monotonic() + min(self.RECONNECT_BACKOFF_MAX, 2 ** channel.failures)
+                logging.warning(f"[{self.app_id}] Channel {channel.index} connection failed: {e}")
+                return False
+            with self._available:
+                channel.remote = remote
+                channel.healthy = True
+                channel.failures = 0
+                channel.timeouts = 0
+                self._available.notify_all()
+                self._wake_async()
+        Metrics.observe("remote_pool_connect_seconds", time.perf_counter() - start, app=self.app_id)
+        logging.info(f"[{self.app_id}] Channel {channel.index} connected.")
+        return True
+
+    # ----------------------------------------------------------------------
+    def _pick(self) -> Optional[Channel]:
+        """
+        Chooses the least loaded healthy channel with spare capacity. Caller holds `_available`.
+
+        Returns:
+            Optional[Channel]: The channel, or None if all are busy or unhealthy.
+        """
+        candidates = [c for c in self.channels if c.healthy and c.in_flight < self.max_in_flight]
+        if not candidates:
+            return None
+        # connected channels first, so a cold channel is only opened when the warm ones are loaded
+        return min(candidates, key=lambda c: (c.in_flight, c.remote is None, c.index))
+
+    # ----------------------------------------------------------------------
+    def _acquire(self, timeout: float) -> Optional[Channel]:
+        """
+        Reserves a channel, waiting up to `timeout` seconds for one to free up.
+
+        Args:
+            timeout (float): Seconds to wait, 0 does not wait.
+
+        Returns:
+            Optional[Channel]: The reserved channel, None if the wait timed out.
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        with self._available:
+            self._waiting += 1
+            try:
+                channel = self._pick()
+                while channel is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        return None
+                    self._available.wait(remaining)
+                    channel = self._pick()
+                occupancy = self._reserve(channel)
+            finally:
+                self._waiting -= 1
+        self._record_acquire(start, occupancy)
+        return channel
+
+    # ----------------------------------------------------------------------
+    async def _acquire_async(self, timeout: float) -> Optional[Channel]:
+        """
+        Asynchronous `_acquire`: waits on a future of the running loop, woken when a
+        channel is released or connected, so no executor thread is held while queued.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            Optional[Channel]: The reserved channel, None if the wait timed out.
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._available:
+                channel = self._pick()
+                if channel is not None:
+                    occupancy = self._reserve(channel)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return None
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+                self._waiting += 1
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._available:
+                    self._waiting -= 1
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+        self._record_acquire(start, occupancy)
+        return channel
+
+    # ----------------------------------------------------------------------
+    def _reserve(self, channel: Channel) -> int:
+        """
+        Counts a request on the channel. Caller holds `_available`.
+
+        Returns:
+            int: Requests in flight across the pool.
+        """
+        channel.in_flight += 1
+        return sum(c.in_flight for c in self.channels)
+
+    # ----------------------------------------------------------------------
+    def _record_acquire(self, start: float, occupancy: int):
+        """
+        Observes the queue wait and the pool occupancy of an acquired channel.
+        """
+        Metrics.observe("remote_pool_queue_wait_seconds", time.perf_counter() - start, app=self.app_id)
+        Metrics.observe("remote_pool_occupancy", occupancy, buckets=(1, 2, 4, 8, 16, 32, 64), app=self.app_id)
+        Metrics.set("remote_pool_in_flight", occupancy, app=self.app_id)
+
+    # ----------------------------------------------------------------------
+    def _wake_async(self):
+        """
+        Wakes the queued async callers, which then compete for a channel again. Caller holds `_available`.
+        """
+        waiters, self._async_waiters = self._async_waiters, deque()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass    # the waiter's loop is closed, nobody is waiting any more
+
+    # ----------------------------------------------------------------------
+    def _release(self, channel: Channel, error: Optional[BaseException] = None):
+        """
+        Returns a channel to the pool, taking it out of dispatch on transport errors.
+
+        Args:
+            channel (Channel): The channel to release.
+            error (Optional[BaseException]): The error the request raised, if any.
+        """
+        # an app reporting a failed request says nothing about the socket, one slow request neither
+        timed_out = isinstance(error, (TimeoutError, asyncio.TimeoutError))
+        broken = error is not None and not timed_out and not isinstance(error, RemoteRequestFailed)
+        with self._available:
+            channel.in_flight -= 1
+            channel.timeouts = channel.timeouts + 1 if timed_out else 0
+            if timed_out and channel.timeouts >= self.max_timeouts and channel.healthy:
+                broken = True
+                Metrics.inc("remote_pool_channel_recycled_total", app=self.app_id)
+                error = f"{channel.timeouts} consecutive timeouts"
+            if broken and channel.healthy:
+                channel.healthy = False
+                channel.remote = None
+                channel.timeouts = 0
+                Metrics.inc("remote_pool_channel_failures_total", app=self.app_id)
+                logging.warning(f"[{self.app_id}] Channel {channel.index} marked unhealthy: {error}")
+            occupancy = sum(c.in_flight for c in self.channels)
+            self._available.notify()
+            self._wake_async()
+        Metrics.set("remote_pool_in_flight", occupancy, app=self.app_id)
+
+    # ----------------------------------------------------------------------
+    def _ready(self, channel: Channel) -> Remote:
+        """
+        Returns the channel's Remote, connecting it on first use.
+
+        Raises:
+            ConnectionError: If the channel cannot be connected.
+        """
+        remote = channel.remote
+        if remote is None:
+            if not self._connect(channel):
+                raise ConnectionError(f"Could not connect channel {channel.index} of {self.app_id}")
+            remote = channel.remote
+        return remote
+
+    # ----------------------------------------------------------------------
+    @contextmanager
+    def remote(self) -> Iterator[Remote]:
+        """
+        Reserves the least loaded channel for the duration of the block.
+
+        Yields:
+            Remote: The connected Remote of the reserved channel.
+
+        Raises:
+            TimeoutError: If no channel became available within the acquire timeout.
+        """
+        channel = self._acquire(self.acquire_timeout)
+        if channel is None:
+            raise TimeoutError(f"No channel of {self.app_id} available within {self.acquire_timeout}s")
+        try:
+            remote = self._ready(channel)
+            yield remote
+        except BaseException as e:
+            self._release(channel, e)
+            raise
+        self._release(channel)
+
+    # ----------------------------------------------------------------------
+    @asynccontextmanager
+    async def remote_async(self) -> AsyncIterator[Remote]:
+        """
+        Asynchronous `remote`: takes a free channel immediately, otherwise queues on a
+        future of the running loop, without blocking the loop or holding an executor thread.
+
+        Yields:
+            Remote: The connected Remote of the reserved channel.
+
+        Raises:
+            TimeoutError: If no channel became available within the acquire timeout.
+        """
+        channel = await self._acquire_async(self.acquire_timeout)
+        if channel is None:
+            raise TimeoutError(f"No channel of {self.app_id} available within {self.acquire_timeout}s")
+        try:
+            remote = self._ready(channel)
+            yield remote
+        except BaseException as e:
+            self._release(channel, e)
+            raise
+        self._release(channel)
+
+    # ----------------------------------------------------------------------
+    def _health_loop(self):
+        """
+        Reconnects unhealthy channels once their backoff has elapsed. Runs until `close`.
+        """
+        while not self._closed:
+            time.sleep(self.HEALTH_INTERVAL)
+            for channel in self.channels:
+                if not channel.healthy and time.monotonic() >= channel.retry_at:
+                    if self._connect(channel):
+                        Metrics.inc("remote_pool_reconnects_total", app=self.app_id)
+            Metrics.set("remote_pool_healthy_channels", sum(c.healthy for c in self.channels), app=self.app_id)
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """
+        Stops the health check thread and wakes queued callers, which then time out.
+        """
+        with self._available:
+            self._closed = True
+            self._available.notify_all()
+            self._wake_async()
+
+    # ----------------------------------------------------------------------
+    def stats(self) -> dict:
+        """
+        Returns the current state of the pool.
+
+        Returns:
+            dict: Per channel in-flight counts and health, plus the number of queued callers.
+        """
+        with self._available:
+            return {
+                "channels": [{"in_flight": c.in_flight, "healthy": c.healthy, "connected": c.remote is not None}
+                             for c in self.channels],
+                "waiting": self._waiting,
+            }
+
+
+# ----------------------------------------------------------------------
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
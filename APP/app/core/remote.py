@@ -1,9 +1,15 @@
+import asyncio
+import time
 from typing import Optional, Union
 
 from openfabric_pysdk.helper import Proxy
 from openfabric_pysdk.helper.proxy import ExecutionResult
 
 
+class RemoteRequestFailed(Exception):
+    """Raised when the proxy app reports a request as failed or cancelled (the channel itself is fine)."""
+
+
 class Remote:
     """
     Remote is a helper class that interfaces with an Openfabric Proxy instance
@@ -59,30 +65,78 @@ class Remote:
 
     # ----------------------------------------------------------------------
     @staticmethod
-    def get_response(output: ExecutionResult) -> Union[dict, None]:
+    def get_response(output: ExecutionResult, timeout: Optional[float] = None,
+                     poll_interval: float = 0.1) -> Union[dict, None]:
         """
         Waits for the result and processes the output.
 
         Args:
             output (ExecutionResult): The result returned from a proxy request.
+            timeout (Optional[float]): Seconds to wait before giving up. None blocks in
+                `output.wait()` until the request finishes; otherwise the status is polled
+                every `poll_interval` seconds until the deadline.
+            poll_interval (float): Seconds between status checks when a timeout is set.
 
         Returns:
             Union[dict, None]: The response data if successful, None otherwise.
 
         Raises:
-            Exception: If the request failed or was cancelled.
+            RemoteRequestFailed: If the request failed or was cancelled.
+            TimeoutError: If the request did not finish within `timeout`.
         """
         if output is None:
             return None
 
-        output.wait()
+        if timeout is None:
+            output.wait()
+        else:
+            deadline = time.monotonic() + timeout
+            while str(output.status()).lower() not in ("completed", "cancelled", "failed"):
+                if time.monotonic() > deadline:
+                    raise TimeoutError("The request to the proxy app timed out!")
+                time.sleep(poll_interval)
+
         status = str(output.status()).lower()
         if status == "completed":
             return output.data()
         if status in ("cancelled", "failed"):
-            raise Exception("The request to the proxy app failed or was cancelled!")
+            raise RemoteRequestFailed("The request to the proxy app failed or was cancelled!")
         return None
 
+    # ----------------------------------------------------------------------
+    @staticmethod
+    async def get_response_async(output: ExecutionResult, poll_interval: float = 0.25,
+                                 timeout: Optional[float] = None) -> Union[dict, None]:
+        """
+        Asynchronous counterpart of `get_response`: polls the output status with
+        `asyncio.sleep` instead of blocking a thread in `output.wait()`.
+
+        Args:
+            output (ExecutionResult): The result returned from a proxy request.
+            poll_interval (float): Seconds between status checks.
+            timeout (Optional[float]): Seconds to wait before giving up, None waits forever.
+
+        Returns:
+            Union[dict, None]: The response data if successful, None otherwise.
+
+        Raises:
+            RemoteRequestFailed: If the request failed or was cancelled.
+            TimeoutError: If the request did not finish within `timeout`.
+        """
+        if output is None:
+            return None
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = str(output.status()).lower()
+            if status == "completed":
+                return output.data()
+            if status in ("cancelled", "failed"):
+                raise RemoteRequestFailed("The request to the proxy app failed or was cancelled!")
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("The request to the proxy app timed out!")
+            await asyncio.sleep(poll_interval)
+
     # ----------------------------------------------------------------------
     def execute_sync(self, inputs: dict, configs: dict, uid: str) -> Union[dict, None]:
         """
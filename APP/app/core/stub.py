@@ -1,10 +1,18 @@
+import asyncio
 import json
 import logging
+import os
 import pprint
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Literal, Tuple
 
 import requests
 
+from Agent.Metrics import Metrics
+from Agent.Tracing import Tracer
+from core.pool import RemotePool
 from core.remote import Remote
 from openfabric_pysdk.helper import has_resource_fields, json_schema_to_marshmallow, resolve_resources
 from openfabric_pysdk.loader import OutputSchemaInst
@@ -12,7 +20,7 @@ from openfabric_pysdk.loader import OutputSchemaInst
 # Type aliases for clarity
 Manifests = Dict[str, dict]
 Schemas = Dict[str, Tuple[dict, dict]]
-Connections = Dict[str, Remote]
+Connections = Dict[str, RemotePool]
 
 
 class Stub:
@@ -24,14 +32,28 @@ class Stub:
     Attributes:
         _schema (Schemas): Stores input/output schemas for each app ID.
         _manifest (Manifests): Stores manifest metadata for each app ID.
-        _connections (Connections): Stores active Remote connections for each app ID.
+        _connections (Connections): Stores the pool of Remote connections for each app ID, created on first call.
+        _output_schemas (Dict[str, Tuple[Any, bool]]): Compiled output schema instance and
+            "has resource fields" flag for each app ID.
+        timings (Dict[str, Dict[str, Any]]): Per app metadata fetch time in seconds ('fetch')
+            and where the metadata came from ('source').
     """
 
+    # Manifests and schemas fetched from the apps, reused across restarts
+    CACHE_PATH = os.environ.get("STUB_CACHE_PATH", "datastore/stub_cache.json")
+    FETCH_TIMEOUT = float(os.environ.get("STUB_FETCH_TIMEOUT", 5))
+    # Seconds a single app request may run before it is abandoned, 0 waits forever
+    CALL_TIMEOUT = float(os.environ.get("STUB_CALL_TIMEOUT", 300)) or None
+
     # ----------------------------------------------------------------------
     def __init__(self, app_ids: List[str]):
         """
-        Initializes the Stub instance by loading manifests, schemas, and connections
-        for each given app ID.
+        Initializes the Stub instance by loading manifests and schemas for each given app ID.
+
+        Metadata found in the local cache file is served immediately and revalidated on a
+        background thread; apps missing from it are fetched concurrently (all documents of
+        all apps in parallel) before the constructor returns. Each app gets a pool of
+        WebSocket connections (`core.pool.RemotePool`), opened lazily by the first calls.
 
         Args:
             app_ids (List[str]): A list of application identifiers (hostnames or URLs).
@@ -39,35 +61,211 @@ class Stub:
         self._schema: Schemas = {}
         self._manifest: Manifests = {}
         self._connections: Connections = {}
+        self._output_schemas: Dict[str, Tuple[Any, bool]] = {}
+        self._connect_locks: Dict[str, threading.Lock] = {app_id: threading.Lock() for app_id in app_ids}
+        self._cache_lock = threading.Lock()
+        self.timings: Dict[str, Dict[str, Any]] = {app_id: {} for app_id in app_ids}
 
+        cached = self._load_cache()
+        missing = []
         for app_id in app_ids:
-            base_url = app_id.strip('/')
+            entry = cached.get(app_id)
+            if entry:
+                self._apply(app_id, entry)
+                self.timings[app_id]["source"] = "cache"
+            else:
+                missing.append(app_id)
+
+        if missing:
+            self._store_cache(self._fetch_all(missing))
+
+        stale = [app_id for app_id in app_ids if app_id not in missing]
+        if stale:
+            threading.Thread(target=self._revalidate, args=(stale,), name="stub-revalidate", daemon=True).start()
+
+        for app_id, timing in self.timings.items():
+            logging.info(f"[{app_id}] Initialization timings: {timing}")
+
+    # ----------------------------------------------------------------------
+    def _fetch_all(self, app_ids: List[str]) -> Dict[str, dict]:
+        """
+        Fetches manifest, input schema and output schema of every app concurrently.
+
+        Args:
+            app_ids (List[str]): The apps to fetch.
+
+        Returns:
+            Dict[str, dict]: The fetched entries of the apps that succeeded, keyed by app ID.
+        """
+        documents = {"manifest": "manifest", "input": "schema?type=input", "output": "schema?type=output"}
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=len(app_ids) * len(documents)) as pool:
+            futures = {
+                app_id: {name: pool.submit(self._fetch, app_id, path) for name, path in documents.items()}
+                for app_id in app_ids
+            }
+            for app_id, parts in futures.items():
+                try:
+                    entry = {name: future.result()[0] for name, future in parts.items()}
+                except Exception as e:
+                    logging.error(f"[{app_id}] Initialization failed: {e}")
+                    continue
+                # the documents are fetched in parallel, so the app waited for the slowest of them
+                self.timings[app_id].update(source="remote", fetch=max(future.result()[1] for future in parts.values()))
+                logging.info(f"[{app_id}] Manifest loaded: {entry['manifest']}")
+                logging.info(f"[{app_id}] Input schema loaded: {entry['input']}")
+                logging.info(f"[{app_id}] Output schema loaded: {entry['output']}")
+                self._apply(app_id, entry)
+                fetched[app_id] = entry
+        return fetched
+
+    # ----------------------------------------------------------------------
+    def _fetch(self, app_id: str, path: str) -> Tuple[dict, float]:
+        """
+        Fetches one metadata document of an app.
+
+        Args:
+            app_id (str): The application ID.
+            path (str): The document path relative to the app's base URL.
+
+        Returns:
+            Tuple[dict, float]: The decoded document and the seconds the request took.
+        """
+        start = time.perf_counter()
+        response = requests.get(f"https://{app_id.strip('/')}/{path}", timeout=self.FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.json(), time.perf_counter() - start
+
+    # ----------------------------------------------------------------------
+    def _apply(self, app_id: str, entry: dict):
+        """
+        Installs a cached or fetched entry as the app's manifest and schemas.
+
+        Args:
+            app_id (str): The application ID.
+            entry (dict): Entry with 'manifest', 'input' and 'output' keys.
+        """
+        previous = self._schema.get(app_id)
+        self._manifest[app_id] = entry['manifest']
+        self._schema[app_id] = (entry['input'], entry['output'])
+        if previous is None or previous[1] != entry['output']:
+            self._output_schemas.pop(app_id, None)
+
+    # ----------------------------------------------------------------------
+    def _compiled_output(self, app_id: str) -> Tuple[Any, bool]:
+        """
+        Returns the app's output schema compiled to a marshmallow schema instance, with
+        its "has resource fields" flag. Compiled once per app and again after a schema
+        refresh, instead of rebuilding the dynamic schema class on every call.
+
+        Args:
+            app_id (str): The application ID.
+
+        Returns:
+            Tuple[Any, bool]: The reusable schema instance and whether it has resource fields.
+        """
+        compiled = self._output_schemas.get(app_id)
+        if compiled is None:
+            marshmallow = json_schema_to_marshmallow(self.schema(app_id, 'output'))
+            instance = marshmallow()
+            compiled = (instance, has_resource_fields(instance))
+            self._output_schemas[app_id] = compiled
+        return compiled
+
+    # ----------------------------------------------------------------------
+    def _revalidate(self, app_ids: List[str]):
+        """
+        Refetches the metadata of apps served from the cache file and rewrites the file
+        when anything changed. Runs on a background thread started by the constructor.
+
+        Args:
+            app_ids (List[str]): The apps to revalidate.
+        """
+        start = time.perf_counter()
+        previous = {app_id: {'manifest': self._manifest[app_id], 'input': self._schema[app_id][0],
+                             'output': self._schema[app_id][1]} for app_id in app_ids}
+        fetched = self._fetch_all(app_ids)
+        changed = {app_id: entry for app_id, entry in fetched.items() if entry != previous[app_id]}
+        for app_id in fetched:
+            self.timings[app_id]["source"] = "cache (revalidated)"
+        if changed:
+            logging.info(f"Stub:Revalidated metadata changed for {list(changed)}")
+            self._store_cache(changed)
+        logging.info(f"Stub:Revalidated {len(fetched)}/{len(app_ids)} apps in {time.perf_counter() - start:.3f}s")
+
+    # ----------------------------------------------------------------------
+    def _load_cache(self) -> Dict[str, dict]:
+        """
+        Reads the metadata cache file.
+
+        Returns:
+            Dict[str, dict]: Cached entries keyed by app ID, empty if the file is missing or unreadable.
+        """
+        try:
+            with open(self.CACHE_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"Stub:Ignoring unreadable cache {self.CACHE_PATH}: {e}")
+            return {}
+
+    # ----------------------------------------------------------------------
+    def _store_cache(self, entries: Dict[str, dict]):
+        """
+        Merges entries into the metadata cache file, replacing it atomically.
 
+        Args:
+            entries (Dict[str, dict]): Entries to write, keyed by app ID.
+        """
+        if not entries:
+            return
+        with self._cache_lock:
             try:
-                # Fetch manifest
-                manifest = requests.get(f"https://{base_url}/manifest", timeout=5).json()
-                logging.info(f"[{app_id}] Manifest loaded: {manifest}")
-                self._manifest[app_id] = manifest
-
-                # Fetch input schema
-                input_schema = requests.get(f"https://{base_url}/schema?type=input", timeout=5).json()
-                logging.info(f"[{app_id}] Input schema loaded: {input_schema}")
-
-                # Fetch output schema
-                output_schema = requests.get(f"https://{base_url}/schema?type=output", timeout=5).json()
-                logging.info(f"[{app_id}] Output schema loaded: {output_schema}")
-                self._schema[app_id] = (input_schema, output_schema)
-
-                # Establish Remote WebSocket connection
-                self._connections[app_id] = Remote(f"wss://{base_url}/app", f"{app_id}-proxy").connect()
-                logging.info(f"[{app_id}] Connection established.")
-            except Exception as e:
-                logging.error(f"[{app_id}] Initialization failed: {e}")
+                cached = self._load_cache()
+                cached.update(entries)
+                directory = os.path.dirname(self.CACHE_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp = f"{self.CACHE_PATH}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(cached, f)
+                os.replace(tmp, self.CACHE_PATH)
+            except OSError as e:
+                logging.warning(f"Stub:Could not write cache {self.CACHE_PATH}: {e}")
+
+    # ----------------------------------------------------------------------
+    def _connection(self, app_id: str) -> RemotePool:
+        """
+        Returns the app's pool of Remote connections, creating it on first use. The pool's
+        channels connect lazily as requests are dispatched to them.
+
+        Args:
+            app_id (str): The application ID.
+
+        Returns:
+            RemotePool: The app's connection pool.
+
+        Raises:
+            Exception: If the app is unknown or its metadata could not be loaded.
+        """
+        pool = self._connections.get(app_id)
+        if pool:
+            return pool
+        if app_id not in self._connect_locks or app_id not in self._schema:
+            raise Exception(f"Connection not found for app ID: {app_id}")
+
+        with self._connect_locks[app_id]:
+            pool = self._connections.get(app_id)
+            if pool is None:
+                pool = RemotePool(app_id, f"wss://{app_id.strip('/')}/app", f"{app_id}-proxy")
+                self._connections[app_id] = pool
+        return pool
 
     # ----------------------------------------------------------------------
     def call(self, app_id: str, data: Any, uid: str = 'super-user') -> dict:
         """
-        Sends a request to the specified app via its Remote connection.
+        Sends a request to the specified app via the least loaded connection of its pool.
 
         Args:
             app_id (str): The application ID to route the request to.
@@ -80,24 +278,59 @@ class Stub:
         Raises:
             Exception: If no connection is found for the provided app ID, or execution fails.
         """
-        connection = self._connections.get(app_id)
-        if not connection:
-            raise Exception(f"Connection not found for app ID: {app_id}")
+        pool = self._connection(app_id)
 
-        try:
-            handler = connection.execute(data, uid)
-            result = connection.get_response(handler)
+        with Tracer.span("stub.call", app=app_id):
+            try:
+                with pool.remote() as connection:
+                    handler = connection.execute(data, uid)
+                    result = Remote.get_response(handler, timeout=self.CALL_TIMEOUT)
 
-            schema = self.schema(app_id, 'output')
-            marshmallow = json_schema_to_marshmallow(schema)
-            handle_resources = has_resource_fields(marshmallow())
+                output_schema, handle_resources = self._compiled_output(app_id)
+                if handle_resources:
+                    result = resolve_resources("https://" + app_id + "/resource?reid={reid}", result, output_schema)
 
-            if handle_resources:
-                result = resolve_resources("https://" + app_id + "/resource?reid={reid}", result, marshmallow())
+                Metrics.inc("stub_response_bytes_total", response_bytes(result), app=app_id)
+                return result
+            except Exception as e:
+                logging.error(f"[{app_id}] Execution failed: {e}")
 
-            return result
-        except Exception as e:
-            logging.error(f"[{app_id}] Execution failed: {e}")
+    # ----------------------------------------------------------------------
+    async def call_async(self, app_id: str, data: Any, uid: str = 'super-user') -> dict:
+        """
+        Asynchronous counterpart of `call`. The request is submitted through the Remote
+        connection and its completion is awaited without holding a thread; resolving
+        resource fields (blocking HTTP downloads) runs on the default executor.
+
+        Args:
+            app_id (str): The application ID to route the request to.
+            data (Any): The input data to send to the app.
+            uid (str): The unique user/session identifier for tracking (default: 'super-user').
+
+        Returns:
+            dict: The output data returned by the app.
+
+        Raises:
+            Exception: If no connection is found for the provided app ID.
+        """
+        pool = self._connection(app_id)
+
+        with Tracer.span("stub.call", app=app_id):
+            try:
+                async with pool.remote_async() as connection:
+                    handler = connection.execute(data, uid)
+                    result = await Remote.get_response_async(handler, timeout=self.CALL_TIMEOUT)
+
+                output_schema, handle_resources = self._compiled_output(app_id)
+                if handle_resources:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(
+                        None, resolve_resources, "https://" + app_id + "/resource?reid={reid}", result, output_schema)
+
+                Metrics.inc("stub_response_bytes_total", response_bytes(result), app=app_id)
+                return result
+            except Exception as e:
+                logging.error(f"[{app_id}] Execution failed: {e}")
 
     # ----------------------------------------------------------------------
     def manifest(self, app_id: str) -> dict:
@@ -139,3 +372,23 @@ class Stub:
             return _output
         else:
             raise ValueError("Type must be either 'input' or 'output'")
+
+
+# ----------------------------------------------------------------------
+def response_bytes(result: Any) -> int:
+    """
+    Approximate size of an app response: the length of its string and bytes fields.
+
+    Args:
+        result (Any): The output data returned by the app.
+
+    Returns:
+        int: Total length of the str / bytes values, 0 for anything else.
+    """
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(response_bytes(value) for value in result.values())
+    if isinstance(result, list):
+        return sum(response_bytes(value) for value in result)
+    return 0
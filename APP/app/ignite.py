@@ -1,7 +1,27 @@
+import time
+
+_start = time.perf_counter()
+
 from openfabric_pysdk.starter import Starter
 
+from core.http_server import SideServer
+from Agent.Startup import Startup
+from Agent.Metrics import Metrics
+from Agent.Tracing import Tracer
+from Agent.Events import Events
+from Agent.Storage.ArtifactStore import ArtifactStore
+import main     # the app callbacks, imported here so the import phase is timed; Starter reuses the module
+
+Startup.record("import", time.perf_counter() - _start)
+
 
 if __name__ == '__main__':
     PORT = 8888
+    Startup.warm_up()     # DB connections and the embedding model load in the background
+    SideServer.route(ArtifactStore.ROUTE, ArtifactStore.handle)
+    SideServer.route("/ready", Startup.handle)
+    SideServer.route("/metrics", Metrics.handle)
+    SideServer.route(Tracer.ROUTE, Tracer.handle)
+    SideServer.route(Events.ROUTE, Events.handle)
+    SideServer.start()
     Starter.ignite(debug=False, host="0.0.0.0", port=PORT),
-    
\ No newline at end of file
@@ -8,7 +8,11 @@ from core.stub import Stub
 
 from Agent.Agent import Agent
 from Agent.Generator import Generator
-import base64
+from Agent.CachedGenerator import CachedGenerator
+from Agent.AsyncRuntime import AsyncRuntime
+from Agent.Admission import Admission, Overloaded
+from Agent.Events import Events
+from Agent.Storage.ArtifactStore import ArtifactStore
 import os
 
 
@@ -18,6 +22,9 @@ import os
 # Configurations for the app
 configurations: Dict[str, ConfigClass] = dict()
 
+# threaded: Agent.Exec per request | async: Agent.ExecAsync on the shared AsyncRuntime loop
+EXECUTION_MODE = os.environ.get("EXECUTION_MODE", "threaded")
+
 ############################################################
 # Config callback function
 ############################################################
@@ -42,8 +49,13 @@ class OpenfabricGenerator(Generator):
     
     @classmethod
     def get_generator(cls,app_ids): 
+        """The shared generator, or None while the app ids (text-to-image, image-to-3D) are not configured."""
         if cls._generator is None:
-            cls._generator = OpenfabricGenerator(app_ids=app_ids)
+            if len(app_ids) < 2:
+                # not cached: the singleton is built once a config with both apps arrives
+                logging.info(f"OpenfabricGenerator:Unavailable, app ids {app_ids}")
+                return None
+            cls._generator = CachedGenerator(OpenfabricGenerator(app_ids=app_ids))
         return cls._generator
             
     def __init__(self,app_ids):
@@ -55,23 +67,44 @@ class OpenfabricGenerator(Generator):
         
         try:
             result = self.stub.call(self.app_ids[0], {'prompt':prompt}, 'super-user')
-            image = result.get('result')
-            base64image  = base64.b64encode(image).decode("utf-8")
-            return base64image
+            return ArtifactStore.put(result.get('result'), "png")
         except Exception as e:
             logging.info(f"Excetion {e} occcured")
             return e
         
         
-    def generate_3drender(self,base64image):
+    def generate_3drender(self,image_id):
         
         try:
-            result = self.stub.call(self.app_ids[1], {'input_image':base64image}, 'super-user')
-            object = result.get('generated_object') 
-            base64object  = base64.b64encode(object).decode("utf-8")
-            return base64object
+            result = self.stub.call(self.app_ids[1], {'input_image':self.input_image(image_id)}, 'super-user')
+            return ArtifactStore.put(result.get('generated_object'), "glb")
         except Exception as e:
             return e           
+    
+    async def generate_image_async(self,prompt):
+        
+        try:
+            result = await self.stub.call_async(self.app_ids[0], {'prompt':prompt}, 'super-user')
+            return await AsyncRuntime.run_blocking(ArtifactStore.put, result.get('result'), "png")
+        except Exception as e:
+            logging.info(f"Excetion {e} occcured")
+            return e
+    
+    async def generate_3drender_async(self,image_id):
+        
+        try:
+            input_image = await AsyncRuntime.run_blocking(self.input_image, image_id)
+            result = await self.stub.call_async(self.app_ids[1], {'input_image':input_image}, 'super-user')
+            return await AsyncRuntime.run_blocking(ArtifactStore.put, result.get('generated_object'), "glb")
+        except Exception as e:
+            return e
+    
+    @staticmethod
+    def input_image(image_id):
+        # the 3D app takes its input image inline, images are passed around by artifact id
+        if ArtifactStore.is_id(image_id):
+            return ArtifactStore.base64(image_id)
+        return image_id
         
 ############################################################
 # Execution callback function
@@ -90,29 +123,50 @@ def execute(model: AppModel) -> None:
     user_prompt = request.prompt
     attachments = request.attachments
     session_id = request.session_id
+    stream_id = request.stream_id     # progress events go to /events/<stream_id> on the side server
     
     user_config: ConfigClass = configurations.get('super-user', None)
     app_ids = user_config.app_ids if user_config else []
     
     generator = OpenfabricGenerator.get_generator(app_ids=app_ids)
     if generator is None:
+        # no config yet; the subscriber is told and its stream closed, or it would wait until the stream expires
+        model.response.message = "The generator apps are not configured yet, please try again later."
+        model.response.session_id = session_id
+        Events.publish(stream_id, "rejected", reason="generator_unavailable")
+        Events.close(stream_id)
         return
     
     # agent = Agent('llama3.2:1b',"TEST_USER",session_id ,generator)
     
     BASE_LLM  = os.environ["BASE_LLM"]
     
-    agent = Agent(BASE_LLM,"TEST_USER",session_id ,generator)
-    
-    msg , img , obj , sessid  = agent.Exec(user_prompt)
+    response: OutputClass = model.response
     
+    try:
+        # bounded FIFO queue in front of the agent, a full queue is turned away with a retry hint;
+        # the agent (history load, new session) is only built once admitted, so rejections stay cheap
+        with Admission.REQUESTS.slot():
+            agent = Agent.get_agent(BASE_LLM,"TEST_USER",session_id ,generator)
+            if EXECUTION_MODE == "async":
+                # the SDK calls execute on its own thread, which waits here while the session runs on the shared loop
+                msg , img , obj , sessid , cache_hits = AsyncRuntime.run(agent.ExecAsync(user_prompt, stream_id))
+            else:
+                msg , img , obj , sessid , cache_hits = agent.Exec(user_prompt, stream_id)
+    except Overloaded as e:
+        response.message = f"The server is busy, please try again in {e.retry_after} seconds."
+        response.session_id = session_id
+        response.retry_after = str(e.retry_after)
+        Events.publish(stream_id, "rejected", retry_after=e.retry_after)
+        Events.close(stream_id)
+        return
     
-    response: OutputClass = model.response
     
     response.message = msg
-    response.image  = img
-    response.object = obj          
+    response.image  = ArtifactStore.url(img)     # download URLs on the side server, not inline base64
+    response.object = ArtifactStore.url(obj)
     response.session_id = sessid
+    response.cache_hits = cache_hits
     
     
     
@@ -15,6 +15,7 @@ class InputClass:
     prompt: str = None
     attachments: List[str] = None
     session_id:str = None
+    stream_id:str = None
 
 ################################################################
 # InputSchema concept class - AUTOGENERATED
@@ -23,6 +24,7 @@ class InputClassSchema(Schema):
     prompt = fields.String(allow_none=True)
     attachments = fields.List(fields.String(allow_none=True), allow_none=True)
     session_id = fields.String(allow_none=True)
+    stream_id = fields.String(allow_none=True)
 
     @post_load
     def create(self, data, **kwargs):
@@ -16,6 +16,8 @@ class OutputClass:
     image: str = None
     object: str = None
     session_id: str = None
+    cache_hits: str = None
+    retry_after: str = None
 
 
 ################################################################
@@ -27,6 +29,8 @@ class OutputClassSchema(Schema):
     image = fields.Str(allow_none=True)
     object = fields.Str(allow_none=True)
     session_id = fields.Str(allow_none=True)
+    cache_hits = fields.Str(allow_none=True)
+    retry_after = fields.Str(allow_none=True)
 
     @post_load
     def create(self, data, **kwargs):
@@ -0,0 +1,129 @@
+"""Admission.Limiter: FIFO hand-off, rejection with a retry hint, and threads and asyncio sharing one queue."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Agent.Admission import Limiter, Overloaded
+
+
+def wait_queued(limiter, count):
+    deadline = time.monotonic() + 2
+    while limiter.stats()["queued"] < count:
+        assert time.monotonic() < deadline, "waiters did not queue"
+        time.sleep(0.005)
+
+
+def test_released_slots_go_to_waiters_in_arrival_order():
+    limiter = Limiter("test", max_concurrent=1)
+    limiter.acquire()
+    order = []
+
+    def wait(i):
+        limiter.acquire()
+        order.append(i)
+        limiter.release()
+
+    threads = []
+    for i in range(5):
+        threads.append(threading.Thread(target=wait, args=(i,)))
+        threads[-1].start()
+        wait_queued(limiter, i + 1)     # queued one by one, so arrival order is known
+    limiter.release()
+    for thread in threads:
+        thread.join(2)
+    assert order == [0, 1, 2, 3, 4]
+    assert limiter.stats()["active"] == 0
+
+
+def test_a_new_caller_does_not_overtake_the_queue():
+    limiter = Limiter("test", max_concurrent=1)
+    limiter.acquire()
+    order = []
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), order.append("queued")))
+    waiter.start()
+    wait_queued(limiter, 1)
+    limiter.release()       # handed to the waiter, not left free for the next caller
+    assert limiter.stats()["active"] == 1
+    waiter.join(2)
+    assert order == ["queued"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    limiter = Limiter("test", max_concurrent=2, max_queue=1)
+    limiter.hold_seconds = 3.0
+    limiter.acquire()
+    limiter.acquire()
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    wait_queued(limiter, 1)
+    with pytest.raises(Overloaded) as rejected:
+        limiter.acquire()
+    # one waiter ahead plus this caller, over two slots held 3s on average
+    assert rejected.value.retry_after == 3
+    assert rejected.value.reason == "full"
+    assert rejected.value.limiter == "test"
+    limiter.release()
+    waiter.join(2)
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue():
+    limiter = Limiter("test", max_concurrent=1, queue_timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(Overloaded) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == "timeout"
+    assert rejected.value.retry_after >= 1
+    assert limiter.stats()["queued"] == 0
+    limiter.release()
+    assert limiter.stats()["active"] == 0
+
+
+def test_threads_and_tasks_share_one_fifo_queue():
+    limiter = Limiter("test", max_concurrent=1)
+    order = []
+
+    async def main():
+        limiter.acquire()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), order.append("thread"), limiter.release()))
+        thread.start()
+        wait_queued(limiter, 1)
+
+        async def task():
+            async with limiter.slot_async():
+                order.append("task")
+
+        pending = asyncio.ensure_future(task())
+        await asyncio.sleep(0.02)
+        assert limiter.stats()["queued"] == 2
+        limiter.release()
+        await asyncio.wait_for(pending, 2)
+        thread.join(2)
+
+    asyncio.run(main())
+    assert order == ["thread", "task"]
+    assert limiter.stats()["active"] == 0
+
+
+def test_cancelled_async_waiter_gives_its_slot_back():
+    limiter = Limiter("test", max_concurrent=1)
+
+    async def main():
+        limiter.acquire()
+        pending = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.02)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        limiter.release()
+
+    asyncio.run(main())
+    assert limiter.stats()["active"] == 0 and limiter.stats()["queued"] == 0
+
+
+def test_zero_concurrency_disables_the_limit():
+    limiter = Limiter("test", max_concurrent=0, max_queue=1)
+    for _ in range(10):
+        limiter.acquire()
+    assert limiter.stats()["queued"] == 0
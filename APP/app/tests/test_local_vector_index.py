@@ -0,0 +1,42 @@
+"""LocalVectorIndex top-k search, including rows left without a session."""
+import numpy as np
+
+from Agent.Storage.LocalVectorDB import LocalVectorIndex
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_returns_best_matches_in_order(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "embeddings.f32"), 2, [])
+    index.put("a", unit(1, 0))
+    index.put("b", unit(1, 1))
+    index.put("c", unit(0, 1))
+    assert [session_id for session_id, _ in index.search(unit(1, 0.1), k=2)] == ["a", "b"]
+
+
+def test_holes_do_not_displace_live_rows(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    index = LocalVectorIndex(path, 2, [])
+    for session_id in ("a", "b", "c", "d"):
+        index.put(session_id, unit(1, 0))     # the rows of the deleted sessions score best
+    index.put("e", unit(0.5, 1))
+    index.put("f", unit(0, 1))
+    index.matrix.flush()
+
+    # reopened with only e and f still in the sessions table: rows 0-3 are holes
+    index = LocalVectorIndex(path, 2, [(4, "e"), (5, "f")])
+    matches = index.search(unit(1, 0), k=2)
+    assert [session_id for session_id, _ in matches] == ["e", "f"]
+    assert all(np.isfinite(score) for _, score in matches)
+
+
+def test_k_beyond_live_rows_returns_live_rows_only(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    index = LocalVectorIndex(path, 2, [])
+    index.put("a", unit(1, 0))
+    index.put("b", unit(0, 1))
+    index = LocalVectorIndex(path, 2, [(1, "b")])
+    assert [session_id for session_id, _ in index.search(unit(1, 0), k=5)] == ["b"]
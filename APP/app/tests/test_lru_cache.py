@@ -0,0 +1,82 @@
+"""LRUCache bounds, TTL and the order evicted entries reach on_evict."""
+import threading
+import time
+
+from Agent.Cache.LRUCache import LRUCache
+
+
+def test_count_bound_evicts_least_recently_used():
+    evicted = []
+    cache = LRUCache(max_items=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert evicted == ["b"]
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_byte_bound_evicts_oldest_first_in_order():
+    evicted = []
+    cache = LRUCache(max_bytes=10, sizeof=len, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxxxxxx")      # 16 bytes: a then b have to go
+    assert evicted == ["a", "b"]
+    assert cache.stats()["bytes"] == 8
+
+
+def test_replacing_a_value_updates_its_size():
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.put("a", "xxxxxxxx")
+    cache.put("a", "xx")
+    cache.put("b", "xxxxxxxx")
+    assert "a" in cache and cache.stats()["bytes"] == 10
+
+
+def test_entry_larger_than_the_bound_is_kept_until_something_newer_arrives():
+    cache = LRUCache(max_bytes=4, sizeof=len)
+    cache.put("a", "xxxxxxxx")
+    assert cache.get("a") == "xxxxxxxx"
+    cache.put("b", "xx")
+    assert "a" not in cache and "b" in cache
+
+
+def test_ttl_expires_idle_entries():
+    evicted = []
+    cache = LRUCache(ttl=0.2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    time.sleep(0.12)
+    assert cache.get("a") == 1          # a read refreshes the entry
+    time.sleep(0.12)
+    assert cache.get("b") is None
+    assert evicted == ["b"]
+    assert cache.stats()["expirations"] == 1
+    time.sleep(0.25)
+    cache.expire()
+    assert evicted == ["b", "a"] and len(cache) == 0
+
+
+def test_pop_does_not_call_on_evict():
+    evicted = []
+    cache = LRUCache(max_items=1, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    assert cache.pop("a") == 1
+    assert evicted == [] and len(cache) == 0
+
+
+def test_on_evict_runs_outside_the_lock():
+    seen = []
+
+    def on_evict(key, value):
+        # another thread can use the cache while an eviction is being written back
+        other = threading.Thread(target=lambda: seen.append(cache.get("b")))
+        other.start()
+        other.join(1)
+        seen.append(not other.is_alive())
+
+    cache = LRUCache(max_items=1, on_evict=on_evict)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert seen == [2, True]
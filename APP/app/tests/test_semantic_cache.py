@@ -0,0 +1,63 @@
+"""SemanticCache: matching by intent similarity, isolation between sessions, concurrent stores."""
+import threading
+
+import numpy as np
+
+from Agent.Cache.SemanticCache import SemanticCache
+
+WORDS = ["red", "blue", "dragon", "castle", "tree", "ship", "robot", "cat"]
+
+
+def encode(text):
+    # bag of words: rewordings with the same words match, different subjects do not
+    return np.array([text.count(word) for word in WORDS], dtype=np.float32)
+
+
+def store(cache, session_id, intent):
+    cache.store(session_id, intent, f"description of {intent}", f"{intent}.png", f"{intent}.glb")
+
+
+def test_rewording_hits_and_other_subject_misses():
+    cache = SemanticCache(encode, threshold=0.9)
+    store(cache, "s1", "red dragon")
+    assert cache.lookup("s1", "a dragon, red please").image == "red dragon.png"
+    assert cache.lookup("s1", "blue castle") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_sessions_do_not_see_each_other():
+    cache = SemanticCache(encode, threshold=0.9)
+    store(cache, "s1", "red dragon")
+    assert cache.lookup("s2", "red dragon") is None
+
+
+def test_invalid_entry_is_dropped():
+    cache = SemanticCache(encode, threshold=0.9, valid=lambda entry: False)
+    store(cache, "s1", "red dragon")
+    assert cache.lookup("s1", "red dragon") is None
+    assert cache.evictions == 1
+
+
+def test_least_recently_used_generation_makes_room():
+    cache = SemanticCache(encode, threshold=0.9, max_entries_per_session=2)
+    store(cache, "s1", "red dragon")
+    store(cache, "s1", "blue castle")
+    cache.lookup("s1", "red dragon")
+    store(cache, "s1", "tree ship")
+    assert cache.lookup("s1", "blue castle") is None
+    assert cache.lookup("s1", "red dragon") is not None
+
+
+def test_concurrent_stores_of_one_session_keep_every_entry():
+    cache = SemanticCache(encode, threshold=0.99)
+    intents = [f"{a} {b}" for a in WORDS for b in WORDS if a < b][:16]
+    barrier = threading.Barrier(len(intents))
+
+    def run(intent):
+        barrier.wait()
+        store(cache, "s1", intent)
+
+    threads = [threading.Thread(target=run, args=(intent,)) for intent in intents]
+    [thread.start() for thread in threads]
+    [thread.join() for thread in threads]
+    assert all(cache.lookup("s1", intent) is not None for intent in intents)
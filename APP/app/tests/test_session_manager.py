@@ -0,0 +1,105 @@
+"""SessionManager write-behind: what is written right away, what is deferred, and evictions whose write fails."""
+import threading
+
+import pytest
+
+import Agent.Storage.DB as DBModule
+from Agent.Cache.LRUCache import LRUCache
+from Agent.SessionsManager import CachedSession, SessionManager
+from benchmarks.fakes import InMemoryDB
+
+
+class FlakyDB(InMemoryDB):
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+        self.gate = None        # Event a save waits on, to hold a write in flight
+
+    def save_session(self, username, session_id, image_desc, history, summary):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise ConnectionError("db down")
+        super().save_session(username, session_id, image_desc, history, summary)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FlakyDB()
+    monkeypatch.setattr(DBModule, "_db", db)
+    monkeypatch.setattr(SessionManager, "CHECKPOINT_INTERVAL", 0)
+    monkeypatch.setattr(SessionManager, "_sessions", LRUCache(
+        max_items=2, sizeof=CachedSession.size,
+        on_evict=lambda session_id, session: SessionManager._on_evict(session_id, session)))
+    monkeypatch.setattr(SessionManager, "_unflushed", {})
+    SessionManager._evicted.clear()
+    return db
+
+
+def history(*contents):
+    return [{"role": "user", "content": content} for content in contents]
+
+
+def test_new_description_is_written_right_away(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    assert db.sessions["s1"]["image_description"] == "a red dragon"
+    assert db.get_image_description(intent="red dragon") == "a red dragon"
+
+
+def test_history_change_is_deferred_to_checkpoint(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    SessionManager.set_session_history("s1", history("base", "make it blue"))
+    assert len(db.sessions["s1"]["history"]) != 2
+    SessionManager.checkpoint()
+    assert len(db.sessions["s1"]["history"]) == 2
+
+
+def test_eviction_flushes_dirty_session(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    SessionManager.set_session_history("s1", history("base", "make it blue"))
+    SessionManager.set_session_history("s2", history("base"))
+    SessionManager.set_session_history("s3", history("base"))    # evicts s1
+    assert "s1" not in SessionManager._sessions
+    assert len(db.sessions["s1"]["history"]) == 2
+
+
+def test_failed_eviction_flush_is_kept_and_retried(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    SessionManager.set_session_history("s1", history("base", "make it blue"))
+    db.fail = True
+    SessionManager.set_session_history("s2", history("base"))
+    SessionManager.set_session_history("s3", history("base"))    # evicts s1, its write fails
+    assert "s1" not in SessionManager._sessions
+    assert "s1" in SessionManager._unflushed
+
+    db.fail = False
+    SessionManager.checkpoint()
+    assert SessionManager._unflushed == {}
+    assert len(db.sessions["s1"]["history"]) == 2
+
+
+def test_unflushed_session_is_served_from_memory(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    SessionManager.set_session_history("s1", history("base", "make it blue"))
+    db.fail = True
+    SessionManager.set_session_history("s2", history("base"))
+    SessionManager.set_session_history("s3", history("base"))
+    assert len(SessionManager.get_session_history("s1")) == 2     # not the stale DB copy
+    assert "s1" in SessionManager._sessions
+
+
+def test_eviction_write_does_not_hold_the_lock(db):
+    SessionManager.save_session("u", "s1", "a red dragon", "a red dragon")
+    SessionManager.set_session_history("s1", history("base", "make it blue"))
+    SessionManager.set_session_history("s2", history("base"))
+    db.gate = threading.Event()
+    evicting = threading.Thread(target=SessionManager.set_session_history, args=("s3", history("base")))
+    evicting.start()
+    try:
+        acquired = SessionManager._lock.acquire(timeout=1)     # the s1 write is blocked in the DB meanwhile
+        assert acquired
+        SessionManager._lock.release()
+    finally:
+        db.gate.set()
+        evicting.join()
+    assert len(db.sessions["s1"]["history"]) == 2
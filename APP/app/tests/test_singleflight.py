@@ -0,0 +1,147 @@
+"""SingleFlight: one call per key in flight, its result or error shared with every caller that joined it."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Agent.Cache.SingleFlight import SingleFlight
+
+
+def wait_joined(flight, shared):
+    deadline = time.monotonic() + 2
+    while flight.shared < shared:
+        assert time.monotonic() < deadline, "callers did not join the call"
+        time.sleep(0.005)
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Starts a leader blocked in `fn` until `callers - 1` others joined it; returns each caller's outcome."""
+    release = threading.Event()
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = ("result", flight.do(key, lambda: (release.wait(2), fn())[1]))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    threads[0].start()
+    while flight.in_flight() == 0:
+        time.sleep(0.005)
+    for thread in threads[1:]:
+        thread.start()
+    wait_joined(flight, callers - 1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    outcomes = run_concurrently(flight, "k", lambda: calls.append(1) or "value", 5)
+    assert calls == [1]
+    assert outcomes == [("result", "value")] * 5
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight("test")
+    error = ValueError("generator failed")
+
+    def fail():
+        raise error
+
+    outcomes = run_concurrently(flight, "k", fail, 4)
+    assert all(kind == "error" and raised is error for kind, raised in outcomes)
+    assert flight.in_flight() == 0
+
+
+def test_finished_call_is_not_kept():
+    flight = SingleFlight("test")
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.do("k", lambda: 2) == 2
+    assert flight.leaders == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    assert [flight.do(key, lambda key=key: key * 2) for key in (1, 2)] == [2, 4]
+    assert flight.shared == 0
+
+
+def test_async_waiters_share_result_and_error():
+    flight = SingleFlight("test")
+
+    async def main():
+        release = asyncio.Event()
+
+        async def slow(value):
+            await release.wait()
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        tasks = [asyncio.ensure_future(flight.do_async("ok", lambda: slow("value"))) for _ in range(3)]
+        error = KeyError("boom")
+        failing = [asyncio.ensure_future(flight.do_async("bad", lambda: slow(error))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await asyncio.gather(*tasks) == ["value"] * 3
+        results = await asyncio.gather(*failing, return_exceptions=True)
+        assert all(result is error for result in results)
+
+    asyncio.run(main())
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "shared": 4}
+
+
+def test_thread_waits_on_a_call_started_by_a_task():
+    flight = SingleFlight("test")
+    results = []
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def leader_call():
+            started.set()
+            await release.wait()
+            return "from task"
+
+        leader = asyncio.ensure_future(flight.do_async("k", leader_call))
+        await started.wait()
+        thread = threading.Thread(target=lambda: results.append(flight.do("k", lambda: "from thread")))
+        thread.start()
+        while flight.shared < 1:
+            await asyncio.sleep(0.005)
+        release.set()
+        assert await leader == "from task"
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 2)
+
+    asyncio.run(main())
+    assert results == ["from task"]
+
+
+def test_waiters_rerun_when_the_async_leader_is_cancelled():
+    flight = SingleFlight("test")
+
+    async def main():
+        async def never():
+            await asyncio.sleep(10)
+
+        leader = asyncio.ensure_future(flight.do_async("k", never))
+        await asyncio.sleep(0.01)
+
+        async def value():
+            return "rerun"
+
+        waiter = asyncio.ensure_future(flight.do_async("k", value))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await waiter == "rerun"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
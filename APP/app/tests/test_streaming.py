@@ -0,0 +1,105 @@
+"""StateStreamParser on replies split at arbitrary points, and StreamReader in both iteration modes."""
+import asyncio
+import json
+
+import pytest
+
+from Agent.LLM.Streaming import StateStreamParser, StreamReader
+from Agent.Processor import Processor
+
+REQUIRED = Processor.REQUIRED_FIELDS
+
+
+def feed_all(chunks):
+    """Feeds chunks in order; returns (state, index of the chunk that completed it)."""
+    parser = StateStreamParser(REQUIRED)
+    for i, chunk in enumerate(chunks):
+        state = parser.feed(chunk)
+        if state is not None:
+            assert all(parser.feed(rest) is None for rest in chunks[i + 1:])     # returned once only
+            return state, i
+    return None, None
+
+
+def splits(text):
+    for cut in range(1, len(text)):
+        yield [text[:cut], text[cut:]]
+
+
+def test_every_two_way_split_parses_the_same_state():
+    reply = '{"state": 2, "image": "a \\"red\\" {dragon}, 3 heads", "summary": "x"}'
+    for chunks in splits(reply):
+        state, _ = feed_all(chunks)
+        assert state["state"] == 2
+        assert state["image"] == 'a "red" {dragon}, 3 heads'
+
+
+def test_character_by_character_with_nested_data():
+    reply = '```json\n{"state": 1, "data": {"intent": "the dragon [from before]"}, "summary": "s"}\n```'
+    state, _ = feed_all(list(reply))
+    assert state == {"state": 1, "data": {"intent": "the dragon [from before]"}}
+
+
+def test_state_is_returned_before_trailing_fields_arrive():
+    chunks = ['{"state": 2, "ima', 'ge": "red dragon"', ', "summary": "a long', ' summary"}']
+    state, at = feed_all(chunks)
+    assert at == 1
+    assert state == {"state": 2, "image": "red dragon"}
+
+
+def test_number_at_the_end_of_a_chunk_waits_for_the_next_one():
+    parser = StateStreamParser({"2": [], "23": []})
+    assert parser.feed('{"state": 2') is None       # could still become 23
+    assert parser.feed('3, "x": 1}') == {"state": 23, "x": 1}
+
+
+def test_state_without_required_fields_waits_for_the_object_to_close():
+    chunks = ['{"state": 0, "other": true', ', "more": null', "}"]
+    state, at = feed_all(chunks)
+    assert at == 2
+    assert state == {"state": 0, "other": True, "more": None}
+
+
+def test_unknown_state_is_returned_when_the_object_closes():
+    state, at = feed_all(['{"state": 9, "a": [1, 2]', "}"])
+    assert (state, at) == ({"state": 9, "a": [1, 2]}, 1)
+
+
+def test_incomplete_reply_returns_nothing():
+    assert feed_all(['{"state": 2, "image": "red dr', "agon"]) == (None, None)
+
+
+def test_stream_reader_yields_chunks_in_order():
+    chunks = [json.dumps({"n": i}) for i in range(50)]
+    reader = StreamReader(iter(chunks))
+    assert list(reader) == chunks
+    assert reader.text == "".join(chunks)
+    assert reader.completed_after is not None
+
+
+def test_stream_reader_raises_the_source_error_after_earlier_chunks():
+    def source():
+        yield "a"
+        raise ConnectionError("stream dropped")
+
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in StreamReader(source()):
+            received.append(chunk)
+    assert received == ["a"]
+
+
+def test_stream_reader_async_iteration():
+    def source():
+        yield "a"
+        yield "b"
+        raise ConnectionError("stream dropped")
+
+    async def main():
+        received = []
+        with pytest.raises(ConnectionError):
+            async for chunk in StreamReader(source(), loop=asyncio.get_running_loop()):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(main()) == ["a", "b"]
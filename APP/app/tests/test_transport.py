@@ -0,0 +1,147 @@
+"""
+Agent/LLM/Transport.py against a local fake HTTP server that answers each POST with the next
+scripted reply: connection reuse, which failures are retried, Retry-After and the deadlines.
+
+Run from APP/app: python -m pytest tests
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from Agent.LLM.Transport import Transport
+
+
+class ScriptedServer:
+    """HTTP/1.1 server replying to every POST with the next (status, headers, delay) of `script`, then 200."""
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.requests = 0
+        self.client_ports = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server.lock:
+                    server.requests += 1
+                    server.client_ports.append(self.client_address[1])
+                    status, headers, delay = server.script.pop(0) if server.script else (200, {}, 0)
+                time.sleep(delay)
+                body = b'{"ok": true}'
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass    # the client gave up waiting
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/chat"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(*script):
+        servers.append(ScriptedServer(script))
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.close()
+
+
+@pytest.fixture
+def transport():
+    transport = Transport("test")
+    transport.BACKOFF_BASE = 0.01
+    transport.READ_TIMEOUT = 2
+    return transport
+
+
+def test_reuses_keep_alive_connection(server, transport):
+    fake = server()
+    for _ in range(3):
+        assert transport.post(fake.url, json={}).status_code == 200
+    assert fake.requests == 3
+    assert len(set(fake.client_ports)) == 1
+
+
+def test_retries_429_after_retry_after(server, transport):
+    fake = server((429, {"Retry-After": "1"}, 0))
+    start = time.monotonic()
+    response = transport.post(fake.url, json={})
+    assert response.status_code == 200
+    assert fake.requests == 2
+    assert time.monotonic() - start >= 1
+
+
+def test_retries_5xx_then_succeeds(server, transport):
+    fake = server((503, {}, 0), (502, {}, 0))
+    assert transport.post(fake.url, json={}).status_code == 200
+    assert fake.requests == 3
+
+
+def test_does_not_retry_500(server, transport):
+    # the backend may have run the generation before failing
+    fake = server((500, {}, 0))
+    assert transport.post(fake.url, json={}).status_code == 500
+    assert fake.requests == 1
+
+
+def test_read_timeout_is_not_retried(server, transport):
+    fake = server((200, {}, 1.0))
+    transport.READ_TIMEOUT = 0.2
+    with pytest.raises(requests.ReadTimeout):
+        transport.post(fake.url, json={})
+    assert fake.requests == 1
+
+
+def test_connection_error_is_retried(server, transport):
+    fake = server()
+    url = fake.url
+    fake.close()       # nothing listens on the port any more
+    transport.MAX_RETRIES = 2
+    start = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        transport.post(url, json={})
+    assert time.monotonic() - start < 5
+
+
+def test_deadline_bounds_retries(server, transport):
+    # waiting out Retry-After would overrun the call deadline: the 503 is returned instead
+    fake = server((503, {"Retry-After": "5"}, 0))
+    transport.CALL_DEADLINE = 1
+    start = time.monotonic()
+    assert transport.post(fake.url, json={}).status_code == 503
+    assert fake.requests == 1
+    assert time.monotonic() - start < 1
+
+
+def test_streamed_response_keeps_connection_for_reuse(server, transport):
+    fake = server()
+    for _ in range(2):
+        with transport.post(fake.url, json={}, stream=True) as response:
+            assert response.json() == {"ok": True}
+    assert len(set(fake.client_ports)) == 1
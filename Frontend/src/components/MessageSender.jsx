@@ -4,12 +4,34 @@ import './MessageSender.css';
 import ModelViewer from './ModelViewer';
 import Loader from './Loader';
 
+// artifacts arrive as download URLs; older responses (and cached ones) may still carry inline base64
+const artifactSrc = (value, mimeType) =>
+  /^https?:\/\//.test(value) ? value : `data:${mimeType};base64,${value}`;
+
+// where the app is reached from the browser (Frontend/.env, or .env.local to override):
+// the SDK for /execution, the side server for progress events and artifact downloads
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8888';
+const SIDE_SERVER_URL = import.meta.env.VITE_SIDE_SERVER_URL || 'http://localhost:8889';
+const EVENTS_URL = `${SIDE_SERVER_URL}/events`;
+
+const STATE_LABELS = {
+  mem_recall: 'Recalling earlier images...',
+  image: 'Generating the image...',
+  model: 'Rendering the 3D model...',
+  exit: 'Finishing up...',
+  query: 'Answering...',
+};
+
+const newStreamId = () =>
+  window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
 const MessageSender = () => {
   const [inputMsg, setInputMsg] = useState('');
   const [sessionId, setSessionId] = useState('');
   const [response, setResponse] = useState({ image: '', message: '', object: '', session_id: '' });
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [status, setStatus] = useState('');
 
   const cleanJSON = (raw) => {
     try {
@@ -30,24 +52,53 @@ const MessageSender = () => {
     }
   };
 
+  // shows the image as soon as it exists and the model when it arrives, before /execution returns
+  const followProgress = (streamId) => {
+    const events = new EventSource(`${EVENTS_URL}/${streamId}`);
+    const on = (name, handler) => events.addEventListener(name, (e) => handler(JSON.parse(e.data)));
+
+    on('state', (data) => setStatus(STATE_LABELS[data.state] || ''));
+    on('image', (data) => setResponse((prev) => ({ ...prev, image: data.image })));
+    on('model', (data) => setResponse((prev) => ({ ...prev, object: data.object })));
+    on('message', (data) => setResponse((prev) => ({ ...prev, message: data.message })));
+    on('done', (data) => {
+      setResponse(data);
+      setLoading(false);
+      events.close();
+    });
+    on('rejected', () => events.close());
+    events.onerror = () => events.close();    // the /execution response still carries the result
+    return events;
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
     setError('');
+    setStatus('');
+    setResponse({ image: '', message: '', object: '', session_id: sessionId });
+    const streamId = newStreamId();
+    const events = followProgress(streamId);
     try {
-      const res = await axios.post('http://localhost:8888/execution', {
+      const res = await axios.post(`${API_URL}/execution`, {
         prompt: inputMsg,
         attachments: [],
-        session_id: sessionId
+        session_id: sessionId,
+        stream_id: streamId
       });
 
       const parsed = cleanJSON(res.data);
       setResponse(parsed);
       setSessionId(parsed.session_id);
+      if (parsed.retry_after) {
+        setError(`Server busy, retry in ${parsed.retry_after}s`);
+      }
     } catch (err) {
       setError('Failed to send message');
     } finally {
+      events.close();
       setLoading(false);
+      setStatus('');
     }
   };
   
@@ -73,7 +124,8 @@ const MessageSender = () => {
       </form>
 
 
-      {loading && <div className="msg-loading">{<Loader/>}</div>}
+      {loading && !response.image && <div className="msg-loading">{<Loader/>}</div>}
+      {loading && status && <div className="msg-status">{status}</div>}
       {error && <div className="msg-error">{error}</div>}
 
 
@@ -89,7 +141,7 @@ const MessageSender = () => {
             <div className="msg-display-row-cont">
                       {response.image && (
                         <img
-                        src={`data:image/png;base64,${response.image}`}
+                        src={artifactSrc(response.image, 'image/png')}
                         alt="Generated"
                         className="msg-image"
                         />
@@ -97,7 +149,7 @@ const MessageSender = () => {
             </div>
             <div className="msg-display-row-cont">
                     {response.object && (
-                      <ModelViewer glbBase64={response.object} />
+                      <ModelViewer src={artifactSrc(response.object, 'model/gltf-binary')} />
                     )}
             </div>
 
@@ -19,21 +19,14 @@ function Model({ url }) {
   return <primitive object={scene} />;
 }
 
-export default function ModelViewer({ glbBase64 }) {
-  const { blobUrl, blob } = useMemo(() => {
-    if (!glbBase64) return { blobUrl: null, blob: null };
-    const byteCharacters = atob(glbBase64);
-    const byteArray = new Uint8Array(
-      Array.from(byteCharacters).map((char) => char.charCodeAt(0))
-    );
-    const blob = new Blob([byteArray], { type: 'model/gltf-binary' });
-    return { blobUrl: URL.createObjectURL(blob), blob };
-  }, [glbBase64]);
+export default function ModelViewer({ src }) {
+  // src is the artifact URL, or a data: URL for inline base64 objects; useGLTF loads either
+  const modelUrl = src || null;
 
   const handleDownload = () => {
-    if (!blob) return;
+    if (!src) return;
     const link = document.createElement('a');
-    link.href = URL.createObjectURL(blob);
+    link.href = src.startsWith('data:') ? src : `${src}?download=1`;
     link.download = 'model.glb';
     document.body.appendChild(link);
     link.click();
@@ -42,7 +35,7 @@ export default function ModelViewer({ glbBase64 }) {
 
   return (
     <div className="model-viewer-container">
-      {blob && (
+      {modelUrl && (
         <button className="download-button" onClick={handleDownload}>
           ⬇ Download .glb
         </button>
@@ -50,7 +43,7 @@ export default function ModelViewer({ glbBase64 }) {
 
       <div className="model-viewer-canvas">
         <h2 className="model-viewer-title">3D Model</h2>
-        {blobUrl ? (
+        {modelUrl ? (
           <Canvas
             camera={{ position: [3, 3, 3], fov: 45 }}
             gl={{ physicallyCorrectLights: true }}
@@ -65,7 +58,7 @@ export default function ModelViewer({ glbBase64 }) {
             <directionalLight position={[-5,-5,-5]} intensity={5} />
            
             <Suspense fallback={null}>
-              <Model url={blobUrl} />
+              <Model url={modelUrl} />
             </Suspense>
             <OrbitControls target={[0, 0, 0]} />
               <OrbitControls enableDamping dampingFactor={0.5} />